@@ -1,6 +1,9 @@
+import os
+
 from app import create_app
 
-app = create_app()
+# 本地调试入口（Flask 开发服务器）：未指定 FLASK_CONFIG 时使用 development
+app = create_app(os.environ.get('FLASK_CONFIG') or 'development')
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    app.run(debug=app.config.get('DEBUG', False))
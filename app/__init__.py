@@ -1,22 +1,31 @@
+import os
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
 
-db = SQLAlchemy()
+from config import config
+from app.services import database
+
+# RoutingSession：前台只读请求可读副本（见 services/database.py）
+db = SQLAlchemy(session_options={'class_': database.RoutingSession})
 migrate = Migrate()
 login_manager = LoginManager()
 login_manager.login_view = 'admin.login'  # 未登录跳转到登录页
 login_manager.login_message = '请先登录后台管理系统'
 login_manager.login_message_category = 'warning'
 
-def create_app():
+def create_app(config_name=None):
     app = Flask(__name__)
-    app.config['SECRET_KEY'] = 'your-very-secret-key-change-me'
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///site.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # 配置见项目根目录 config.py；FLASK_CONFIG=development / production / testing（未指定时为 production）
+    config_name = config_name or os.environ.get('FLASK_CONFIG') or 'default'
+    config_class = config[config_name]
+    app.config.from_object(config_class)
+    config_class.init_app(app)
 
+    database.configure(app)  # 连接池参数、只读副本绑定
     db.init_app(app)
+    database.init_app(app, db)  # SQLite PRAGMA（WAL 等）
     migrate.init_app(app, db)
     login_manager.init_app(app)
 
@@ -24,18 +33,47 @@ def create_app():
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        # 公开蓝图不会调用（services/edge.py），只有后台请求按主键取一次
+        return db.session.get(User, int(user_id))
 
     # 注册蓝图
     from app.routes.main import main_bp, inject_seo_data
     from app.routes.products import products_bp
     from app.routes.featured import featured_bp
     from app.routes.admin import admin_bp
+    from app.routes.media import media_bp
+    from app.routes.seo import seo_bp
+    from app.routes.api import api_bp
 
     app.register_blueprint(main_bp)
     app.register_blueprint(products_bp, url_prefix='/products')
     app.register_blueprint(featured_bp, url_prefix='/featured')
     app.register_blueprint(admin_bp, url_prefix='/admin')
+    app.register_blueprint(media_bp, url_prefix='/media')
+    app.register_blueprint(seo_bp)  # /sitemap.xml、/robots.txt
+    app.register_blueprint(api_bp, url_prefix='/api/v1')  # 只读 JSON 接口
+
+    # 命令行（flask catalog ...）与 ORM 同步钩子
+    from app import cli
+    from app.services import (assets, changes, compression, counts, edge, facets, images, instrumentation, jobs,
+                              media, photos, response_cache, sitemap, templating, themes)
+    from app.services import series  # noqa: F401  注册 featured_series → 关联表的 after_flush 同步
+    cli.init_app(app)
+    instrumentation.init_app(app)  # 最先注册：后续钩子中的查询也计入本请求
+    compression.init_app(app)  # 动态响应 gzip / br，静态文件优先发送预压缩文件
+    images.init_app(app)  # 模板函数 image_url() / image_srcset()
+    media.init_app(app)  # 模板函数 media_url()，ORM 修改产品图片时同步引用计数
+    photos.init_app(app)  # 模板函数 cover_photos()，ORM 修改产品图片时同步 product_photo 表
+    templating.init_app(app)  # 模板字节码缓存、{% cache %} 片段缓存
+    themes.init_app(app)  # 主题注册表；bundle 缺失或过期时重建（须在 assets 之前，bundle 要进入资源清单）
+    assets.init_app(app)  # 模板函数 asset_url()
+    changes.init_app(app)  # 跟踪其他 worker 的写入
+    response_cache.init_app(app)  # 整页缓存，随 content_changed 信号失效
+    edge.init_app(app)  # 公开蓝图无会话、不加载用户，输出 Cache-Control / Surrogate-Key 供反向代理缓存
+    counts.init_app(app)  # 后台列表的近似总数，随 content_changed 信号清空
+    facets.init_app(app)  # 产品列表分面索引，随 content_changed 信号增量更新
+    sitemap.init_app(app)  # sitemap 分片缓存，随 content_changed 信号失效
+    jobs.init_app(app)  # 后台任务队列（JOBS_EAGER 时在响应发送后执行本请求入队的任务）
 
     # ====================== 新增：全局上下文处理器 ======================
     # 原来只在 main_bp 下，现在提升到 app 级别，所有页面（包括 products、featured）都能访问
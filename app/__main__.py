@@ -0,0 +1,38 @@
+# app/__main__.py
+# 生产环境启动：python -m app serve --workers 4 --threads 8
+# 后台任务（图片衍生图、图片分析、Logo 处理）由单独的 flask jobs worker 进程执行
+
+import os
+
+import click
+
+
+@click.group()
+def main():
+    """酒店家具官网服务命令"""
+
+
+@main.command()
+@click.option('--bind', '-b', default='127.0.0.1:5000', show_default=True, help='监听地址 host:port')
+@click.option('--workers', '-w', default=0, help='worker 进程数（默认 CPU 核数）')
+@click.option('--threads', '-t', default=8, show_default=True, help='每个 worker 的线程数')
+@click.option('--max-requests', default=0, show_default=True, help='worker 处理多少个请求后回收（0 = 不回收）')
+@click.option('--max-requests-jitter', default=0, show_default=True, help='回收阈值的随机抖动，避免 worker 同时重启')
+@click.option('--graceful-timeout', default=30, show_default=True, help='停止时等待处理中请求的秒数')
+@click.option('--config', 'config_name', default=None, help='配置名（默认读取 FLASK_CONFIG，未设置时为 production）')
+def serve(bind, workers, threads, max_requests, max_requests_jitter, graceful_timeout, config_name):
+    """预加载应用并以多进程 × 线程池方式提供服务"""
+    from app import create_app
+    from app.server import serve as run_server
+    from app.services import templating
+
+    # 主进程中创建一次应用，worker fork 后直接复用
+    app = create_app(config_name or os.environ.get('FLASK_CONFIG') or 'production')
+    # fork 之前编译全部模板：worker 共享编译结果，第一个请求不再编译
+    templating.warm_templates(app)
+    run_server(app, bind=bind, workers=workers, threads=threads, max_requests=max_requests,
+               max_requests_jitter=max_requests_jitter, graceful_timeout=graceful_timeout)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+# app/cli.py
+# Flask 命令行：flask catalog / assets / jobs / media <子命令>
+
+import click
+from flask.cli import AppGroup
+from app import db
+
+catalog_cli = AppGroup('catalog', help='产品目录维护命令')
+assets_cli = AppGroup('assets', help='静态资源构建命令')
+jobs_cli = AppGroup('jobs', help='后台任务队列')
+media_cli = AppGroup('media', help='媒体库维护命令')
+
+
+@catalog_cli.command('sync-series')
+def sync_series_command():
+    """从 Product.featured_series 重建精选系列表与关联表"""
+    from app.services.series import sync_all_series
+
+    series_count, link_count = sync_all_series()
+    db.session.commit()
+    click.echo(f'精选系列同步完成：{series_count} 个系列，{link_count} 条产品关联')
+
+
+@catalog_cli.command('sync-photos')
+@click.option('--no-analyze', is_flag=True, help='只同步文件名，不读取图片（尺寸、主色调留给 photos.analyze 任务）')
+def sync_photos_command(no_analyze):
+    """从 Product.image / photos 重建产品图片表，并读取尚未分析的图片"""
+    from app.services.photos import analyze_photos, sync_all_photos
+
+    product_count, photo_count = sync_all_photos()
+    db.session.commit()
+    click.echo(f'产品图片同步完成：{product_count} 个产品，{photo_count} 张图片')
+    if not no_analyze:
+        analyzed = analyze_photos()
+        db.session.commit()
+        click.echo(f'已分析 {analyzed} 个图片文件（尺寸、主色调、哈希）')
+
+
+@catalog_cli.command('reindex-search')
+def reindex_search_command():
+    """全量重建产品全文搜索索引（FTS5）"""
+    from app.services.search import create_search_index, rebuild_search_index
+
+    connection = db.session.connection()
+    create_search_index(connection)
+    count = rebuild_search_index(connection)
+    db.session.commit()
+    click.echo(f'全文搜索索引重建完成：{count} 个产品')
+
+
+@catalog_cli.command('reindex-dimensions')
+def reindex_dimensions_command():
+    """全量重建产品尺寸索引（R*Tree）"""
+    from app.services.dimensions import create_dimension_index, rebuild_dimension_index
+
+    connection = db.session.connection()
+    create_dimension_index(connection)
+    count = rebuild_dimension_index(connection)
+    db.session.commit()
+    click.echo(f'尺寸索引重建完成：{count} 个产品（长宽高齐全）')
+
+
+@catalog_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default=None,
+              help='文件格式（默认按扩展名判断）')
+@click.option('--batch-size', type=int, default=None, help='每批（每个事务）插入的行数（默认 IMPORT_BATCH_SIZE）')
+@click.option('--create-categories', is_flag=True, help='自动创建文件中出现的新分类')
+@click.option('--dry-run', is_flag=True, help='只校验，不写入数据库')
+def import_command(path, fmt, batch_size, create_categories, dry_run):
+    """从 CSV / JSONL 文件批量导入产品（流式读取，分批提交）"""
+    from flask import current_app
+    from app.services.importer import detect_format, import_file
+
+    batch_size = batch_size or current_app.config['IMPORT_BATCH_SIZE']
+
+    def progress(report):
+        click.echo(f'  已处理 {report.rows} 行，导入 {report.inserted}，失败 {report.failed}'
+                   f'（{report.elapsed:.1f}s）')
+
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        report = import_file(stream, fmt or detect_format(path), batch_size=batch_size,
+                             create_categories=create_categories, dry_run=dry_run, progress=progress)
+
+    for line_no, message in report.errors:
+        click.echo(f'第 {line_no} 行: {message}', err=True)
+    if report.failed > len(report.errors):
+        click.echo(f'……其余 {report.failed - len(report.errors)} 条错误未显示', err=True)
+
+    action = '校验完成（未写入）' if dry_run else '导入完成'
+    click.echo(f'{action}：共 {report.rows} 行，成功 {report.inserted}，失败 {report.failed}，'
+               f'新建分类 {report.categories_created}，耗时 {report.elapsed:.1f}s')
+
+
+@assets_cli.command('build')
+def build_assets_command():
+    """计算 static/css、static/js 的内容哈希并写入清单文件（部署时执行）"""
+    from flask import current_app
+    from app.services.assets import AssetManifest
+
+    manifest = AssetManifest(current_app.static_folder, current_app.config['ASSET_DIRS'])
+    digests = manifest.build()
+    manifest.save(current_app.config['ASSET_MANIFEST_PATH'])
+    click.echo(f'静态资源清单已生成：{len(digests)} 个文件 -> {current_app.config["ASSET_MANIFEST_PATH"]}')
+
+
+@assets_cli.command('themes')
+def build_themes_command():
+    """把 base.css + variables.css + 各主题合并压缩为每主题一个 bundle，并抽取首屏 CSS（部署时在 build 之前执行）"""
+    from flask import current_app
+    from app.services.themes import ThemeRegistry
+
+    registry = ThemeRegistry(current_app.static_folder)
+    registry.scan()
+    sizes = registry.build(current_app.config['THEME_CRITICAL_SELECTORS'])
+    for name, (original, minified) in sizes.items():
+        click.echo(f'  {name:<12} {original:>7} -> {minified:>7} 字节')
+    click.echo(f'主题 bundle 已生成：{len(sizes)} 个主题')
+
+
+@assets_cli.command('compress')
+@click.option('--force', is_flag=True, help='忽略已有的压缩文件，全部重新生成')
+def compress_assets_command(force):
+    """为 static/css、static/js 生成预压缩的 .gz（安装 brotli 时还有 .br）文件（部署时执行）"""
+    from flask import current_app
+    from app.services.compression import brotli, compress_static
+
+    written, skipped = compress_static(current_app.static_folder, current_app.config['ASSET_DIRS'],
+                                       current_app.config['COMPRESS_STATIC_SUFFIXES'], force=force)
+    formats = '.gz / .br' if brotli else '.gz（未安装 brotli，不生成 .br）'
+    click.echo(f'预压缩完成：生成 {written} 个 {formats} 文件，{skipped} 个已是最新')
+
+
+@jobs_cli.command('worker')
+@click.option('--processes', '-p', default=1, show_default=True, help='worker 进程数')
+@click.option('--burst', is_flag=True, help='执行完当前到期的任务后退出')
+def jobs_worker_command(processes, burst):
+    """启动任务 worker（SIGTERM / Ctrl+C：执行中的任务完成后退出）"""
+    from flask import current_app
+    from app.services.jobs import run_workers
+
+    run_workers(current_app._get_current_object(), processes=processes, burst=burst)
+
+
+@jobs_cli.command('status')
+def jobs_status_command():
+    """各状态的任务数与最近的失败任务"""
+    from app.models import Job
+    from app.services.jobs import FAILED, counts
+
+    for status, count in sorted(counts().items()):
+        click.echo(f'{status:<8} {count}')
+    failed = Job.query.filter_by(status=FAILED).order_by(Job.finished_at.desc()).limit(10).all()
+    for job in failed:
+        click.echo(f'#{job.id} {job.kind}（{job.attempts} 次）: {job.last_error}', err=True)
+
+
+@jobs_cli.command('retry')
+@click.argument('job_ids', nargs=-1, type=int)
+def jobs_retry_command(job_ids):
+    """重新排队失败的任务（不指定 id 时为全部失败任务）"""
+    from app.services.jobs import retry_failed
+
+    click.echo(f'已重新排队 {retry_failed(job_ids)} 个任务')
+
+
+@media_cli.command('migrate')
+def media_migrate_command():
+    """把 static/uploads 下旧文件名的产品图与 Logo 导入媒体库并改写数据库（原文件保留）"""
+    from app.services.media import migrate_legacy
+
+    products, files = migrate_legacy()
+    click.echo(f'媒体库迁移完成：导入 {files} 个文件，改写 {products} 个产品')
+
+
+@media_cli.command('gc')
+@click.option('--recount', is_flag=True, help='先按产品与设置表全量重建引用计数（批量 SQL 修改图片之后）')
+@click.option('--grace', type=int, default=None, help='无引用对象的保留秒数（默认 MEDIA_GC_GRACE）')
+def media_gc_command(recount, grace):
+    """删除没有任何产品 / Logo 引用的媒体文件"""
+    from app.services.media import collect_garbage, recount_refs
+
+    if recount:
+        click.echo(f'引用计数已重建：{recount_refs()} 条引用')
+        db.session.commit()
+    count, size = collect_garbage(grace)
+    click.echo(f'已删除 {count} 个无引用文件，释放 {size / 1024 / 1024:.1f}MB')
+
+
+def init_app(app):
+    app.cli.add_command(catalog_cli)
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(media_cli)
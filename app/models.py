@@ -1,6 +1,7 @@
 from app import db
 from datetime import datetime
 from flask_login import UserMixin
+from sqlalchemy import event
 
 # 用户表（后台登录用）
 class User(db.Model, UserMixin):
@@ -35,6 +36,79 @@ class Settings(db.Model):
     seo_contact_description = db.Column(db.Text, default='Contact {company_name} for custom hotel furniture solutions, quotes, and partnership opportunities.')
 
 
+# 缓存版本计数器（多进程缓存一致性）
+# 每个命名缓存一行，写入方在同一事务中 +1，各进程发现版本变化即丢弃本地缓存
+class CacheVersion(db.Model):
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+# 命名序列（产品编号等）：各进程按号段预留，next_value 为下一个未分配的序号
+# 见 services/product_codes.py
+class CodeSequence(db.Model):
+    name = db.Column(db.String(50), primary_key=True)
+    next_value = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+# 缓存失效日志：写入方在同一事务中记录受影响的缓存标签（如 product:12、catalog），
+# 各 worker 定期读取新增记录，精确失效本进程缓存（见 services/changes.py）
+class CacheInvalidation(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    tag = db.Column(db.String(100), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+# 后台任务队列（见 services/jobs.py）：worker 进程用一条 UPDATE 原子领取到期的 queued 任务，
+# 失败后按指数退避重新排队；(status, run_at) 索引覆盖领取查询
+class Job(db.Model):
+    __table_args__ = (
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)        # 任务名，如 logo.process
+    payload = db.Column(db.Text)                           # JSON 参数
+    status = db.Column(db.String(10), nullable=False, default='queued')  # queued / running / done / failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # 最早执行时间（重试时推后）
+    locked_by = db.Column(db.String(64))                   # 正在执行的 worker
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    result = db.Column(db.Text)                            # JSON 返回值
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+
+# 内容寻址媒体库（见 services/media.py）：文件按 SHA-256 存储，相同内容只存一份
+# 文件名 <sha256>.<扩展名> 直接写入 Product.image / photos、Settings.logo
+class MediaObject(db.Model):
+    sha256 = db.Column(db.String(64), primary_key=True)
+    ext = db.Column(db.String(10), nullable=False)
+    mimetype = db.Column(db.String(50), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    # 引用数（= media_ref 中的行数），为 0 且超过宽限期的对象由 flask media gc 删除
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @property
+    def name(self):
+        return f'{self.sha256}.{self.ext}'
+
+
+# 媒体引用：哪个产品 / Logo 使用了哪个对象（同一对象被多处引用时各记一行）
+class MediaRef(db.Model):
+    __table_args__ = (
+        db.Index('ix_media_ref_sha256', 'sha256'),
+    )
+
+    owner_type = db.Column(db.String(20), primary_key=True)   # product / logo
+    owner_id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), db.ForeignKey('media_object.sha256'), primary_key=True)
+
+
 # 主分类（酒店家具英文分类）
 class Category(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -42,6 +116,11 @@ class Category(db.Model):
 
 
 class Product(db.Model):
+    # (created_at, id) 复合索引：前台/后台列表按时间倒序的键集分页
+    __table_args__ = (
+        db.Index('ix_product_created_at_id', 'created_at', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     
     # 新增：产品编号，格式 pc + 9位数字（如 pc284539245），唯一且必填
@@ -73,6 +152,62 @@ class Product(db.Model):
     applicable_space = db.Column(db.String(200))
     
     category_id = db.Column(db.Integer, db.ForeignKey('category.id'))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # 键集分页的排序键，必填（旧数据库由 init_schema 回填后重建表）
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # 最后修改时间（sitemap 的 lastmod）；批量 SQL 更新需自行设置
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     category = db.relationship('Category', backref='products')
+
+
+# 产品图片（由 Product.image + Product.photos 同步生成，见 services/photos.py）
+# position 0 为封面（主图），其余为画廊图片；主键 (product_id, position) 覆盖列表页批量取封面
+class ProductPhoto(db.Model):
+    __table_args__ = (
+        db.Index('ix_product_photo_sha256', 'sha256'),
+    )
+
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id', ondelete='CASCADE'), primary_key=True)
+    position = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(200), nullable=False)   # 媒体库文件名或 uploads/products 下的旧文件名
+    alt = db.Column(db.String(200))
+    # 以下由 photos.analyze 任务读取图片后填写（媒体库文件同步时直接从 media_object 复制）
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    size = db.Column(db.Integer)                           # 字节
+    dominant_color = db.Column(db.String(7))               # '#a1b2c3'，图片加载前的占位背景色
+    sha256 = db.Column(db.String(64))
+
+
+# 产品 ↔ 精选系列 关联表（由 Product.featured_series 同步生成）
+# 主键 (product_id, series_id) 覆盖按产品查系列，(series_id, product_id) 索引覆盖系列页
+product_series = db.Table(
+    'product_series',
+    db.Column('product_id', db.Integer, db.ForeignKey('product.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('series_id', db.Integer, db.ForeignKey('series.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_product_series_series_product', 'series_id', 'product_id'),
+)
+
+
+# 精选系列
+class Series(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+
+    # 预计算字段：精选首页直接展示，无需加载全部产品（由 services/series.py 刷新）
+    product_count = db.Column(db.Integer, nullable=False, default=0)
+    cover_image = db.Column(db.String(200))
+
+    products = db.relationship('Product', secondary=product_series, backref='series', lazy='dynamic')
+
+
+# ====================== SQLite 专用索引（FTS5 全文搜索、R*Tree 尺寸索引） ======================
+# db.create_all() 之后创建虚拟表与同步触发器；语句均为 IF NOT EXISTS，可重复执行
+@event.listens_for(db.metadata, 'after_create')
+def _create_sqlite_indexes(target, connection, **kw):
+    if connection.dialect.name != 'sqlite':
+        return
+    from app.services.dimensions import create_dimension_index
+    from app.services.search import create_search_index
+    create_search_index(connection)
+    create_dimension_index(connection)
@@ -0,0 +1,16 @@
+# app/routes/admin/jobs.py
+
+from flask import Blueprint, jsonify
+from flask_login import login_required
+from app.services import jobs
+
+jobs_bp = Blueprint('jobs', __name__, url_prefix='/jobs')
+
+@jobs_bp.route('/<int:job_id>')
+@login_required
+def job_status(job_id):
+    """后台任务状态（JSON），页面轮询显示处理进度"""
+    data = jobs.status(job_id)
+    if data is None:
+        return jsonify(error='任务不存在'), 404
+    return jsonify(data)
@@ -2,13 +2,16 @@
 
 from flask import Blueprint, render_template, redirect, url_for
 from flask_login import login_required, logout_user
+from app.services import instrumentation
 
 main_bp = Blueprint('main', __name__)
 
 @main_bp.route('/')
 @login_required
 def index():
-    return render_template('admin/index.html')
+    # 性能埋点开启时展示本进程各端点的耗时汇总
+    perf = instrumentation.summary() if instrumentation.enabled() else None
+    return render_template('admin/index.html', perf=perf)
 
 @main_bp.route('/login', methods=['GET', 'POST'])
 def login():
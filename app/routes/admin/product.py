@@ -1,30 +1,172 @@
 # app/routes/admin/product.py
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
+from flask import (Blueprint, Response, render_template, request, redirect, url_for, flash, current_app,
+                   stream_with_context)
 from flask_login import login_required
 from app.models import Product, Category
 from app import db
+from app.services import bulk, counts, jobs, photos, product_codes
+from app.services.pagination import decode_cursor, encode_cursor, keyset_page, keyset_page_before, page_size
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload
+from datetime import datetime
+import io
 import os
-import random
-import string
 
 product_bp = Blueprint('product', __name__, url_prefix='/products')
 
 def generate_product_code():
-    while True:
-        digits = ''.join(random.choices(string.digits, k=9))
-        code = f"pc{digits}"
-        if not Product.query.filter_by(product_code=code).first():
-            return code
+    # 从本进程预留的号段中取号，通常不访问数据库（见 services/product_codes.py）
+    return product_codes.generate_code()
+
+def _list_filters():
+    """列表筛选：?category=<分类 id>（0 = 未分类）、?photos=none（没有任何图片），返回 (条件列表, URL 参数)"""
+    filters, args = [], {}
+    category_id = request.args.get('category', type=int)
+    if category_id is not None:
+        filters.append(Product.category_id == category_id if category_id else Product.category_id.is_(None))
+        args['category'] = category_id
+    if request.args.get('photos') == 'none':
+        filters.append(photos.without_photos())
+        args['photos'] = 'none'
+    return filters, args
 
 @product_bp.route('/')
-@product_bp.route('/page/<int:page>')
 @login_required
-def product_list(page=1):
-    pagination = Product.query.order_by(Product.created_at.desc()).paginate(
-        page=page, per_page=10, error_out=False)
-    products = pagination.items
-    return render_template('admin/product_list.html', products=products, pagination=pagination)
+def product_list():
+    """键集分页（cursor = 下一页、before = 上一页），总数为缓存的近似值"""
+    config = current_app.config
+    per_page = page_size(config['ADMIN_PRODUCTS_PER_PAGE'], config['ADMIN_PRODUCTS_MAX_PER_PAGE'])
+    filters, list_args = _list_filters()
+    if request.args.get('per_page'):
+        list_args['per_page'] = per_page
+    query = Product.query.options(joinedload(Product.category)).filter(*filters)
+
+    before = decode_cursor(request.args.get('before'))
+    if before is not None:
+        products, has_prev = keyset_page_before(query, per_page, before)
+        next_cursor = encode_cursor(products[-1].created_at, products[-1].id) if products else None
+    else:
+        cursor = decode_cursor(request.args.get('cursor'))
+        products, next_cursor = keyset_page(query, per_page, cursor)
+        has_prev = cursor is not None
+    prev_cursor = encode_cursor(products[0].created_at, products[0].id) if has_prev and products else None
+
+    total = counts.approximate_count(('admin.products', tuple(sorted(list_args.items()))),
+                                     select(Product.id).where(*filters))
+    return render_template('admin/product_list.html', products=products, total=total,
+                           list_args=list_args, next_cursor=next_cursor, prev_cursor=prev_cursor,
+                           missing_photos=list_args.get('photos') == 'none',
+                           categories=Category.query.order_by(Category.name).all(),
+                           series_names=bulk.series_names())
+
+@product_bp.route('/bulk', methods=['POST'])
+@login_required
+def product_bulk():
+    """批量操作：勾选的产品在一个事务中用集合式 SQL 处理（见 services/bulk.py）"""
+    back = request.form.get('next') or ''
+    if not back.startswith('/admin/'):
+        back = url_for('admin.product.product_list')
+    product_ids = list(dict.fromkeys(request.form.getlist('ids', type=int)))
+    action = request.form.get('action')
+    if not product_ids:
+        flash('请先勾选要操作的产品', 'warning')
+        return redirect(back)
+    if len(product_ids) > current_app.config['ADMIN_BULK_MAX']:
+        flash(f"一次最多操作 {current_app.config['ADMIN_BULK_MAX']} 个产品", 'warning')
+        return redirect(back)
+
+    if action == 'export':
+        filename = f"products-{datetime.utcnow():%Y%m%d-%H%M%S}.csv"
+        return Response(stream_with_context(bulk.export_csv(product_ids)), mimetype='text/csv',
+                        headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+    try:
+        if action == 'recategorize':
+            category_id = request.form.get('category_id', type=int) or None
+            if category_id and db.session.get(Category, category_id) is None:
+                flash('分类不存在', 'danger')
+                return redirect(back)
+            message = f'已修改 {bulk.recategorize(product_ids, category_id)} 个产品的分类'
+        elif action in ('add_series', 'replace_series'):
+            names = request.form.get('series', '')
+            if action == 'add_series' and not names.strip():
+                flash('请填写系列名称', 'warning')
+                return redirect(back)
+            count = bulk.assign_series(product_ids, names, replace=action == 'replace_series')
+            message = f'已更新 {count} 个产品的精选系列'
+        elif action == 'delete':
+            message = f'已删除 {bulk.delete_products(product_ids)} 个产品'
+        else:
+            flash('未知的批量操作', 'danger')
+            return redirect(back)
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.exception('批量操作失败')
+        flash(f'批量操作失败，未做任何修改：{e.__class__.__name__}', 'danger')
+        return redirect(back)
+
+    flash(message, 'success')
+    return redirect(back)
+
+@product_bp.route('/import', methods=['GET', 'POST'])
+@login_required
+def product_import():
+    """上传 CSV / JSONL 批量导入产品"""
+    from app.services.importer import detect_format, import_file
+
+    report = None
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash('请选择要导入的文件', 'warning')
+            return redirect(url_for('admin.product.product_import'))
+
+        fmt = request.form.get('format') or detect_format(upload.filename)
+        last_id = db.session.execute(select(func.max(Product.id))).scalar() or 0
+        # 上传流直接按行读取，不整体读入内存
+        stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+        try:
+            report = import_file(stream, fmt,
+                                 batch_size=current_app.config['IMPORT_BATCH_SIZE'],
+                                 create_categories=bool(request.form.get('create_categories')),
+                                 dry_run=bool(request.form.get('dry_run')))
+        except (UnicodeDecodeError, ValueError) as e:
+            db.session.rollback()
+            flash(f'文件无法读取：{e}', 'danger')
+            return redirect(url_for('admin.product.product_import'))
+
+        if report.inserted and not request.form.get('dry_run'):
+            queued = _enqueue_derivatives(last_id)
+            # 新产品图片的尺寸与主色调（页面占位用）
+            jobs.enqueue('photos.analyze')
+            db.session.commit()
+            if queued:
+                flash(f'{queued} 张产品图的缩略图已加入后台任务队列', 'info')
+
+        if report.failed:
+            flash(f'导入完成：成功 {report.inserted} 行，失败 {report.failed} 行', 'warning')
+        else:
+            flash(f'导入完成：成功 {report.inserted} 行', 'success')
+
+    return render_template('admin/product_import.html', report=report)
+
+def _enqueue_derivatives(after_id, chunk_size=100):
+    """为新导入产品（id > after_id）的图片入队衍生图生成任务，返回图片数"""
+    filenames = set()
+    rows = db.session.execute(select(Product.image, Product.photos).where(Product.id > after_id))
+    for image, photos in rows:
+        if image:
+            filenames.add(image.strip())
+        filenames.update(photo.strip() for photo in (photos or '').split(',') if photo.strip())
+    filenames.discard('')
+    filenames = sorted(filenames)
+    for start in range(0, len(filenames), chunk_size):
+        jobs.enqueue('images.derivatives', filenames=filenames[start:start + chunk_size])
+    db.session.commit()
+    return len(filenames)
 
 @product_bp.route('/add', methods=['GET', 'POST'])
 @login_required
@@ -1,11 +1,10 @@
 # app/routes/admin/site_info.py
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required
 from app.models import Settings
 from app import db
-import os
-from PIL import Image
+from app.services import jobs, logo, media, settings_cache, themes  # noqa: F401  logo 注册 logo.process 任务
 
 site_info_bp = Blueprint('site_info', __name__, url_prefix='/settings')
 
@@ -16,21 +15,20 @@ def settings():
     if not settings:
         settings = Settings()
         db.session.add(settings)
+        settings_cache.invalidate()
         db.session.commit()
 
-    themes_dir = os.path.join(current_app.root_path, 'static', 'css', 'themes')
-    theme_files = ['default']
-    try:
-        if os.path.exists(themes_dir) and os.path.isdir(themes_dir):
-            for f in os.listdir(themes_dir):
-                if f.endswith('.css') and f != 'variables.css':
-                    theme_files.append(f[:-4])
-            theme_files.sort()
-    except Exception as e:
-        current_app.logger.error(f"读取主题失败: {e}")
+    # 主题列表来自启动时扫描的注册表；新增主题文件后点“刷新主题列表”
+    if request.method == 'POST' and request.form.get('reload_themes'):
+        theme_files = themes.reload()
+        db.session.commit()
+        flash(f'主题列表已刷新：共 {len(theme_files)} 个主题', 'success')
+        return redirect(url_for('admin.site_info.settings'))
+    theme_files = themes.theme_names()
 
     if settings.theme and settings.theme not in theme_files:
         settings.theme = 'default'
+        settings_cache.invalidate()
         db.session.commit()
 
     if request.method == 'POST':
@@ -54,36 +52,25 @@ def settings():
             settings.seo_contact_title = request.form.get('seo_contact_title', '')
             settings.seo_contact_description = request.form.get('seo_contact_description', '')
 
-            # Logo 处理
+            # Logo：这里只把文件存入媒体库并入队，解码校验、替换 Logo 由后台任务完成（services/logo.py）
+            logo_job = None
             logo_file = request.files.get('logo')
             if logo_file and logo_file.filename:
-                upload_folder = os.path.join(current_app.root_path, 'static', 'uploads', 'logo')
-                os.makedirs(upload_folder, exist_ok=True)
-                ext = logo_file.filename.rsplit('.', 1)[-1].lower() if '.' in logo_file.filename else 'png'
-                temp_path = os.path.join(upload_folder, f'temp_company_logo.{ext}')
-                logo_file.save(temp_path)
                 try:
-                    with Image.open(temp_path) as img:
-                        if img.width > 600 or img.height > 300:
-                            os.remove(temp_path)
-                            flash('Logo 尺寸超过 600×300，请重新上传！', 'danger')
-                        else:
-                            final_path = os.path.join(upload_folder, 'company_logo')
-                            if os.path.exists(final_path):
-                                os.remove(final_path)
-                            os.rename(temp_path, final_path)
-                            settings.logo = 'company_logo'
-                            flash('Logo 更新成功！', 'success')
-                except Exception as e:
-                    if os.path.exists(temp_path):
-                        os.remove(temp_path)
-                    flash(f'图片处理失败：{e}', 'danger')
+                    stored = media.store_upload(logo_file)
+                except media.MediaError as e:
+                    flash(f'Logo 上传失败：{e}', 'danger')
+                else:
+                    logo_job = jobs.enqueue('logo.process', name=stored.name)
 
+            # 与设置一起提交缓存版本号，所有 worker 的 Settings 缓存随之失效
+            settings_cache.invalidate()
             db.session.commit()
             flash('网站设置保存成功！', 'success')
-            return redirect(url_for('admin.site_info.settings'))
+            return redirect(url_for('admin.site_info.settings', logo_job=logo_job.id if logo_job else None))
         except Exception as e:
             db.session.rollback()
             flash(f'保存失败：{e}', 'danger')
 
-    return render_template('admin/settings.html', settings=settings, theme_files=theme_files)
+    return render_template('admin/settings.html', settings=settings, theme_files=theme_files,
+                           logo_job=request.args.get('logo_job', type=int))
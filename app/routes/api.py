@@ -0,0 +1,254 @@
+# app/routes/api.py
+"""
+只读 JSON 目录接口（供合作酒店的采购系统对接，替代抓取 HTML）
+
+    GET /api/v1/products                产品列表（游标分页）
+    GET /api/v1/products/<product_code> 单个产品
+    GET /api/v1/categories              分类（含产品数）
+    GET /api/v1/series                  精选系列（游标分页）
+
+- fields=：只查询并返回所需的列，如 ?fields=product_code,name,length,width,height
+- 筛选：category=<id>、series=<系列名>、base_material=、surface_material=、
+  applicable_space=（包含该空间）、updated_since=<ISO 时间>（增量同步）
+- 分页：按 id 升序，limit=（默认 API_PAGE_SIZE，上限 API_MAX_PAGE_SIZE），
+  响应中的 next_cursor 原样作为下一次请求的 cursor=；没有更多数据时为 null
+- 直接从查询结果的行元组生成 JSON，不构造 ORM 对象
+- 与前台页面共用整页缓存（随产品变更精确失效）；响应带 ETag，If-None-Match 命中返回 304；
+  客户端支持时压缩（见 services/compression.py）
+"""
+import base64
+import binascii
+from datetime import datetime, timezone
+
+from flask import Blueprint, abort, current_app, jsonify, request, url_for
+from sqlalchemy import func, literal, select
+from werkzeug.exceptions import HTTPException
+
+from app import db
+from app.models import Category, Product, Series, product_series
+from app.services import media
+from app.services.changes import TAG_CATALOG
+from app.services.response_cache import add_cache_tags, cached_page
+
+api_bp = Blueprint('api', __name__)
+
+# 可选字段 -> 查询列（url / image_url 由其他列计算）
+PRODUCT_FIELDS = {
+    'id': Product.id,
+    'product_code': Product.product_code,
+    'name': Product.name,
+    'description': Product.description,
+    'category_id': Product.category_id,
+    'category': Category.name,
+    'image': Product.image,
+    'photos': Product.photos,
+    'length': Product.length,
+    'width': Product.width,
+    'height': Product.height,
+    'seat_height': Product.seat_height,
+    'base_material': Product.base_material,
+    'surface_material': Product.surface_material,
+    'featured_series': Product.featured_series,
+    'applicable_space': Product.applicable_space,
+    'created_at': Product.created_at,
+    'updated_at': Product.updated_at,
+    'url': Product.id,
+    'image_url': Product.image,
+}
+DEFAULT_PRODUCT_FIELDS = ('id', 'product_code', 'name', 'category', 'length', 'width', 'height',
+                          'seat_height', 'base_material', 'surface_material', 'applicable_space',
+                          'featured_series', 'updated_at', 'url', 'image_url')
+
+# ====================== 错误与 ETag ======================
+@api_bp.errorhandler(HTTPException)
+def api_error(e):
+    return jsonify(error=e.name, message=e.description), e.code
+
+
+@api_bp.after_request
+def add_etag(response):
+    # 整页缓存关闭时（或未经缓存的响应）也提供 ETag 与 304；压缩由 services/compression.py 统一处理
+    if response.status_code == 200 and not response.direct_passthrough and response.get_etag()[0] is None:
+        response.add_etag()
+        response.make_conditional(request)
+    return response
+
+
+# ====================== 参数解析 ======================
+def _encode_cursor(last_id):
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(token):
+    if not token:
+        return None
+    try:
+        return int(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        abort(400, description='Invalid cursor.')
+
+
+def _paginate(rows, limit, endpoint):
+    """多取的一行用来判断是否有下一页：返回 (本页行, 下一页游标, 下一页 URL)"""
+    if len(rows) <= limit:
+        return rows, None, None
+    rows = rows[:limit]
+    cursor = _encode_cursor(rows[-1][0])
+    args = request.args.to_dict()
+    args['cursor'] = cursor
+    return rows, cursor, url_for(endpoint, _external=True, **args)
+
+
+def _limit():
+    default = current_app.config['API_PAGE_SIZE']
+    value = request.args.get('limit', default, type=int)
+    return max(1, min(value, current_app.config['API_MAX_PAGE_SIZE']))
+
+
+def _fields():
+    raw = request.args.get('fields')
+    if not raw:
+        return list(DEFAULT_PRODUCT_FIELDS)
+    fields = list(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in PRODUCT_FIELDS]
+    if unknown:
+        abort(400, description=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(PRODUCT_FIELDS)}")
+    return fields
+
+
+def _product_filters():
+    args = request.args
+    filters = []
+    if args.get('category'):
+        category_id = args.get('category', type=int)
+        if category_id is None:
+            abort(400, description='category must be a category id.')
+        filters.append(Product.category_id == category_id)
+    for name in ('base_material', 'surface_material'):
+        if args.get(name):
+            filters.append(PRODUCT_FIELDS[name] == args[name])
+    if args.get('applicable_space'):
+        # 逗号分隔的多值字段：按完整的值匹配（lobby 不会匹配 lobby bar）
+        spaces = literal(',') + func.replace(func.replace(Product.applicable_space, ', ', ','), ' ,', ',') + ','
+        filters.append(spaces.contains(f",{args['applicable_space'].strip()},", autoescape=True))
+    if args.get('series'):
+        filters.append(Product.id.in_(
+            select(product_series.c.product_id)
+            .join(Series, Series.id == product_series.c.series_id)
+            .where(Series.name == args['series'])
+        ))
+    if args.get('updated_since'):
+        try:
+            since = datetime.fromisoformat(args['updated_since'])
+        except ValueError:
+            abort(400, description='updated_since must be an ISO 8601 time, e.g. 2024-01-31T08:00:00Z.')
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)  # 数据库中为不带时区的 UTC 时间
+        filters.append(func.coalesce(Product.updated_at, Product.created_at) >= since)
+    return filters
+
+
+# ====================== 序列化 ======================
+def _product_query(fields):
+    columns = {name: PRODUCT_FIELDS[name] for name in fields}
+    # 游标分页需要 id；未请求时只查询不输出
+    query = select(Product.id.label('_id'), *(column.label(name) for name, column in columns.items()))
+    if 'category' in columns:
+        query = query.outerjoin(Category, Category.id == Product.category_id)
+    return query
+
+
+def _row_serializer(fields):
+    """行元组 -> dict；预先为每个字段选好转换函数，逐行只做取值"""
+    # 产品详情与图片 URL 只有 id / 文件名不同：生成一次模板
+    placeholder = 987654321
+    detail_prefix, _, detail_suffix = url_for(
+        'products.product_detail', product_id=placeholder, _external=True).partition(str(placeholder))
+    image_url = media.url_builder(_external=True)
+
+    converters = []
+    for index, name in enumerate(fields, start=1):
+        if name == 'url':
+            convert = lambda value: f'{detail_prefix}{value}{detail_suffix}'
+        elif name == 'image_url':
+            convert = image_url
+        elif name == 'photos':
+            convert = lambda value: [photo.strip() for photo in value.split(',') if photo.strip()] if value else []
+        elif name in ('created_at', 'updated_at'):
+            convert = lambda value: value.isoformat() + 'Z' if value else None
+        else:
+            convert = None
+        converters.append((name, index, convert))
+
+    def serialize(row):
+        return {name: convert(row[index]) if convert else row[index] for name, index, convert in converters}
+    return serialize
+
+
+# ====================== 路由 ======================
+@api_bp.route('/products')
+@cached_page
+def products():
+    add_cache_tags(TAG_CATALOG)
+    fields = _fields()
+    limit = _limit()
+    after = _decode_cursor(request.args.get('cursor'))
+
+    query = _product_query(fields).where(*_product_filters())
+    if after is not None:
+        query = query.where(Product.id > after)
+    rows = db.session.execute(query.order_by(Product.id).limit(limit + 1)).all()
+
+    rows, next_cursor, next_url = _paginate(rows, limit, 'api.products')
+    serialize = _row_serializer(fields)
+    return jsonify(data=[serialize(row) for row in rows], next_cursor=next_cursor, next=next_url)
+
+
+@api_bp.route('/products/<product_code>')
+@cached_page
+def product(product_code):
+    fields = _fields()
+    row = db.session.execute(
+        _product_query(fields).where(Product.product_code == product_code.strip().lower())
+    ).first()
+    if row is None:
+        add_cache_tags(TAG_CATALOG)  # 之后新增该编号的产品时失效
+        abort(404, description=f'No product with code {product_code}.')
+    add_cache_tags(f'product:{row[0]}')
+    return jsonify(data=_row_serializer(fields)(row))
+
+
+@api_bp.route('/categories')
+@cached_page
+def categories():
+    add_cache_tags(TAG_CATALOG)
+    counts = (select(Product.category_id, func.count().label('product_count'))
+              .group_by(Product.category_id).subquery())
+    rows = db.session.execute(
+        select(Category.id, Category.name, func.coalesce(counts.c.product_count, 0))
+        .outerjoin(counts, counts.c.category_id == Category.id)
+        .order_by(Category.id)
+    ).all()
+    return jsonify(data=[{'id': id_, 'name': name, 'product_count': count} for id_, name, count in rows])
+
+
+@api_bp.route('/series')
+@cached_page
+def series():
+    add_cache_tags(TAG_CATALOG)
+    limit = _limit()
+    after = _decode_cursor(request.args.get('cursor'))
+    query = select(Series.id, Series.name, Series.product_count, Series.cover_image).where(Series.product_count > 0)
+    if after is not None:
+        query = query.where(Series.id > after)
+    rows = db.session.execute(query.order_by(Series.id).limit(limit + 1)).all()
+
+    rows, next_cursor, next_url = _paginate(rows, limit, 'api.series')
+    image_url = media.url_builder(_external=True)
+    return jsonify(data=[{
+        'id': id_,
+        'name': name,
+        'product_count': count,
+        'url': url_for('featured.series_detail', series_name=name, _external=True),
+        'cover_image_url': image_url(cover),
+    } for id_, name, count, cover in rows], next_cursor=next_cursor, next=next_url)
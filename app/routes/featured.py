@@ -1,17 +1,43 @@
-from flask import Blueprint, render_template
-from app.models import Product
+from flask import Blueprint, render_template, request, url_for, make_response, current_app
+from sqlalchemy.orm import joinedload
+from app.models import Product, Series, product_series
+from app.services.pagination import decode_cursor, keyset_page, page_size
+from app.services.changes import TAG_CATALOG
+from app.services.response_cache import cached_page, add_cache_tags
 
 featured_bp = Blueprint('featured', __name__)
 
 @featured_bp.route('/')
+@cached_page
 def featured_index():
-    # 显示所有产品（或后续过滤有 featured_series 的产品）
-    products = Product.query.all()
-    return render_template('featured/index.html', products=products)
+    add_cache_tags(TAG_CATALOG)
+    # 只读 Series 表：产品数与封面图已预先计算，不再加载全部产品
+    series_list = Series.query.filter(Series.product_count > 0).order_by(Series.name).all()
+    return render_template('featured/index.html', series_list=series_list)
 
-# 可添加具体系列页面（基于字符串匹配）
+# 具体系列页面：按系列名走唯一索引，再经 product_series 索引 JOIN 取产品
 @featured_bp.route('/<series_name>')
+@cached_page
 def series_detail(series_name):
-    # 过滤包含该系列名的产品（逗号分隔）
-    products = Product.query.filter(Product.featured_series.like(f'%{series_name}%')).all()
-    return render_template('featured/series.html', products=products, series_name=series_name)
\ No newline at end of file
+    add_cache_tags(TAG_CATALOG)
+    series = Series.query.filter_by(name=series_name).first_or_404()
+
+    per_page = page_size(current_app.config['PRODUCTS_PER_PAGE'], current_app.config['PRODUCTS_MAX_PER_PAGE'])
+    query = (Product.query
+             .join(product_series, product_series.c.product_id == Product.id)
+             .filter(product_series.c.series_id == series.id)
+             .options(joinedload(Product.category)))
+    products, next_cursor = keyset_page(query, per_page, decode_cursor(request.args.get('cursor')))
+
+    next_url = None
+    if next_cursor:
+        next_url = url_for('featured.series_detail', series_name=series.name, cursor=next_cursor,
+                           per_page=request.args.get('per_page'))
+
+    if request.args.get('partial'):
+        response = make_response(render_template('partials/product_cards.html', products=products))
+        response.headers['X-Next-Page'] = next_url or ''
+        return response
+
+    return render_template('featured/series.html', products=products, series=series,
+                           series_name=series.name, next_url=next_url)
@@ -0,0 +1,48 @@
+import os
+
+from flask import Blueprint, abort, current_app, redirect, send_file
+from app.services import images, media
+
+media_bp = Blueprint('media', __name__)
+
+# 媒体库原图：/media/o/<sha256>.<扩展名>（内容寻址，永久缓存）
+@media_bp.route('/o/<name>')
+def media_object(name):
+    sha256 = media.parse_name(name)
+    ext = name.rpartition('.')[2]
+    if sha256 is None or ext not in media.MIMETYPES:
+        abort(404)
+    path = media.object_path(name)
+    if not os.path.isfile(path):
+        abort(404)
+    response = send_file(path, mimetype=media.MIMETYPES[ext], etag=sha256,
+                         max_age=current_app.config['MEDIA_MAX_AGE'], conditional=True)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+# 产品图衍生图：/media/products/480/webp/product1.png
+@media_bp.route('/products/<int:width>/<fmt>/<path:filename>')
+def product_image(width, fmt, filename):
+    if width not in current_app.config['IMAGE_WIDTHS'] or fmt not in images.MIMETYPES:
+        abort(404)
+
+    src = images.source_path(filename)
+    if src is None:
+        abort(404)
+
+    try:
+        path, etag = images.get_derivative(src, width, fmt)
+    except images.RenderTimeout:
+        # 生成太慢（超大原图）：先退回原图，衍生图仍在后台继续生成
+        return redirect(media.media_url(filename))
+
+    if media.is_media_name(filename):
+        # 原图内容寻址：衍生图 URL 也永远对应同一内容
+        response = send_file(path, mimetype=images.MIMETYPES[fmt], etag=etag,
+                             max_age=current_app.config['MEDIA_MAX_AGE'], conditional=True)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+    return send_file(path, mimetype=images.MIMETYPES[fmt], etag=etag,
+                     max_age=current_app.config['IMAGE_MAX_AGE'], conditional=True)
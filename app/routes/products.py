@@ -1,15 +1,153 @@
-from flask import Blueprint, render_template
-from app.models import Product, Category
+from dataclasses import asdict
+
+from flask import Blueprint, render_template, request, url_for, make_response, current_app, jsonify, redirect, abort
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from app import db
+from app.models import Product
+from app.services import facets, photos
+from app.services.dimensions import MODES as FIT_MODES, FitQuery, find_fitting
+from app.services.pagination import decode_cursor, keyset_page, page_size
+from app.services.search import search_products
+from app.services.changes import TAG_CATALOG, product_tag, category_tag
+from app.services.response_cache import cached_page, add_cache_tags
 
 products_bp = Blueprint('products', __name__)
 
 @products_bp.route('/')
+@cached_page
 def list_products():
-    categories = Category.query.all()
-    products = Product.query.all()
-    return render_template('products/list.html', categories=categories, products=products)
+    add_cache_tags(TAG_CATALOG)
+    per_page = page_size(current_app.config['PRODUCTS_PER_PAGE'], current_app.config['PRODUCTS_MAX_PER_PAGE'])
+    cursor = decode_cursor(request.args.get('cursor'))
+    selected = facets.selected_from_args(request.args)
+
+    total = None
+    if selected:
+        # 分面筛选：内存位图求交集后按列表顺序取一页 id，再按 id 取回产品
+        ids, next_cursor, total = facets.filter_page(selected, per_page, cursor)
+        by_id = {product.id: product for product in
+                 Product.query.options(joinedload(Product.category)).filter(Product.id.in_(ids))} if ids else {}
+        products = [by_id[product_id] for product_id in ids if product_id in by_id]
+    else:
+        # 分类随产品一次 JOIN 取回，模板中 product.category 不再逐条懒加载
+        query = Product.query.options(joinedload(Product.category))
+        products, next_cursor = keyset_page(query, per_page, cursor)
+
+    next_url = None
+    if next_cursor:
+        next_url = url_for('products.list_products', cursor=next_cursor, per_page=request.args.get('per_page'),
+                           **selected)
+
+    # 无限滚动：只返回卡片片段，下一页地址放在响应头中
+    if request.args.get('partial'):
+        response = make_response(render_template('partials/product_cards.html', products=products))
+        response.headers['X-Next-Page'] = next_url or ''
+        return response
+
+    sidebar = facets.sidebar(selected, current_app.config['FACET_VALUES_LIMIT'])
+    for facet in sidebar:
+        for option in facet['options']:
+            option['url'] = _toggle_url(selected, facet['name'], option['value'])
+    return render_template('products/list.html', products=products, next_url=next_url,
+                           facets=sidebar, selected=selected, total=total,
+                           clear_url=url_for('products.list_products', per_page=request.args.get('per_page')))
+
+def _toggle_url(selected, name, value):
+    """分面选项的链接：未选中时加上该值，已选中时去掉（换筛选条件后从第一页开始）"""
+    args = {key: list(values) for key, values in selected.items()}
+    values = args.setdefault(name, [])
+    if value in values:
+        values.remove(value)
+    else:
+        values.append(value)
+    return url_for('products.list_products', per_page=request.args.get('per_page'), **args)
+
+@products_bp.route('/search')
+@cached_page
+def search():
+    add_cache_tags(TAG_CATALOG)
+    q = request.args.get('q', '').strip()[:200]
+    page = max(request.args.get('page', 1, type=int), 1)
+
+    # 输入即搜（type-ahead）：?format=json 返回精简结果
+    if request.args.get('format') == 'json':
+        limit = max(1, min(request.args.get('limit', 8, type=int), 20))
+        results = search_products(q, limit=limit) if q else []
+        return jsonify(query=q, results=[{
+            'id': product.id,
+            'name': product.name,
+            'product_code': product.product_code,
+            'category': product.category.name if product.category else None,
+            'url': url_for('products.product_detail', product_id=product.id),
+            'snippet': str(snippet),
+        } for product, snippet in results])
+
+    per_page = current_app.config['SEARCH_RESULTS_PER_PAGE']
+    # 多取一条判断是否有下一页
+    results = search_products(q, limit=per_page + 1, offset=(page - 1) * per_page) if q else []
+    has_next = len(results) > per_page
+    return render_template('products/search.html', q=q, page=page,
+                           results=results[:per_page], has_next=has_next)
+
+@products_bp.route('/fit')
+@cached_page
+def fit():
+    """按尺寸查找：放得下（fits）/ 接近（near ±tolerance），可允许长宽互换（rotate）"""
+    add_cache_tags(TAG_CATALOG)
+    args = request.args
+
+    def dimension(name):
+        value = args.get(name, type=int)
+        return value if value and value > 0 else None
+
+    mode = args.get('mode') if args.get('mode') in FIT_MODES else 'fits'
+    tolerance = args.get('tolerance', type=int)
+    query = FitQuery(
+        length=dimension('length'), width=dimension('width'), height=dimension('height'),
+        mode=mode,
+        tolerance=max(0, tolerance if tolerance is not None else current_app.config['FIT_DEFAULT_TOLERANCE']),
+        rotate=args.get('rotate') in ('1', 'true', 'on'),
+    )
+    page = max(args.get('page', 1, type=int), 1)
+    per_page = page_size(current_app.config['PRODUCTS_PER_PAGE'], current_app.config['PRODUCTS_MAX_PER_PAGE'])
+    products, total = find_fitting(query, limit=per_page, offset=(page - 1) * per_page)
+    has_next = page * per_page < total
+
+    if args.get('format') == 'json':
+        return jsonify(query=asdict(query), total=total, page=page, has_next=has_next, results=[{
+            'id': product.id,
+            'name': product.name,
+            'product_code': product.product_code,
+            'category': product.category.name if product.category else None,
+            'length': product.length,
+            'width': product.width,
+            'height': product.height,
+            'seat_height': product.seat_height,
+            'url': url_for('products.product_detail', product_id=product.id),
+        } for product in products])
+
+    page_args = {key: value for key, value in args.items() if key not in ('page', 'format')}
+    return render_template('products/fit.html', fit=query, products=products, total=total, page=page,
+                           has_next=has_next, page_args=page_args)
+
+@products_bp.route('/code/<product_code>')
+def product_by_code(product_code):
+    """按产品编号访问（销售报价单上只有编号），走 product_code 唯一索引"""
+    product_id = db.session.execute(
+        select(Product.id).where(Product.product_code == product_code.strip().lower())
+    ).scalar()
+    if product_id is None:
+        abort(404)
+    return redirect(url_for('products.product_detail', product_id=product_id))
 
 @products_bp.route('/<int:product_id>')
+@cached_page
 def product_detail(product_id):
     product = Product.query.get_or_404(product_id)
-    return render_template('products/product_detail.html', product=product)  
\ No newline at end of file
+    # 详情页只依赖本产品与其分类，其他产品变化不影响它的缓存
+    add_cache_tags(product_tag(product.id), category_tag(product.category_id))
+    # 第一张为封面（主图），其余为画廊；尺寸与主色调用于预留位置与占位背景色
+    photo_rows = photos.product_photos(product.id)
+    return render_template('products/product_detail.html', product=product,
+                           cover=photo_rows[0] if photo_rows else None, gallery=photo_rows[1:])  
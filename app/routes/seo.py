@@ -0,0 +1,37 @@
+# app/routes/seo.py
+# 搜索引擎：sitemap.xml（索引 + 分片，见 services/sitemap.py）与 robots.txt
+from flask import Blueprint, abort, current_app, send_file
+
+from app.services import sitemap
+
+seo_bp = Blueprint('seo', __name__)
+
+
+def _send(path, mimetype):
+    return send_file(path, mimetype=mimetype, conditional=True,
+                     max_age=current_app.config['SITEMAP_HTTP_MAX_AGE'])
+
+
+@seo_bp.route('/sitemap.xml')
+def sitemap_index():
+    return _send(sitemap.cached_file('index.xml', sitemap.write_index), 'application/xml')
+
+
+@seo_bp.route('/sitemap-pages.xml.gz')
+def sitemap_pages():
+    return _send(sitemap.cached_file('pages.xml.gz', sitemap.write_pages), 'application/gzip')
+
+
+@seo_bp.route('/sitemap-products-<int:shard>.xml.gz')
+def sitemap_products(shard):
+    if shard < 1 or not sitemap.shard_exists(shard):
+        abort(404)
+    path = sitemap.cached_file(f'products-{shard}.xml.gz', lambda f: sitemap.write_products(f, shard))
+    return _send(path, 'application/gzip')
+
+
+@seo_bp.route('/robots.txt')
+def robots():
+    response = current_app.response_class(sitemap.robots_txt(), mimetype='text/plain')
+    response.cache_control.max_age = current_app.config['SITEMAP_HTTP_MAX_AGE']
+    return response
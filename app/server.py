@@ -0,0 +1,234 @@
+# app/server.py
+"""
+生产环境服务进程（python -m app serve）
+
+- 主进程：创建一次应用（导入全部代码、加载配置、构建资源清单），监听端口后 fork 出
+  N 个 worker；worker 与主进程共享已导入代码的内存页（写时复制），启动快、占用少
+- worker：在共享的监听 socket 上 accept，用固定大小的线程池处理请求
+  （线程数有上限，请求激增时排队而不是无限开线程）
+- 回收：worker 处理满 max_requests 个请求（加随机抖动，避免同时重启）后平滑退出，
+  主进程立即补上新的 worker，防止长时间运行的内存增长
+- 平滑关闭：SIGTERM / SIGINT 时停止接收新连接，等待处理中的请求完成
+  （最多 graceful_timeout 秒）后退出
+- 不支持 fork 的平台（Windows）退化为单进程多线程
+"""
+import os
+import random
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+from app import db
+
+
+def log(message):
+    print(f'[{os.getpid()}] {message}', file=sys.stderr, flush=True)
+
+
+class RequestHandler(WSGIRequestHandler):
+    # 不保持长连接：keep-alive 连接会一直占住线程池中的一个线程（前面通常有反向代理）
+    protocol_version = 'HTTP/1.0'
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """
+    线程池版 WSGI 服务器
+
+    werkzeug 自带的 threaded 模式每个请求新开一个线程且没有上限；
+    这里用固定数量的线程处理请求，并在处理满 max_requests 个请求后自行停止。
+    """
+    multithread = True
+
+    def __init__(self, host, port, app, threads, max_requests=0, fd=None):
+        super().__init__(host, port, app, handler=RequestHandler, fd=fd)
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='request')
+        # 排队中的连接数上限：超过时暂停 accept，让连接留在内核 backlog 中，由其他 worker 接走
+        self.slots = threading.BoundedSemaphore(threads * 2)
+        self.max_requests = max_requests
+        self.handled = 0
+        self._count_lock = threading.Lock()
+        self._stopping = False
+
+    def process_request(self, request, client_address):
+        self.slots.acquire()
+        self.executor.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+            self._count()
+
+    def _count(self):
+        with self._count_lock:
+            self.handled += 1
+            recycle = self.max_requests and self.handled >= self.max_requests
+        if recycle:
+            self.stop(f'已处理 {self.handled} 个请求，回收 worker')
+
+    def stop(self, reason=None):
+        """在后台线程中停止 serve_forever（不能在 serve_forever 所在线程中直接调用 shutdown）"""
+        with self._count_lock:
+            if self._stopping:
+                return
+            self._stopping = True
+        if reason:
+            log(reason)
+        threading.Thread(target=self.shutdown, daemon=True).start()
+
+    def drain(self):
+        """等待处理中的请求完成（超过 graceful_timeout 仍未退出时由主进程强制结束）"""
+        self.executor.shutdown(wait=True)
+
+
+def _dispose_engines(app, close=True):
+    # 连接不能跨进程共享：fork 前关闭主进程的连接；子进程中丢弃继承来的连接池（不关闭父进程的连接）
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=close)
+
+
+class Master:
+    def __init__(self, app, bind, workers, threads, max_requests, max_requests_jitter,
+                 graceful_timeout, backlog=2048):
+        self.app = app
+        self.host, self.port = _parse_bind(bind)
+        self.workers = workers
+        self.threads = threads
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.backlog = backlog
+        self.children = {}
+        self.stopping = False
+        self.sock = None
+
+    # ====================== 主进程 ======================
+    def run(self):
+        self.sock = _listen(self.host, self.port, self.backlog)
+        log(f'监听 http://{self.host}:{self.port}（{self.workers} 个 worker × {self.threads} 线程）')
+
+        if not hasattr(os, 'fork') or self.workers <= 1 and not self.max_requests:
+            # 单进程：不需要主进程看管 worker
+            self._serve(self.max_requests)
+            return
+
+        _dispose_engines(self.app)
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        for _ in range(self.workers):
+            self._spawn()
+
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, 0)
+            except InterruptedError:
+                continue
+            except ChildProcessError:
+                break
+            self.children.pop(pid, None)
+            if not self.stopping:
+                if os.WIFSIGNALED(status) or os.WEXITSTATUS(status):
+                    log(f'worker {pid} 异常退出（状态 {status}），重新启动')
+                time.sleep(0.1 if os.WIFEXITED(status) and not os.WEXITSTATUS(status) else 1)
+                self._spawn()
+        self.sock.close()
+        log('已停止')
+
+    def _spawn(self):
+        # 重启前的等待中可能已收到停止信号：不再启动新 worker；
+        # fork 与登记之间收到的信号不会通知到新 worker，登记后补发 SIGTERM
+        if self.stopping:
+            return
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            if self.stopping:
+                _kill(pid, signal.SIGTERM)
+            return
+        # ---- 子进程 ----
+        code = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C 由主进程统一处理
+            _dispose_engines(self.app, close=False)
+            random.seed()
+            max_requests = self.max_requests
+            if max_requests and self.max_requests_jitter:
+                max_requests += random.randint(0, self.max_requests_jitter)
+            self._serve(max_requests)
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _handle_stop(self, signum, frame):
+        if self.stopping:
+            # 第二次 Ctrl+C：立即终止
+            for pid in list(self.children):
+                _kill(pid, signal.SIGKILL)
+            return
+        self.stopping = True
+        log('收到停止信号，等待处理中的请求完成…')
+        for pid in list(self.children):
+            _kill(pid, signal.SIGTERM)
+        timer = threading.Timer(self.graceful_timeout, self._force_kill)
+        timer.daemon = True
+        timer.start()
+
+    def _force_kill(self):
+        for pid in list(self.children):
+            log(f'worker {pid} 超时未退出，强制结束')
+            _kill(pid, signal.SIGKILL)
+
+    # ====================== worker ======================
+    def _serve(self, max_requests):
+        server = PooledWSGIServer(self.host, self.port, self.app, self.threads,
+                                  max_requests=max_requests, fd=self.sock.fileno())
+        signal.signal(signal.SIGTERM, lambda signum, frame: server.stop('收到 SIGTERM，停止接收新请求'))
+        log('worker 已启动')
+        try:
+            server.serve_forever(poll_interval=0.5)
+        finally:
+            server.drain()
+            with self.app.app_context():
+                db.session.remove()
+
+
+def _parse_bind(bind):
+    host, _, port = bind.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def _listen(host, port, backlog):
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _kill(pid, sig):
+    try:
+        os.kill(pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+def serve(app, bind='127.0.0.1:5000', workers=None, threads=8, max_requests=0,
+          max_requests_jitter=0, graceful_timeout=30):
+    workers = workers or os.cpu_count() or 1
+    Master(app, bind, workers, threads, max_requests, max_requests_jitter, graceful_timeout).run()
@@ -0,0 +1,2 @@
+# app/services/__init__.py
+# 业务服务层：缓存、索引、导入等与具体路由无关的逻辑
@@ -0,0 +1,132 @@
+# app/services/assets.py
+"""
+静态资源内容哈希 URL
+
+启动时（或 flask assets build 时）计算 static/css、static/js 下每个文件的内容哈希，
+模板通过 asset_url('css/base.css') 得到 /assets/<哈希>/css/base.css。
+内容不变 URL 就不变，因此可以返回 Cache-Control: immutable, max-age=一年，
+老访客重复访问时不再下载任何 CSS/JS；文件一改，哈希随之变化，浏览器自动取新版本。
+
+- 生产环境：优先读取 flask assets build 生成的清单文件；没有或已过期（资源文件比它新）
+            则启动时现场计算
+- 调试模式：按文件修改时间增量重算，改完 CSS 刷新即可生效
+- flask assets compress 生成的 .gz / .br 文件由 services/compression.py 直接发送
+"""
+import hashlib
+import json
+import os
+
+from flask import abort, current_app, url_for
+
+from app.services.compression import send_precompressed
+
+# 这些扩展名是构建产物（预压缩文件等），不单独生成 URL
+SKIP_SUFFIXES = ('.gz', '.br', '.map')
+
+
+class AssetManifest:
+    def __init__(self, static_folder, dirs, reload=False):
+        self.static_folder = static_folder
+        self.dirs = dirs
+        self.reload = reload
+        self.digests = {}
+        self._stats = {}
+
+    def build(self):
+        """扫描并计算全部文件哈希，返回 {相对路径: 哈希}"""
+        digests = {}
+        for filename in self.iter_files():
+            digests[filename] = self._hash(filename)
+        self.digests = digests
+        return digests
+
+    def iter_files(self):
+        for directory in self.dirs:
+            root = os.path.join(self.static_folder, directory)
+            for dirpath, _, files in os.walk(root):
+                for name in sorted(files):
+                    if name.endswith(SKIP_SUFFIXES):
+                        continue
+                    path = os.path.join(dirpath, name)
+                    yield os.path.relpath(path, self.static_folder).replace(os.sep, '/')
+
+    def load(self, path):
+        with open(path, encoding='utf-8') as f:
+            self.digests = json.load(f)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.digests, f, indent=2, sort_keys=True)
+
+    def digest(self, filename):
+        if self.reload:
+            return self._fresh_digest(filename)
+        return self.digests.get(filename)
+
+    def is_stale(self, path):
+        """清单文件比任一资源文件旧（改了 CSS/JS 却没重新 build）"""
+        built_at = os.path.getmtime(path)
+        return any(os.path.getmtime(os.path.join(self.static_folder, filename)) > built_at
+                   for filename in self.iter_files())
+
+    def _fresh_digest(self, filename):
+        # 调试模式：文件 mtime/大小变化才重新哈希
+        if '..' in filename.split('/') or filename.split('/', 1)[0] not in self.dirs:
+            return None
+        path = os.path.join(self.static_folder, filename)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if self._stats.get(filename) != signature:
+            self.digests[filename] = self._hash(filename)
+            self._stats[filename] = signature
+        return self.digests[filename]
+
+    def _hash(self, filename):
+        sha = hashlib.sha256()
+        with open(os.path.join(self.static_folder, filename), 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                sha.update(chunk)
+        return sha.hexdigest()[:12]
+
+
+def init_app(app):
+    manifest = AssetManifest(app.static_folder, app.config['ASSET_DIRS'],
+                             reload=app.config['ASSET_MANIFEST_RELOAD'])
+    manifest_path = app.config['ASSET_MANIFEST_PATH']
+    if not manifest.reload and os.path.exists(manifest_path) and not manifest.is_stale(manifest_path):
+        manifest.load(manifest_path)
+    else:
+        manifest.build()
+    app.extensions['asset_manifest'] = manifest
+
+    app.add_url_rule('/assets/<digest>/<path:filename>', 'asset', serve_asset)
+    app.add_template_global(asset_url)
+
+
+def asset_url(filename):
+    """模板中使用：{{ asset_url('css/base.css') }}；不在清单中的文件退回普通 static URL"""
+    digest = current_app.extensions['asset_manifest'].digest(filename)
+    if digest is None:
+        return url_for('static', filename=filename)
+    return url_for('asset', digest=digest, filename=filename)
+
+
+def serve_asset(digest, filename):
+    manifest = current_app.extensions['asset_manifest']
+    current = manifest.digest(filename)
+    if current is None:
+        abort(404)
+
+    if digest == current:
+        response = send_precompressed(current_app.static_folder, filename,
+                                      max_age=current_app.config['ASSET_MAX_AGE'])
+        response.cache_control.immutable = True
+        response.cache_control.public = True
+        return response
+
+    # 旧页面引用了旧哈希（刚发布新版本）：返回当前内容，但不允许长期缓存
+    return send_precompressed(current_app.static_folder, filename, max_age=60)
@@ -0,0 +1,158 @@
+# app/services/bulk.py
+"""
+后台产品批量操作
+
+选中的几百个产品在一个事务中用集合式 SQL 处理（UPDATE / DELETE … WHERE id IN (…)），
+不逐个加载 ORM 对象：
+
+- recategorize()   修改分类
+- assign_series()  加入 / 替换精选系列（同步关联表与系列统计）
+- delete_products() 删除产品及其关联：系列关联、产品图片、媒体引用（全文 / 尺寸索引由触发器维护）
+- export_csv()     导出为与批量导入相同列的 CSV（逐批查询、流式输出）
+
+批量 SQL 绕过 ORM 钩子，这里显式设置 updated_at（sitemap lastmod、接口增量同步依赖它）、
+记录缓存失效标签；调用方负责提交。
+"""
+import csv
+import io
+from datetime import datetime
+
+from sqlalchemy import bindparam, delete, select, update
+
+from app import db
+from app.models import Category, Product, ProductPhoto, Series, product_series
+from app.services import media
+from app.services.changes import TAG_CATALOG, category_tag, product_tag, record_changes
+from app.services.series import parse_series, refresh_series_stats, sync_product_series
+
+# 单条语句 IN 列表的长度上限（SQLite 绑定参数个数有限制）
+CHUNK_SIZE = 500
+
+# 与 services/importer.py 的列一致，导出的文件可直接再导入
+EXPORT_COLUMNS = ('product_code', 'name', 'category', 'description', 'image', 'photos',
+                  'length', 'width', 'height', 'seat_height', 'base_material', 'surface_material',
+                  'featured_series', 'applicable_space')
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _existing_ids(connection, product_ids):
+    ids = []
+    for chunk in _chunks(product_ids):
+        ids.extend(connection.execute(select(Product.id).where(Product.id.in_(chunk))).scalars())
+    return ids
+
+
+def _record(product_ids, *extra):
+    record_changes({TAG_CATALOG, *extra} | {product_tag(product_id) for product_id in product_ids})
+
+
+def recategorize(product_ids, category_id):
+    """把产品移到分类 category_id（None = 未分类），返回更新的产品数"""
+    connection = db.session.connection()
+    product_ids = _existing_ids(connection, product_ids)
+    old_categories = set()
+    for chunk in _chunks(product_ids):
+        old_categories.update(connection.execute(
+            select(Product.category_id).where(Product.id.in_(chunk)).distinct()).scalars())
+        connection.execute(update(Product).where(Product.id.in_(chunk))
+                           .values(category_id=category_id, updated_at=datetime.utcnow()))
+    if product_ids:
+        _record(product_ids, *(category_tag(cid) for cid in (old_categories | {category_id}) if cid))
+    return len(product_ids)
+
+
+def assign_series(product_ids, names, replace=False):
+    """
+    把产品加入系列 names（逗号分隔字符串或列表）；replace=True 时替换原有系列（names 为空即清空）
+
+    返回更新的产品数。
+    """
+    connection = db.session.connection()
+    names = parse_series(names if isinstance(names, str) else ','.join(names))
+    now = datetime.utcnow()
+    updated = []
+    for chunk in _chunks(product_ids):
+        if replace:
+            result = connection.execute(
+                update(Product).where(Product.id.in_(chunk))
+                .values(featured_series=', '.join(names) or None, updated_at=now)
+                .returning(Product.id))
+            updated.extend(result.scalars())
+            continue
+        # 加入：各产品原有系列不同，先一次读出，再用一条 executemany 写回有变化的行
+        rows = connection.execute(select(Product.id, Product.featured_series).where(Product.id.in_(chunk))).all()
+        changes = []
+        for product_id, value in rows:
+            current = parse_series(value)
+            merged = current + [name for name in names if name not in current]
+            if merged != current:
+                changes.append({'pid': product_id, 'series': ', '.join(merged)})
+        if changes:
+            connection.execute(
+                update(Product).where(Product.id == bindparam('pid'))
+                .values(featured_series=bindparam('series'), updated_at=now),
+                changes)
+            updated.extend(change['pid'] for change in changes)
+
+    if updated:
+        sync_product_series(updated, connection)
+        _record(updated)
+    return len(updated)
+
+
+def delete_products(product_ids):
+    """删除产品及其关联数据，返回删除的产品数"""
+    connection = db.session.connection()
+    product_ids = _existing_ids(connection, product_ids)
+    if not product_ids:
+        return 0
+
+    categories = set()
+    series_ids = set()
+    for chunk in _chunks(product_ids):
+        categories.update(connection.execute(
+            select(Product.category_id).where(Product.id.in_(chunk)).distinct()).scalars())
+        series_ids.update(connection.execute(
+            select(product_series.c.series_id).where(product_series.c.product_id.in_(chunk)).distinct()).scalars())
+        # SQLite 默认不启用外键级联，关联表显式删除
+        connection.execute(delete(product_series).where(product_series.c.product_id.in_(chunk)))
+        connection.execute(delete(ProductPhoto).where(ProductPhoto.product_id.in_(chunk)))
+        media.drop_refs(media.OWNER_PRODUCT, chunk, connection)
+        connection.execute(delete(Product).where(Product.id.in_(chunk)))
+
+    refresh_series_stats(series_ids, connection)
+    _record(product_ids, *(category_tag(cid) for cid in categories if cid))
+    return len(product_ids)
+
+
+def export_csv(product_ids):
+    """按所选顺序逐批查询，逐批产出 CSV 文本（首块带 UTF-8 BOM，Excel 可直接打开）"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield '\ufeff' + buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    columns = [Product.product_code, Product.name, Category.name, Product.description, Product.image,
+               Product.photos, Product.length, Product.width, Product.height, Product.seat_height,
+               Product.base_material, Product.surface_material, Product.featured_series,
+               Product.applicable_space]
+    for chunk in _chunks(product_ids):
+        rows = {row[0]: row[1:] for row in db.session.execute(
+            select(Product.id, *columns)
+            .outerjoin(Category, Category.id == Product.category_id)
+            .where(Product.id.in_(chunk)))}
+        writer.writerows(rows[product_id] for product_id in chunk if product_id in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def series_names():
+    """批量操作表单中的已有系列（按名称）"""
+    return db.session.execute(select(Series.name).order_by(Series.name)).scalars().all()
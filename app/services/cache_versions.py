@@ -0,0 +1,79 @@
+# app/services/cache_versions.py
+"""
+数据库版本计数器：让多个 worker 进程的本地缓存保持一致
+
+写入方在自己的事务里调用 bump_version()，与业务数据一起提交；
+读取方调用 current_version()，在 ttl 秒内复用上次读到的版本号，
+过期后重新查询（主键查询，开销极小），发现变化即重建本地缓存。
+
+本进程记住的版本号在提交之后才丢弃（after_commit）：提交前其他线程读到的仍是旧版本号与旧数据，
+不会把提交前的数据以新版本号缓存下来。
+"""
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import event, select, update
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app.models import CacheVersion
+
+_lock = threading.Lock()
+_seen = {}  # name -> (version, 读取时间)
+
+
+def current_version(name, ttl=0):
+    """返回命名缓存的当前版本号；ttl 秒内不重复查库"""
+    now = time.monotonic()
+    cached = _seen.get(name)
+    if cached is not None and ttl and now - cached[1] < ttl:
+        return cached[0]
+
+    version = _read_version(name)
+    with _lock:
+        _seen[name] = (version, now)
+    return version
+
+
+def bump_version(name):
+    """版本号 +1（不提交，随调用方事务一起 commit；提交后本进程立即感知）"""
+    result = db.session.execute(
+        update(CacheVersion)
+        .where(CacheVersion.name == name)
+        .values(version=CacheVersion.version + 1)
+    )
+    if result.rowcount == 0:
+        db.session.add(CacheVersion(name=name, version=1))
+        db.session.flush()
+    db.session.info.setdefault('bumped_versions', set()).add(name)
+
+
+def forget(name):
+    """丢弃本进程记住的版本号，下次读取强制查库"""
+    with _lock:
+        _seen.pop(name, None)
+
+
+def _read_version(name):
+    try:
+        version = db.session.execute(
+            select(CacheVersion.version).where(CacheVersion.name == name)
+        ).scalar()
+    except OperationalError as e:
+        # 旧数据库尚未创建 cache_version 表（重新执行 init_schema.py 即可）
+        db.session.rollback()
+        current_app.logger.warning(f"读取缓存版本失败: {e}")
+        return 0
+    return version or 0
+
+
+@event.listens_for(db.session, 'after_commit')
+def _forget_bumped(session):
+    for name in session.info.pop('bumped_versions', ()):
+        forget(name)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_bumped(session):
+    session.info.pop('bumped_versions', None)
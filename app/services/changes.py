@@ -0,0 +1,156 @@
+# app/services/changes.py
+"""
+内容变更通知：把数据库写入转换为“缓存标签”，驱动各类缓存精确失效
+
+标签约定：
+    product:<id>    某个产品（详情页等）
+    category:<id>   某个分类
+    catalog         任何产品/分类/系列变化（列表、搜索、精选页等）
+    settings        网站设置（所有页面）
+
+流程：
+1. ORM 写入：after_flush 钩子根据新增/修改/删除的 Product、Category、Settings 计算标签；
+   批量 SQL 写入：调用方自行调用 record_changes(tags)
+2. 标签写入 cache_invalidation 表，与业务数据同一事务提交
+3. 提交后在本进程立即发送 content_changed 信号（订阅者：页面缓存等），
+   以及 content_committed 信号（订阅者：代理缓存清除）
+4. 其他 worker 每 CHANGES_POLL_INTERVAL 秒读取一次新增的失效记录，再发送同样的信号
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+from blinker import Namespace
+from flask import current_app, has_app_context
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app.models import CacheInvalidation, Category, Product, Settings
+
+_signals = Namespace()
+
+# 订阅：content_changed.connect(fn, sender=app)，fn(app, tags=set)
+content_changed = _signals.signal('content-changed')
+# 只在执行写入的进程中、提交后发送一次（其他 worker 轮询到的变更不发送），用于通知外部系统
+content_committed = _signals.signal('content-committed')
+
+TAG_CATALOG = 'catalog'
+TAG_SETTINGS = 'settings'
+
+# 失效记录保留时长（只需覆盖 worker 的最长轮询间隔，多留一些余量）
+RETENTION = timedelta(hours=6)
+
+_lock = threading.Lock()
+_poll_state = {'last_id': None, 'checked_at': 0.0}
+
+
+def product_tag(product_id):
+    return f'product:{product_id}'
+
+
+def category_tag(category_id):
+    return f'category:{category_id}'
+
+
+def tags_for(obj):
+    """ORM 对象 -> 受影响的缓存标签"""
+    if isinstance(obj, Product):
+        return {TAG_CATALOG, product_tag(obj.id)}
+    if isinstance(obj, Category):
+        return {TAG_CATALOG, category_tag(obj.id)}
+    if isinstance(obj, Settings):
+        return {TAG_SETTINGS}
+    return set()
+
+
+def record_changes(tags, session=None):
+    """
+    记录一批标签（随当前事务提交，提交后才通知）
+
+    批量 SQL 写入（导入、后台批量操作）绕过 ORM 对象，需要显式调用。
+    """
+    session = session or db.session()
+    tags = set(tags)
+    if not tags:
+        return
+    pending = session.info.setdefault('changed_tags', set())
+    new_tags = tags - pending
+    if not new_tags:
+        return
+    pending.update(new_tags)
+
+    connection = session.connection()
+    now = datetime.utcnow()
+    connection.execute(insert(CacheInvalidation), [{'tag': tag, 'created_at': now} for tag in sorted(new_tags)])
+    connection.execute(delete(CacheInvalidation).where(CacheInvalidation.created_at < now - RETENTION))
+
+
+def publish(tags):
+    """在本进程发送 content_changed 信号"""
+    if tags and has_app_context():
+        content_changed.send(current_app._get_current_object(), tags=set(tags))
+
+
+def poll():
+    """读取其他进程写入的失效记录并在本进程发布（按 CHANGES_POLL_INTERVAL 节流）"""
+    interval = current_app.config.get('CHANGES_POLL_INTERVAL', 2)
+    now = time.monotonic()
+    if now - _poll_state['checked_at'] < interval:
+        return
+    with _lock:
+        if now - _poll_state['checked_at'] < interval:
+            return
+        _poll_state['checked_at'] = now
+
+    try:
+        if _poll_state['last_id'] is None:
+            # 进程刚启动：本地缓存为空，从当前位置开始跟踪即可
+            _poll_state['last_id'] = db.session.execute(select(func.max(CacheInvalidation.id))).scalar() or 0
+            return
+        rows = db.session.execute(
+            select(CacheInvalidation.id, CacheInvalidation.tag)
+            .where(CacheInvalidation.id > _poll_state['last_id'])
+            .order_by(CacheInvalidation.id)
+        ).all()
+    except OperationalError as e:
+        # 旧数据库尚未创建 cache_invalidation 表（重新执行 init_schema.py 即可）
+        db.session.rollback()
+        current_app.logger.warning(f"读取缓存失效记录失败: {e}")
+        return
+
+    if rows:
+        _poll_state['last_id'] = rows[-1].id
+        publish({row.tag for row in rows})
+
+
+def init_app(app):
+    app.before_request(poll)
+
+
+# ====================== ORM 写入 -> 标签 ======================
+@event.listens_for(db.session, 'after_flush')
+def _collect_changes(session, flush_context):
+    tags = set()
+    for obj in session.new:
+        tags |= tags_for(obj)
+    for obj in session.deleted:
+        tags |= tags_for(obj)
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            tags |= tags_for(obj)
+    if tags:
+        record_changes(tags, session)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_changes(session):
+    tags = session.info.pop('changed_tags', None)
+    publish(tags)
+    if tags and has_app_context():
+        content_committed.send(current_app._get_current_object(), tags=set(tags))
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('changed_tags', None)
@@ -0,0 +1,160 @@
+# app/services/compression.py
+"""
+响应压缩
+
+- 动态响应：after_request 中按 Accept-Encoding 协商 br（已安装 brotli 库时）或 gzip，
+  只压缩 COMPRESS_MIMETYPES 中的类型、且不小于 COMPRESS_MIN_SIZE 字节的 200 响应；
+  压缩后 ETag 改为弱校验（两种编码是同一内容，条件请求照常 304），并加 Vary: Accept-Encoding
+- 整页缓存中保存的是未压缩内容，命中后同样在这里压缩（缓存键不需要区分编码）
+- 单个视图不压缩：@no_compress（如已压缩的下载、要求低延迟逐步输出的响应）
+- 静态文件：flask assets compress 为 static/css、static/js 生成 .gz（及 .br）文件，
+  send_precompressed() 直接发送预压缩文件，运行时不再压缩；send_file 的响应本身不会被再压缩
+
+压缩级别（COMPRESS_LEVEL / COMPRESS_BR_LEVEL）越高越省带宽、越耗 CPU；
+动态响应默认取中间值，预压缩文件只生成一次，用最高级别。
+"""
+import gzip
+import mimetypes
+import os
+from functools import wraps
+
+from flask import current_app, g, request, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # 可选依赖：pip install brotli
+    brotli = None
+
+# 预压缩文件后缀（按优先顺序）
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+
+def init_app(app):
+    if not app.config.get('COMPRESS_ENABLED', True):
+        return
+    app.after_request(compress_response)
+    # 内置 /static/ 路由也优先发送预压缩文件
+    app.view_functions['static'] = lambda filename: send_precompressed(
+        app.static_folder, filename, max_age=app.get_send_file_max_age(filename))
+
+
+def no_compress(view):
+    """视图装饰器：该视图的响应不压缩"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.no_compress = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def negotiate(available=('br', 'gzip')):
+    """按 Accept-Encoding 选择编码；brotli 库不存在时不使用 br"""
+    accept = request.accept_encodings
+    for encoding in available:
+        if encoding == 'br' and brotli is None:
+            continue
+        if accept[encoding] > 0:
+            return encoding
+    return None
+
+
+def compress_response(response):
+    config = current_app.config
+    if response.mimetype not in config['COMPRESS_MIMETYPES']:
+        return response
+    response.vary.add('Accept-Encoding')
+    if (response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or g.get('no_compress')):
+        return response
+
+    encoding = negotiate()
+    if encoding is None:
+        return response
+    body = response.get_data()
+    if len(body) < config['COMPRESS_MIN_SIZE']:
+        return response
+
+    if encoding == 'br':
+        response.set_data(brotli.compress(body, quality=config['COMPRESS_BR_LEVEL']))
+    else:
+        response.set_data(gzip.compress(body, compresslevel=config['COMPRESS_LEVEL']))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+# ====================== 预压缩静态文件 ======================
+def send_precompressed(directory, filename, **kwargs):
+    """
+    send_from_directory 的替代：客户端支持且存在不旧于原文件的 .br / .gz 时发送压缩文件
+    （Content-Type 仍为原文件类型）
+    """
+    path = safe_join(directory, filename)
+    encoding = None
+    if path is not None and os.path.isfile(path):
+        source_mtime = os.path.getmtime(path)
+        for candidate, suffix in PRECOMPRESSED:
+            if negotiate((candidate,)) is None:
+                continue
+            try:
+                if os.path.getmtime(path + suffix) >= source_mtime:
+                    encoding = candidate
+                    break
+            except OSError:
+                continue
+
+    if encoding is None:
+        response = send_from_directory(directory, filename, **kwargs)
+    else:
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = send_from_directory(directory, filename + dict(PRECOMPRESSED)[encoding],
+                                       mimetype=mimetype, **kwargs)
+        response.headers['Content-Encoding'] = encoding
+    if path is not None and _precompressible(path):
+        response.vary.add('Accept-Encoding')
+    return response
+
+
+def _precompressible(path):
+    return path.endswith(current_app.config['COMPRESS_STATIC_SUFFIXES'])
+
+
+def compress_static(static_folder, dirs, suffixes, force=False):
+    """
+    为 dirs 下扩展名在 suffixes 中的文件生成 .gz（安装了 brotli 时还生成 .br），
+    返回 (生成的文件数, 跳过的文件数)。压缩后不比原文件小的不生成（并删除旧的压缩文件）。
+    """
+    written = skipped = 0
+    for directory in dirs:
+        for dirpath, _, files in os.walk(os.path.join(static_folder, directory)):
+            for name in sorted(files):
+                if not name.endswith(suffixes):
+                    continue
+                path = os.path.join(dirpath, name)
+                with open(path, 'rb') as f:
+                    data = f.read()
+                for encoding, suffix in PRECOMPRESSED:
+                    if encoding == 'br' and brotli is None:
+                        continue
+                    target = path + suffix
+                    if not force and os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                        skipped += 1
+                        continue
+                    if encoding == 'br':
+                        compressed = brotli.compress(data, quality=11)
+                    else:
+                        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                    if len(compressed) >= len(data):
+                        if os.path.exists(target):
+                            os.remove(target)
+                        continue
+                    with open(target, 'wb') as f:
+                        f.write(compressed)
+                    written += 1
+    return written, skipped
@@ -0,0 +1,46 @@
+# app/services/counts.py
+"""
+近似计数缓存
+
+后台产品列表改为键集分页后不再需要每页 COUNT(*)，但仍要显示“共约 N 个产品”。
+这里按查询条件缓存计数：ADMIN_COUNT_TTL 秒内复用，本进程收到 catalog 变更信号时清空
+（其他 worker 的写入经 services/changes.py 轮询到达，计数最多滞后 CHANGES_POLL_INTERVAL 秒）。
+"""
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from app import db
+from app.services import changes
+
+_lock = threading.Lock()
+_cache = {}  # 键 -> (计算时间, 数量)
+
+
+def approximate_count(key, query):
+    """query：Select 语句（如 select(Product.id).where(...)）；返回缓存的行数"""
+    ttl = current_app.config['ADMIN_COUNT_TTL']
+    now = time.monotonic()
+    cached = _cache.get(key)
+    if cached is not None and now - cached[0] < ttl:
+        return cached[1]
+    count = db.session.execute(select(func.count()).select_from(query.subquery())).scalar()
+    with _lock:
+        _cache[key] = (now, count)
+    return count
+
+
+def clear():
+    with _lock:
+        _cache.clear()
+
+
+def _on_change(sender, tags):
+    if changes.TAG_CATALOG in tags:
+        clear()
+
+
+def init_app(app):
+    changes.content_changed.connect(_on_change, sender=app, weak=False)
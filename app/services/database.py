@@ -0,0 +1,140 @@
+# app/services/database.py
+"""
+数据库引擎调优与读写分离
+
+- 连接池：按 DB_POOL_* 配置生成 SQLALCHEMY_ENGINE_OPTIONS（SQLite 内存库除外）
+- SQLite：每个新连接执行 SQLITE_PRAGMAS（WAL、synchronous、cache_size、mmap_size、busy_timeout）
+- 触发器开关：批量写入时通过 trigger_guard 表暂停 FTS / R*Tree 的逐行触发器（不改动 schema）
+- 只读副本：配置 DATABASE_REPLICA_URL 后注册为 'replica' 绑定；
+  RoutingSession 把 DATABASE_REPLICA_BLUEPRINTS 中 GET/HEAD 请求的 SELECT 发往副本，
+  后台蓝图、命令行、任何 flush 以及读请求中顺带执行的 UPDATE / INSERT / DELETE 仍走主库
+"""
+from contextlib import contextmanager, suppress
+
+from flask import current_app, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
+
+REPLICA_BIND = 'replica'
+
+
+def configure(app):
+    """db.init_app 之前调用：补全引擎参数与副本绑定"""
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    if not (url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')):
+        options.setdefault('pool_size', app.config['DB_POOL_SIZE'])
+        options.setdefault('max_overflow', app.config['DB_MAX_OVERFLOW'])
+        options.setdefault('pool_timeout', app.config['DB_POOL_TIMEOUT'])
+        options.setdefault('pool_recycle', app.config['DB_POOL_RECYCLE'])
+    if url.get_backend_name() != 'sqlite':
+        # 服务端可能主动断开空闲连接，取用前先探测
+        options.setdefault('pool_pre_ping', True)
+
+    replica_url = app.config.get('DATABASE_REPLICA_URL')
+    if replica_url:
+        app.config.setdefault('SQLALCHEMY_BINDS', {})[REPLICA_BIND] = replica_url
+
+
+def init_app(app, db):
+    """db.init_app 之后调用：为 SQLite 引擎注册连接 PRAGMA"""
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    with app.app_context():
+        for key, engine in db.engines.items():
+            if engine.dialect.name != 'sqlite' or not pragmas:
+                continue
+            engine_pragmas = dict(pragmas)
+            if key == REPLICA_BIND or engine.url.database in (None, '', ':memory:'):
+                # 只读副本 / 内存库不能切换日志模式
+                engine_pragmas.pop('journal_mode', None)
+            event.listen(engine, 'connect', _pragma_listener(engine_pragmas))
+
+
+def _pragma_listener(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+        finally:
+            cursor.close()
+    return set_pragmas
+
+
+# ====================== 触发器开关（SQLite） ======================
+# 触发器的 WHEN 条件检查 trigger_guard 表：有某个名称的行时，带该名称检查的触发器不执行。
+# 标记行随调用方的事务写入、在事务结束前删除，其他连接看不到；不需要 DROP / CREATE TRIGGER，
+# 因此不会改变 schema 版本号，也不会让其他连接重新编译语句。
+TRIGGER_GUARD_TABLE = 'trigger_guard'
+
+
+def create_trigger_guard(connection):
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {TRIGGER_GUARD_TABLE} (name TEXT PRIMARY KEY) WITHOUT ROWID"))
+
+
+def trigger_enabled(name):
+    """触发器 WHEN 子句中使用：开关 name 未关闭"""
+    return f"NOT EXISTS (SELECT 1 FROM {TRIGGER_GUARD_TABLE} WHERE name = '{name}')"
+
+
+def drop_unguarded_triggers(connection, names):
+    """删除旧版本创建的、WHEN 中没有开关检查的触发器（随后由 CREATE TRIGGER IF NOT EXISTS 重建）"""
+    rows = connection.execute(text("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'")).all()
+    for name, sql in rows:
+        if name in names and TRIGGER_GUARD_TABLE not in sql:
+            connection.execute(text(f'DROP TRIGGER {name}'))
+
+
+@contextmanager
+def triggers_suspended(connection, name, on_exit=None):
+    """
+    在当前事务中暂停开关 name 控制的触发器；退出时（含异常）先恢复触发器，再调用 on_exit()
+
+    异常时调用方可能捕获后仍然提交已写入的行，因此同样恢复并补做 on_exit；
+    事务已失效时这两步会失败，标记随调用方的回滚一并撤销。
+    """
+    connection.execute(text(f"INSERT OR IGNORE INTO {TRIGGER_GUARD_TABLE} (name) VALUES (:name)"), {'name': name})
+    try:
+        yield
+    except BaseException:
+        with suppress(SQLAlchemyError):
+            _resume(connection, name)
+            if on_exit is not None:
+                on_exit()
+        raise
+    _resume(connection, name)
+    if on_exit is not None:
+        on_exit()
+
+
+def _resume(connection, name):
+    connection.execute(text(f"DELETE FROM {TRIGGER_GUARD_TABLE} WHERE name = :name"), {'name': name})
+
+
+# ====================== 读写分离 ======================
+def use_replica():
+    """当前请求是否只读且允许读副本"""
+    if not has_request_context() or request.method not in ('GET', 'HEAD'):
+        return False
+    return request.blueprint in current_app.config['DATABASE_REPLICA_BLUEPRINTS']
+
+
+def _is_read(clause):
+    """只有 SELECT（且不带 FOR UPDATE）才可能发往副本；UPDATE / INSERT / DELETE、
+    不带语句的 session.connection()、text() 一律视为可能写入"""
+    return (clause is not None and getattr(clause, 'is_select', False)
+            and getattr(clause, '_for_update_arg', None) is None)
+
+
+class RoutingSession(Session):
+    """前台只读请求的 SELECT 发往副本，其余（Core 写入语句、一切 flush）发往主库"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _is_read(clause) and use_replica():
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,247 @@
+# app/services/dimensions.py
+"""
+按尺寸查找产品（SQLite R*Tree）
+
+product_dims 是 rtree_i32 虚拟表（整数毫米），rowid = product.id，5 个维度：
+    length, width, height   原始尺寸
+    long, short             max(长, 宽) / min(长, 宽)，用于允许旋转（长宽互换）的查询
+
+只收录长、宽、高都已填写的产品（尺寸不全的产品无法判断是否放得下）。
+product 表上的触发器在同一事务中维护索引，与 product_fts 相同。
+
+查询模式：
+    fits   放得下：各尺寸 <= 给定值（“600×450 的壁龛、高度不超过 700”）
+    near   接近：各尺寸在给定值 ±tolerance 以内
+rotate=True 时长宽可以互换：改用 long / short 比较，仍然是一次 R*Tree 查询
+（放得下当且仅当 长边 <= 空间长边 且 短边 <= 空间短边；±tolerance 同理）。
+只给出部分尺寸时，其余维度不限制；允许旋转且只给一条边时：
+    fits   短边不超过它即可放下
+    near   长边或短边接近它均可（两次 R*Tree 查询取并集）
+
+座高（seat_height）不在索引中，也不是按尺寸查找的条件（只在详情页与接口中展示）。
+
+查询只读 product_dims（不回表），排序与计数都在索引上完成，再按 id 取回本页产品。
+非 SQLite 数据库退化为对 product 表的普通查询。
+"""
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from sqlalchemy import and_, case, func, or_, text
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.models import Product
+from app.services.database import create_trigger_guard, drop_unguarded_triggers, trigger_enabled, triggers_suspended
+
+MODES = ('fits', 'near')
+
+# 触发器开关名（批量导入时暂停逐行写索引，见 deferred_dimension_indexing）
+GUARD = 'product_dims'
+
+SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS product_dims USING rtree_i32(
+        id,
+        min_length, max_length,
+        min_width, max_width,
+        min_height, max_height,
+        min_long, max_long,
+        min_short, max_short
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS product_dims_ai AFTER INSERT ON product
+    WHEN new.length IS NOT NULL AND new.width IS NOT NULL AND new.height IS NOT NULL
+         AND {trigger_enabled(GUARD)} BEGIN
+        INSERT INTO product_dims VALUES (
+            new.id, new.length, new.length, new.width, new.width, new.height, new.height,
+            max(new.length, new.width), max(new.length, new.width),
+            min(new.length, new.width), min(new.length, new.width)
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_dims_ad AFTER DELETE ON product BEGIN
+        DELETE FROM product_dims WHERE id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_dims_au AFTER UPDATE OF length, width, height ON product BEGIN
+        DELETE FROM product_dims WHERE id = old.id;
+        INSERT INTO product_dims
+        SELECT new.id, new.length, new.length, new.width, new.width, new.height, new.height,
+               max(new.length, new.width), max(new.length, new.width),
+               min(new.length, new.width), min(new.length, new.width)
+        WHERE new.length IS NOT NULL AND new.width IS NOT NULL AND new.height IS NOT NULL;
+    END
+    """,
+]
+
+_BACKFILL = """
+    INSERT INTO product_dims
+    SELECT id, length, length, width, width, height, height,
+           max(length, width), max(length, width), min(length, width), min(length, width)
+    FROM product
+    WHERE length IS NOT NULL AND width IS NOT NULL AND height IS NOT NULL {extra}
+"""
+
+
+@dataclass
+class FitQuery:
+    length: int = None
+    width: int = None
+    height: int = None
+    mode: str = 'fits'
+    tolerance: int = 0
+    rotate: bool = False
+
+    @property
+    def empty(self):
+        return self.length is None and self.width is None and self.height is None
+
+    def targets(self):
+        """
+        -> [{R*Tree 维度: 目标值}, …]：满足其中任意一组即符合条件
+
+        只有“允许旋转、接近模式、只给一条边”需要两组（长边接近或短边接近）。
+        """
+        edge = self.length if self.length is not None else self.width
+        if self.rotate and self.length is not None and self.width is not None:
+            alternatives = [{'long': max(self.length, self.width), 'short': min(self.length, self.width)}]
+        elif self.rotate and edge is not None and self.mode == 'fits':
+            # 只给一条边：任一朝向能放下即可，即短边不超过它
+            alternatives = [{'short': edge}]
+        elif self.rotate and edge is not None:
+            alternatives = [{'long': edge}, {'short': edge}]
+        else:
+            alternatives = [{'length': self.length, 'width': self.width}]
+        result = []
+        for targets in alternatives:
+            targets['height'] = self.height
+            targets = {axis: value for axis, value in targets.items() if value is not None}
+            if targets:
+                result.append(targets)
+        return result
+
+
+def create_dimension_index(connection):
+    """创建 R*Tree 表与同步触发器（可重复执行；旧版本的插入触发器会替换为带开关检查的版本）"""
+    create_trigger_guard(connection)
+    drop_unguarded_triggers(connection, {'product_dims_ai'})
+    for statement in SCHEMA:
+        connection.execute(text(statement))
+
+
+def rebuild_dimension_index(connection):
+    """清空并从 product 表全量重建索引，返回收录的产品数"""
+    connection.execute(text("DELETE FROM product_dims"))
+    connection.execute(text(_BACKFILL.format(extra='')))
+    return connection.execute(text("SELECT count(*) FROM product_dims")).scalar()
+
+
+def ensure_dimension_index(connection):
+    """建表；若索引条数与尺寸齐全的产品数不一致（旧数据库首次升级），全量重建"""
+    create_dimension_index(connection)
+    indexed = connection.execute(text("SELECT count(*) FROM product_dims")).scalar()
+    total = connection.execute(text(
+        "SELECT count(*) FROM product WHERE length IS NOT NULL AND width IS NOT NULL AND height IS NOT NULL"
+    )).scalar()
+    if indexed != total:
+        return rebuild_dimension_index(connection)
+    return indexed
+
+
+@contextmanager
+def deferred_dimension_indexing(connection):
+    """批量插入产品时暂停逐行触发器，结束时（含异常）一次为新产品建索引（同 search.deferred_indexing）"""
+    if connection.dialect.name != 'sqlite':
+        yield
+        return
+    max_id = connection.execute(text("SELECT coalesce(max(id), 0) FROM product")).scalar()
+
+    def index_new_rows():
+        connection.execute(text(_BACKFILL.format(extra='AND id > :max_id')), {'max_id': max_id})
+
+    with triggers_suspended(connection, GUARD, on_exit=index_new_rows):
+        yield
+
+
+# ====================== 查询 ======================
+def find_fitting(fit, limit=24, offset=0):
+    """
+    返回 (本页产品列表, 符合条件的总数)
+
+    排序：各维度与目标值的偏差之和从小到大（放得下时即优先推荐最能利用空间的产品）。
+    """
+    alternatives = fit.targets()
+    if not alternatives:
+        return [], 0
+    if db.engine.dialect.name != 'sqlite':
+        return _find_fitting_sql(fit, alternatives, limit, offset)
+
+    params = {'tolerance': fit.tolerance}
+    selects = []
+    for index, targets in enumerate(alternatives):
+        clauses, closeness = [], []
+        for axis, value in targets.items():
+            name = f'{axis}_{index}'
+            params[name] = value
+            # 点数据（min = max）：上限比较 max_ 列、下限比较 min_ 列，R*Tree 两端都能剪枝
+            if fit.mode == 'near':
+                clauses.append(f'min_{axis} >= :{name} - :tolerance')
+            clauses.append(f'max_{axis} <= :{name}' + (' + :tolerance' if fit.mode == 'near' else ''))
+            closeness.append(f'abs(max_{axis} - :{name})')
+        selects.append(f"SELECT id, {' + '.join(closeness)} AS score FROM product_dims WHERE {' AND '.join(clauses)}")
+
+    if len(selects) == 1:
+        matches = selects[0]
+    else:
+        # 各组分别走 R*Tree，同一产品按最接近的一组计分
+        matches = f"SELECT id, min(score) AS score FROM ({' UNION ALL '.join(selects)}) GROUP BY id"
+
+    total = db.session.execute(text(f"SELECT count(*) FROM ({matches})"), params).scalar()
+    ids = db.session.execute(text(f"""
+        SELECT id FROM ({matches})
+        ORDER BY score, id DESC
+        LIMIT :limit OFFSET :offset
+    """), dict(params, limit=limit, offset=offset)).scalars().all()
+
+    if not ids:
+        return [], total
+    products = {p.id: p for p in Product.query
+                .options(joinedload(Product.category))
+                .filter(Product.id.in_(ids))}
+    return [products[i] for i in ids if i in products], total
+
+
+NO_MATCH = 2 ** 31 - 1
+
+
+def _find_fitting_sql(fit, alternatives, limit, offset):
+    columns = {
+        'length': Product.length,
+        'width': Product.width,
+        'height': Product.height,
+        'long': func.greatest(Product.length, Product.width),
+        'short': func.least(Product.length, Product.width),
+    }
+    matched, scores = [], []
+    for targets in alternatives:
+        filters, closeness = [], []
+        for axis, value in targets.items():
+            if fit.mode == 'near':
+                filters.append(columns[axis].between(value - fit.tolerance, value + fit.tolerance))
+            else:
+                filters.append(columns[axis] <= value)
+            closeness.append(func.abs(columns[axis] - value))
+        matched.append(and_(*filters))
+        scores.append(sum(closeness[1:], closeness[0]))
+    # 多组时按符合条件的各组中最接近的一组计分（不符合的组不参与）
+    score = scores[0] if len(scores) == 1 else func.least(*(
+        case((condition, value), else_=NO_MATCH) for condition, value in zip(matched, scores)))
+    query = (Product.query.options(joinedload(Product.category))
+             .filter(Product.length.isnot(None), Product.width.isnot(None), Product.height.isnot(None),
+                     or_(*matched)))
+    total = query.count()
+    products = query.order_by(score, Product.id.desc()).limit(limit).offset(offset).all()
+    return products, total
@@ -0,0 +1,108 @@
+# app/services/edge.py
+"""
+前台响应的边缘缓存（反向代理 / CDN）支持
+
+公开蓝图（PUBLIC_BLUEPRINTS：main、products、featured）以“无会话”方式运行：
+- 不读取会话 Cookie，不写回 Set-Cookie，也不添加 Vary: Cookie
+  （会话接口在路由匹配之前打开，这里自行匹配一次 URL 判断蓝图）
+- 不加载登录用户：current_user 直接是匿名用户，带着后台登录 Cookie 访问前台也不再执行 user_loader 查询
+- 200 / 304 响应带 Cache-Control: public, max-age=…, s-maxage=…, stale-while-revalidate=…
+  （视图已自行设置 Cache-Control 的不覆盖）
+- 页面缓存标签（product:12、category:3、catalog、settings）由 response_cache 以 Surrogate-Key 头输出，
+  代理可按标签清除
+
+因此同一 URL 对所有访客的响应完全相同，本地缓存代理可以直接命中，不再转发到 Flask。
+
+清除：设置 EDGE_PURGE_URL 后，后台写入提交时向该地址发送 PURGE 请求，
+Surrogate-Key 头为本次变化的标签（Varnish xkey、Fastly 等按标签清除）；
+不设置时代理缓存在 PUBLIC_S_MAXAGE 秒后过期，再凭 ETag 条件请求重新验证。
+只由执行写入的进程发送，其他 worker 轮询到的变更不会重复清除。
+"""
+import threading
+import urllib.request
+
+from flask import current_app, g, request
+from flask.sessions import SecureCookieSession, SecureCookieSessionInterface
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import RequestRedirect
+
+from app import login_manager
+from app.services import changes
+
+
+class PublicSession(SecureCookieSession):
+    """公开页面的会话：始终为空，不会写回 Cookie"""
+
+
+class PublicSessionInterface(SecureCookieSessionInterface):
+
+    def open_session(self, app, request):
+        if is_public(app, request):
+            return PublicSession()
+        return super().open_session(app, request)
+
+    def save_session(self, app, session, response):
+        if isinstance(session, PublicSession):
+            return
+        super().save_session(app, session, response)
+
+
+def is_public(app, req):
+    """请求是否属于公开蓝图（路由尚未匹配时自行匹配 URL）"""
+    if req.url_rule is not None:
+        blueprint = req.blueprint
+    else:
+        try:
+            rule, _ = app.create_url_adapter(req).match(return_rule=True)
+        except (HTTPException, RequestRedirect):
+            return False
+        blueprint = rule.endpoint.rpartition('.')[0]
+    return blueprint in app.config['PUBLIC_BLUEPRINTS']
+
+
+def init_app(app):
+    app.session_interface = PublicSessionInterface()
+    app.before_request(_skip_user_loading)
+    app.after_request(_add_cache_control)
+    changes.content_committed.connect(_purge_on_commit, sender=app)
+
+
+def _skip_user_loading():
+    if request.blueprint in current_app.config['PUBLIC_BLUEPRINTS']:
+        # Flask-Login 只在 g 中没有 _login_user 时才调用 user_loader
+        g._login_user = login_manager.anonymous_user()
+
+
+def _add_cache_control(response):
+    config = current_app.config
+    if (request.blueprint in config['PUBLIC_BLUEPRINTS']
+            and request.method in ('GET', 'HEAD')
+            and response.status_code in (200, 304)
+            and 'Cache-Control' not in response.headers):
+        cache_control = response.cache_control
+        cache_control.public = True
+        cache_control.max_age = config['PUBLIC_MAX_AGE']
+        cache_control.s_maxage = config['PUBLIC_S_MAXAGE']
+        if config['PUBLIC_STALE_WHILE_REVALIDATE']:
+            cache_control.stale_while_revalidate = config['PUBLIC_STALE_WHILE_REVALIDATE']
+    return response
+
+
+# ====================== 按标签清除代理缓存 ======================
+def _purge_on_commit(app, tags):
+    url = app.config['EDGE_PURGE_URL']
+    if not url or not tags:
+        return
+    # 提交在请求中完成，不让代理的响应时间拖慢后台操作
+    threading.Thread(target=purge, args=(app, url, sorted(tags)), daemon=True).start()
+
+
+def purge(app, url, tags):
+    """向代理发送 PURGE 请求（标签放在 Surrogate-Key 头），失败只记录日志"""
+    header = app.config['SURROGATE_KEY_HEADER']
+    purge_request = urllib.request.Request(url, method='PURGE', headers={header: ' '.join(tags)})
+    try:
+        with urllib.request.urlopen(purge_request, timeout=app.config['EDGE_PURGE_TIMEOUT']) as response:
+            response.read()
+    except OSError as e:
+        app.logger.warning(f'代理缓存清除失败（{", ".join(tags)}）：{e}')
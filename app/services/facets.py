@@ -0,0 +1,326 @@
+# app/services/facets.py
+"""
+产品列表分面筛选（分类 / 底座材质 / 表面材质 / 适用空间 / 精选系列）
+
+每个进程在内存中维护一份分面索引，筛选与计数不再逐请求 GROUP BY：
+
+- 位图：Python int 作为位集，每个分面值一个位图（如 base_material=oak），
+  第 i 位表示“排序槽位 i 上的产品具有该值”；交集 / 并集 / 计数（bit_count）都在 C 层完成
+- 排序槽位：产品按列表顺序 (created_at, id) 升序占一个槽位，新产品追加在末尾；
+  列表按倒序展示，翻页就是从游标位置向低位取最高的若干个 1，不需要 OFFSET
+- 同一分面内多选为“或”，不同分面之间为“且”；
+  某个分面的计数只应用其他分面的筛选（disjunctive），选中一项后同组其他选项的数量仍然可见
+- 增量维护：订阅 content_changed 信号，product:<id> 只重新读取这些产品，
+  只有 catalog 标签（批量导入等批量 SQL 写入）时在下次使用前整体重建；
+  信号里只做标记，真正的查询推迟到下一次使用索引时（不在提交钩子中查库）
+
+游标与 services/pagination.py 的格式相同（上一页最后一个产品的 created_at 与 id）。
+"""
+import threading
+from bisect import bisect_left
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from app.models import Category, Product
+from app.services import changes
+from app.services.pagination import encode_cursor
+from app.services.series import parse_series
+
+# (URL 参数 / 分面名, 标题, 是否逗号分隔多值)
+FACETS = (
+    ('category', 'Category', False),
+    ('base_material', 'Base Material', False),
+    ('surface_material', 'Surface Material', False),
+    ('applicable_space', 'Applicable Space', True),
+    ('featured_series', 'Series', True),
+)
+FACET_NAMES = tuple(name for name, _, _ in FACETS)
+
+# 挂起的变更超过这么多产品时直接重建（_clear 逐个位图清位，只适合少量更新）
+INCREMENTAL_LIMIT = 1000
+
+_COLUMNS = (Product.id, Product.created_at, Product.category_id, Product.base_material,
+            Product.surface_material, Product.applicable_space, Product.featured_series)
+
+
+def _sort_key(created_at, product_id):
+    # 与 SQLite 的 ORDER BY created_at DESC, id DESC 一致（created_at 必填）
+    return (created_at, product_id)
+
+
+def _row_values(row):
+    """产品行 -> {分面: [值, ...]}"""
+    values = {'category': [row.category_id] if row.category_id is not None else []}
+    for name, _, multi in FACETS[1:]:
+        raw = getattr(row, name)
+        if multi:
+            values[name] = parse_series(raw)
+        else:
+            raw = (raw or '').strip()
+            values[name] = [raw] if raw else []
+    return values
+
+
+def _ones(bitmap):
+    """位图中所有为 1 的位，从高到低"""
+    while bitmap:
+        top = bitmap.bit_length() - 1
+        yield top
+        bitmap ^= 1 << top
+
+
+class FacetIndex:
+    def __init__(self):
+        self.bitmaps = {name: {} for name in FACET_NAMES}   # 分面 -> {值: 位图}
+        self.all = 0             # 现存产品的位图
+        self.slot_ids = []       # 槽位 -> 产品 id（删除后保留，是否现存看 self.all）
+        self.slot_dates = []     # 槽位 -> created_at
+        self.slot_of = {}        # 现存产品 id -> 槽位
+        self.category_names = {}
+
+    def _key(self, slot):
+        return _sort_key(self.slot_dates[slot], self.slot_ids[slot])
+
+    # ====================== 构建与增量更新 ======================
+    @classmethod
+    def build(cls, session):
+        index = cls()
+        rows = session.execute(
+            select(*_COLUMNS).order_by(Product.created_at, Product.id)
+        ).all()
+        # 先在 bytearray 中置位再一次性转成 int（逐位 |= 会反复复制大整数）
+        buffers = {name: {} for name in FACET_NAMES}
+        size = (len(rows) + 7) // 8
+        for slot, row in enumerate(rows):
+            index.slot_ids.append(row.id)
+            index.slot_dates.append(row.created_at)
+            index.slot_of[row.id] = slot
+            byte, bit = slot >> 3, 1 << (slot & 7)
+            for name, items in _row_values(row).items():
+                for value in items:
+                    buffer = buffers[name].get(value)
+                    if buffer is None:
+                        buffer = buffers[name][value] = bytearray(size)
+                    buffer[byte] |= bit
+        for name, values in buffers.items():
+            index.bitmaps[name] = {value: int.from_bytes(buffer, 'little') for value, buffer in values.items()}
+        index.all = (1 << len(rows)) - 1
+        index.load_categories(session)
+        return index
+
+    def load_categories(self, session):
+        self.category_names = dict(session.execute(select(Category.id, Category.name)).all())
+
+    def apply(self, session, product_ids):
+        """
+        重新读取这些产品并更新位图；返回 False 表示需要整体重建
+        （新产品的排序键不在末尾，例如导入时带了较早的 created_at）
+        """
+        product_ids = list(product_ids)
+        rows = {}
+        for start in range(0, len(product_ids), 500):
+            chunk = product_ids[start:start + 500]
+            rows.update((row.id, row) for row in session.execute(select(*_COLUMNS).where(Product.id.in_(chunk))))
+
+        for product_id in product_ids:
+            row = rows.get(product_id)
+            slot = self.slot_of.get(product_id)
+            if slot is not None:
+                self._clear(slot)
+                if row is None or row.created_at != self.slot_dates[slot]:
+                    # 已删除，或排序位置变了（重新追加到末尾）
+                    del self.slot_of[product_id]
+                    self.all &= ~(1 << slot)
+                    slot = None
+            if row is None:
+                continue
+            if slot is None:
+                if self.slot_ids and _sort_key(row.created_at, row.id) <= self._key(len(self.slot_ids) - 1):
+                    return False
+                slot = len(self.slot_ids)
+                self.slot_ids.append(row.id)
+                self.slot_dates.append(row.created_at)
+                self.slot_of[row.id] = slot
+                self.all |= 1 << slot
+            bit = 1 << slot
+            for name, items in _row_values(row).items():
+                bitmaps = self.bitmaps[name]
+                for value in items:
+                    bitmaps[value] = bitmaps.get(value, 0) | bit
+        return True
+
+    def _clear(self, slot):
+        # 不保存每个产品的旧值（10 万产品会多占几十 MB）：逐个位图清除该位，只用于少量增量更新
+        bit = 1 << slot
+        for bitmaps in self.bitmaps.values():
+            for value, bitmap in list(bitmaps.items()):
+                if bitmap & bit:
+                    bitmap ^= bit
+                    if bitmap:
+                        bitmaps[value] = bitmap
+                    else:
+                        del bitmaps[value]
+
+    # ====================== 查询 ======================
+    def _union(self, name, values):
+        bitmaps = self.bitmaps[name]
+        result = 0
+        for value in values:
+            result |= bitmaps.get(value, 0)
+        return result
+
+    def select(self, selected, exclude=None):
+        """应用筛选（exclude 指定的分面除外），返回位图"""
+        result = self.all
+        for name, values in selected.items():
+            if values and name != exclude:
+                result &= self._union(name, values)
+        return result
+
+    def counts(self, selected):
+        """每个分面每个值在“其他分面筛选”下的产品数：{分面: {值: 数量}}（数量为 0 的不列出）"""
+        result = {}
+        for name in FACET_NAMES:
+            base = self.select(selected, exclude=name)
+            counts = {}
+            for value, bitmap in self.bitmaps[name].items():
+                count = (bitmap & base).bit_count()
+                if count:
+                    counts[value] = count
+            result[name] = counts
+        return result
+
+    def page(self, bitmap, per_page, cursor=None):
+        """按列表顺序（倒序）取一页产品 id，返回 (ids, 下一页游标或 None)"""
+        if cursor is not None:
+            # 游标对应的产品可能已被删除：二分到它原来的位置即可
+            position = bisect_left(range(len(self.slot_ids)), _sort_key(*cursor), key=self._key)
+            bitmap &= (1 << position) - 1
+        slots = []
+        for slot in _ones(bitmap):
+            if len(slots) == per_page:
+                # 还有下一页：游标为本页最后一个产品
+                last = slots[-1]
+                return [self.slot_ids[s] for s in slots], encode_cursor(self.slot_dates[last], self.slot_ids[last])
+            slots.append(slot)
+        return [self.slot_ids[s] for s in slots], None
+
+
+# ====================== 进程内单例 ======================
+_lock = threading.RLock()
+_state = {'index': None, 'pending': set(), 'rebuild': True, 'categories': False}
+
+
+def _on_change(sender, tags):
+    product_ids = set()
+    categories = False
+    for tag in tags:
+        kind, _, value = tag.partition(':')
+        if kind == 'product' and value.isdigit():
+            product_ids.add(int(value))
+        elif kind == 'category':
+            categories = True
+    with _lock:
+        if product_ids:
+            _state['pending'] |= product_ids
+        elif changes.TAG_CATALOG in tags and not categories:
+            # 只有 catalog 标签：批量 SQL 写入，不知道具体改了哪些产品
+            _state['rebuild'] = True
+        _state['categories'] |= categories
+
+
+def init_app(app):
+    changes.content_changed.connect(_on_change, sender=app, weak=False)
+
+
+def get_index():
+    """返回最新的分面索引（先应用挂起的变更）"""
+    with _lock:
+        session = db.session
+        if _state['rebuild'] or _state['index'] is None:
+            _rebuild(session)
+        else:
+            index = _state['index']
+            pending, _state['pending'] = _state['pending'], set()
+            if len(pending) > INCREMENTAL_LIMIT or pending and not index.apply(session, pending):
+                _rebuild(session)
+            elif _state['categories']:
+                index.load_categories(session)
+        _state['categories'] = False
+        return _state['index']
+
+
+def _rebuild(session):
+    started = datetime.now()
+    _state['index'] = FacetIndex.build(session)
+    _state['rebuild'] = False
+    _state['pending'] = set()
+    current_app.logger.info(
+        f"分面索引已重建：{len(_state['index'].slot_of)} 个产品，"
+        f"耗时 {(datetime.now() - started).total_seconds():.2f}s"
+    )
+
+
+def reset():
+    with _lock:
+        _state.update(index=None, pending=set(), rebuild=True, categories=False)
+
+
+# ====================== 视图辅助 ======================
+def selected_from_args(args):
+    """从查询参数读取筛选：?base_material=oak&base_material=walnut&category=3"""
+    selected = {}
+    for name in FACET_NAMES:
+        values = [value.strip() for value in args.getlist(name) if value.strip()]
+        if name == 'category':
+            values = [int(value) for value in values if value.isdigit()]
+        if values:
+            selected[name] = list(dict.fromkeys(values))
+    return selected
+
+
+def filter_page(selected, per_page, cursor=None):
+    """按筛选取一页：返回 (本页产品 id, 下一页游标或 None, 筛选后总数)"""
+    with _lock:
+        index = get_index()
+        bitmap = index.select(selected)
+        ids, next_cursor = index.page(bitmap, per_page, cursor)
+        return ids, next_cursor, bitmap.bit_count()
+
+
+def sidebar(selected, values_limit=None):
+    """
+    侧栏分面列表：[{name, title, options: [{value, label, count, selected}]}]
+
+    每个分面按数量降序，最多 values_limit 项（已选中的值总是保留）。
+    """
+    with _lock:
+        index = get_index()
+        counts = index.counts(selected)
+        category_names = dict(index.category_names)
+
+    facets = []
+    for name, title, _ in FACETS:
+        chosen = set(selected.get(name, ()))
+        options = sorted((item for item in counts[name].items() if item[0] not in chosen),
+                         key=lambda item: (-item[1], str(item[0])))
+        if values_limit:
+            options = options[:values_limit]
+        options += [(value, counts[name].get(value, 0)) for value in chosen]
+        options.sort(key=lambda item: (-item[1], str(item[0])))
+        if not options:
+            continue
+        facets.append({
+            'name': name,
+            'title': title,
+            'options': [{
+                'value': value,
+                'label': category_names.get(value, f'#{value}') if name == 'category' else value,
+                'count': count,
+                'selected': value in chosen,
+            } for value, count in options],
+        })
+    return facets
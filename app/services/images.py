@@ -0,0 +1,257 @@
+# app/services/images.py
+"""
+产品图片衍生图（缩略图）服务
+
+/media/products/<宽度>/<格式>/<文件名> 按白名单宽度与格式（WebP / JPEG）返回缩小后的
+产品图，模板通过 image_url() / image_srcset() 生成 srcset，浏览器按屏幕只下载需要的尺寸。
+
+- 生成：在独立进程池中用 Pillow 缩放，超大原图不会占住处理请求的 worker；
+        同一衍生图的并发请求只生成一次
+- 缓存：磁盘目录 IMAGE_CACHE_DIR，文件名由 (原图路径, 修改时间, 大小, 宽度, 格式) 哈希而来，
+        原图替换后自动失效；总大小超过 IMAGE_CACHE_MAX_BYTES 时按最近使用时间淘汰
+- ETag：同一哈希，强校验
+- 预生成：后台导入产品后入队 images.derivatives 任务，由任务 worker 提前生成（见 services/jobs.py）
+"""
+import atexit
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+from flask import current_app, url_for
+from werkzeug.security import safe_join
+
+from app.services import media
+from app.services.jobs import task
+
+# 衍生图算法版本：修改 _render 的输出效果时 +1，旧缓存自动作废
+RENDER_VERSION = 1
+
+MIMETYPES = {'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+
+_lock = threading.Lock()
+_pool = None
+_pending = {}                      # 缓存键 -> Future（合并并发请求）
+_cache_bytes = {'total': None}     # 本进程估算的缓存总大小
+
+
+class RenderTimeout(Exception):
+    """衍生图未能在 IMAGE_RENDER_TIMEOUT 秒内生成"""
+
+
+def init_app(app):
+    app.add_template_global(image_url)
+    app.add_template_global(image_srcset)
+
+
+def image_url(filename, width, fmt='jpeg'):
+    return url_for('media.product_image', width=width, fmt=fmt, filename=filename)
+
+
+def image_srcset(filename, fmt='jpeg'):
+    """'…/160/webp/a.png 160w, …/320/webp/a.png 320w, …'"""
+    return ', '.join(f'{image_url(filename, width, fmt)} {width}w'
+                     for width in current_app.config['IMAGE_WIDTHS'])
+
+
+def source_path(filename):
+    """原图绝对路径（媒体库文件名或 static/uploads/products 下的旧文件名）；文件名非法或文件不存在时返回 None"""
+    if media.is_media_name(filename):
+        path = media.object_path(filename)
+        return path if os.path.isfile(path) else None
+    folder = os.path.join(current_app.root_path, 'static', 'uploads', 'products')
+    path = safe_join(folder, filename)
+    if path and os.path.isfile(path):
+        return path
+    return None
+
+
+def get_derivative(src, width, fmt):
+    """
+    返回 (衍生图路径, etag)；缓存未命中时交给进程池生成
+
+    超时抛出 RenderTimeout（调用方可退回原图）。
+    """
+    cache_dir = current_app.config['IMAGE_CACHE_DIR']
+    path, key = derivative_path(src, width, fmt)
+
+    if os.path.exists(path):
+        _touch(path)
+        return path, key
+
+    with _lock:
+        future = _pending.get(key)
+        owner = future is None
+        if owner:
+            future = _pending[key] = Future()
+    if owner:
+        quality = current_app.config['IMAGE_QUALITY'][fmt]
+        _start(future, key, _render, src, path, width, fmt, quality)
+
+    try:
+        size = future.result(timeout=current_app.config['IMAGE_RENDER_TIMEOUT'])
+    except FutureTimeout:
+        raise RenderTimeout(src)
+
+    _account(cache_dir, size)
+    return path, key
+
+
+def derivative_path(src, width, fmt):
+    """(衍生图缓存路径, 缓存键)；键包含原图修改时间与大小，原图替换后自动换新文件"""
+    stat = os.stat(src)
+    key = hashlib.sha1(
+        f'{src}|{stat.st_mtime_ns}|{stat.st_size}|{width}|{fmt}|{RENDER_VERSION}'.encode()
+    ).hexdigest()
+    return os.path.join(current_app.config['IMAGE_CACHE_DIR'], key[:2], f'{key}.{fmt}'), key
+
+
+@task('images.derivatives')
+def render_derivatives(filenames):
+    """
+    后台任务：为产品图预先生成全部宽度与格式的衍生图（导入产品后入队），
+    前台首次访问时不再等待缩放。已存在的跳过，原图不存在的忽略。
+    """
+    cache_dir = current_app.config['IMAGE_CACHE_DIR']
+    rendered = missing = 0
+    for filename in filenames:
+        src = source_path(filename)
+        if src is None:
+            missing += 1
+            continue
+        for fmt in MIMETYPES:
+            for width in current_app.config['IMAGE_WIDTHS']:
+                path, _ = derivative_path(src, width, fmt)
+                if os.path.exists(path):
+                    continue
+                # worker 进程本身就在后台：直接生成，不再经过进程池
+                _account(cache_dir, _render(src, path, width, fmt, current_app.config['IMAGE_QUALITY'][fmt]))
+                rendered += 1
+    return {'rendered': rendered, 'missing': missing}
+
+
+def _render(src, dst, width, fmt, quality):
+    """在子进程中执行：缩放并写入 dst（先写临时文件再原子替换），返回文件字节数"""
+    from PIL import Image, ImageOps
+
+    with Image.open(src) as img:
+        # JPEG 可以在解码阶段直接降采样，大图省时省内存
+        img.draft('RGB', (width, width))
+        img = ImageOps.exif_transpose(img)
+        if img.width > width:
+            img.thumbnail((width, round(img.height * width / img.width) or 1), Image.LANCZOS)
+
+        if fmt == 'jpeg':
+            if img.mode in ('RGBA', 'LA', 'P'):
+                img = img.convert('RGBA')
+                background = Image.new('RGB', img.size, (255, 255, 255))
+                background.paste(img, mask=img.getchannel('A'))
+                img = background
+            elif img.mode != 'RGB':
+                img = img.convert('RGB')
+            options = {'quality': quality, 'optimize': True, 'progressive': True}
+        else:
+            if img.mode not in ('RGB', 'RGBA'):
+                img = img.convert('RGBA')
+            options = {'quality': quality, 'method': 4}
+
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        tmp = f'{dst}.{os.getpid()}.tmp'
+        img.save(tmp, format=fmt.upper(), **options)
+    os.replace(tmp, dst)
+    return os.path.getsize(dst)
+
+
+def _start(future, key, fn, *args):
+    """执行生成任务，结果写入 future（等待同一衍生图的请求共享它）"""
+    global _pool
+    workers = current_app.config['IMAGE_WORKERS']
+    if workers <= 0:
+        # 不使用进程池（开发环境 / 不支持多进程的平台）：在当前线程生成
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            _release(key, future)
+        return
+
+    with _lock:
+        if _pool is None:
+            # spawn：子进程不继承 worker 的线程与数据库连接
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+    _pool.submit(fn, *args).add_done_callback(lambda done: _relay(done, future, key))
+
+
+def _relay(done, future, key):
+    _release(key, future)
+    if done.exception() is not None:
+        future.set_exception(done.exception())
+    else:
+        future.set_result(done.result())
+
+
+def _release(key, future):
+    """生成结束：从合并表中移除（回调在进程池的结果线程中执行，与请求线程同样需要加锁）"""
+    with _lock:
+        if _pending.get(key) is future:
+            del _pending[key]
+
+
+def _touch(path):
+    # 以修改时间记录“最近使用”，供 LRU 淘汰（atime 在 noatime 挂载下不可靠）
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _account(cache_dir, added):
+    """累计本进程写入的字节数，超出预算时扫描目录并淘汰最久未用的文件"""
+    budget = current_app.config['IMAGE_CACHE_MAX_BYTES']
+    with _lock:
+        if _cache_bytes['total'] is None:
+            _cache_bytes['total'] = sum(size for _, _, size in _scan(cache_dir))
+        else:
+            _cache_bytes['total'] += added
+        if _cache_bytes['total'] <= budget:
+            return
+
+        files = sorted(_scan(cache_dir))
+        total = sum(size for _, _, size in files)
+        target = budget * 0.9
+        for _, path, size in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        _cache_bytes['total'] = total
+
+
+def _scan(cache_dir):
+    """[(mtime, 路径, 大小), ...]"""
+    entries = []
+    for root, _, files in os.walk(cache_dir):
+        for name in files:
+            if name.endswith('.tmp'):
+                # 生成中途崩溃留下的临时文件，超过一小时直接清理
+                path = os.path.join(root, name)
+                try:
+                    if time.time() - os.path.getmtime(path) > 3600:
+                        os.remove(path)
+                except OSError:
+                    pass
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path, stat.st_size))
+    return entries
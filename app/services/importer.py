@@ -0,0 +1,323 @@
+# app/services/importer.py
+"""
+产品批量导入（CSV / JSONL）
+
+flask catalog import 与后台“批量导入”共用。文件逐行流式读取，不会整体载入内存：
+
+1. 启动时一次性加载 分类名 -> id 映射（--create-categories 时缺失的分类批量创建）
+2. 每 batch_size 行为一批：校验、一次查询检查显式编号、从号段分配新编号、一条 executemany INSERT
+3. 每批一个事务：插入后在同一事务中整批写入全文搜索索引、同步精选系列关联表、产品图片表与媒体引用计数、
+   记录缓存失效标签，然后提交；系列的产品数与封面在全部导入后统一刷新
+4. 某一行有错误只跳过该行并记录行号与原因，不影响其他行
+
+CSV 列名（JSONL 为同名键）：
+    name（必填）, product_code（可空，留空自动分配）, category（分类名，也可用 category_name）,
+    description, image, photos, length, width, height, seat_height,
+    base_material, surface_material, featured_series, applicable_space
+"""
+import csv
+import json
+import re
+import time
+from datetime import datetime
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import Category, Product
+from app.services.changes import TAG_CATALOG, record_changes
+from app.services.product_codes import allocate
+from app.services.dimensions import deferred_dimension_indexing
+from app.services.media import OWNER_PRODUCT, add_refs, product_image_names
+from app.services.photos import sync_product_photos
+from app.services.search import deferred_indexing
+from app.services.series import parse_series, refresh_series_stats, sync_product_series
+
+FORMATS = ('csv', 'jsonl')
+
+TEXT_FIELDS = {
+    'name': 200, 'description': None, 'image': 200, 'photos': 1000,
+    'base_material': 100, 'surface_material': 100,
+    'featured_series': 200, 'applicable_space': 200,
+}
+INT_FIELDS = ('length', 'width', 'height', 'seat_height')
+
+PRODUCT_CODE_RE = re.compile(r'^pc\d{9}$')
+
+# 最多保留多少条行错误明细（总数照常统计）
+MAX_ERRORS = 1000
+# 一批写入撞上唯一约束时最多尝试几次
+INSERT_ATTEMPTS = 3
+
+
+class RowError(ValueError):
+    """单行数据不合法"""
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.failed = 0
+        self.categories_created = 0
+        self.errors = []          # [(行号, 原因), ...]
+        self.started_at = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started_at
+
+    def add_error(self, line_no, message):
+        self.failed += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((line_no, message))
+
+
+def detect_format(filename, default='csv'):
+    name = (filename or '').lower()
+    if name.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    if name.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def read_rows(stream, fmt):
+    """逐行读取文本流，产出 (行号, dict)；JSON 解析失败的行产出 (行号, RowError)"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_no, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_no, RowError(f'JSON 格式错误: {e}')
+                continue
+            if not isinstance(row, dict):
+                yield line_no, RowError('每行必须是一个 JSON 对象')
+                continue
+            yield line_no, row
+    else:
+        raise ValueError(f'不支持的导入格式: {fmt}')
+
+
+def import_file(stream, fmt, **options):
+    """导入一个文本流（CSV 需以 newline='' 打开），返回 ImportReport"""
+    return import_rows(read_rows(stream, fmt), **options)
+
+
+def import_rows(rows, batch_size=1000, create_categories=False, dry_run=False, progress=None):
+    """
+    导入 (行号, dict) 序列，返回 ImportReport
+
+    dry_run=True 时只做校验（包括编号冲突、分类是否存在），不写入数据库。
+    progress(report) 在每批处理完后调用。
+    """
+    report = ImportReport()
+    connection = db.session.connection()
+    categories = dict(connection.execute(select(Category.name, Category.id)).all())
+    seen_codes = set()
+    series_ids = set()       # 受影响的系列，全部导入完成后统一刷新统计
+    batch = []
+
+    for line_no, raw in rows:
+        report.rows += 1
+        try:
+            if isinstance(raw, Exception):
+                raise raw
+            batch.append((line_no, _clean_row(raw)))
+        except RowError as e:
+            report.add_error(line_no, str(e))
+            continue
+        if len(batch) >= batch_size:
+            _flush_batch(batch, categories, seen_codes, series_ids, report, create_categories, dry_run)
+            batch = []
+            if progress:
+                progress(report)
+
+    if batch:
+        _flush_batch(batch, categories, seen_codes, series_ids, report, create_categories, dry_run)
+        if progress:
+            progress(report)
+    if dry_run:
+        db.session.rollback()
+    elif series_ids:
+        # 系列产品数/封面按整个系列重新统计，逐批刷新代价随导入量平方增长
+        refresh_series_stats(series_ids)
+        record_changes({TAG_CATALOG})
+        db.session.commit()
+    return report
+
+
+def _clean_row(raw):
+    """把一行原始数据转换为 product 表的列值（分类名暂存在 category_name）"""
+    row = {}
+    for field, max_length in TEXT_FIELDS.items():
+        value = _text(raw.get(field))
+        if value and max_length and len(value) > max_length:
+            raise RowError(f'{field} 超过 {max_length} 个字符')
+        row[field] = value
+    if not row['name']:
+        raise RowError('缺少产品名称 name')
+    if row['featured_series']:
+        row['featured_series'] = ', '.join(parse_series(row['featured_series'])) or None
+
+    for field in INT_FIELDS:
+        value = raw.get(field)
+        if isinstance(value, str):
+            value = value.strip()
+        if value in (None, ''):
+            row[field] = None
+            continue
+        try:
+            row[field] = int(float(value))
+        except (TypeError, ValueError):
+            raise RowError(f'{field} 不是有效数字: {value!r}')
+        if row[field] < 0:
+            raise RowError(f'{field} 不能为负数')
+
+    code = _text(raw.get('product_code'))
+    if code and not PRODUCT_CODE_RE.match(code):
+        raise RowError(f'产品编号格式应为 pc + 9 位数字: {code}')
+    row['product_code'] = code
+    row['category_name'] = _text(raw.get('category') or raw.get('category_name'))
+    return row
+
+
+def _text(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _flush_batch(batch, categories, seen_codes, series_ids, report, create_categories, dry_run):
+    connection = db.session.connection()
+
+    # 1. 显式给出的产品编号：文件内去重 + 一次查询检查数据库中是否已存在
+    given = [row['product_code'] for _, row in batch if row['product_code']]
+    taken = set(connection.execute(
+        select(Product.product_code).where(Product.product_code.in_(given))
+    ).scalars()) if given else set()
+
+    pending = []
+    for line_no, row in batch:
+        code = row['product_code']
+        if code and (code in taken or code in seen_codes):
+            report.add_error(line_no, f'产品编号已存在: {code}')
+            continue
+        if code:
+            seen_codes.add(code)
+        pending.append((line_no, row))
+    generated = [row for _, row in pending if not row['product_code']]
+
+    if dry_run:
+        for line_no, row in pending:
+            name = row['category_name']
+            if name and name not in categories:
+                if not create_categories:
+                    report.add_error(line_no, f'分类不存在: {name}')
+                    continue
+                categories[name] = None
+                report.categories_created += 1
+            report.inserted += 1
+        return
+
+    # 2. 整批在一个事务中写入；撞上唯一约束（并发写入等）时整批回滚：
+    #    剔除编号已被其他写入占用的显式编号行，自动编号的行换一批编号，然后重试
+    for attempt in range(INSERT_ATTEMPTS):
+        # 编号必须在本事务写入之前分配：号段预留是独立的短事务，SQLite 只允许一个写者
+        for row, code in zip(generated, allocate(len(generated))):
+            row['product_code'] = code
+        try:
+            created, errors, inserted = _insert_batch(pending, categories, series_ids, create_categories)
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            categories.clear()
+            categories.update(db.session.execute(select(Category.name, Category.id)).all())
+            pending = _drop_taken_codes(pending, generated, report)
+            failure = e
+            continue
+        report.categories_created += created
+        for line_no, message in errors:
+            report.add_error(line_no, message)
+        report.inserted += inserted
+        return
+
+    for line_no, _ in pending:
+        report.add_error(line_no, f'写入失败（整批回滚）: {failure.orig}')
+
+
+def _drop_taken_codes(pending, generated, report):
+    """重试前重新检查显式编号（同第 1 步）：已被占用的行记为错误并剔除，返回剩余的行"""
+    generated_ids = {id(row) for row in generated}
+    given = [row['product_code'] for _, row in pending if id(row) not in generated_ids]
+    taken = set(db.session.execute(
+        select(Product.product_code).where(Product.product_code.in_(given))
+    ).scalars()) if given else set()
+    if not taken:
+        return pending
+    remaining = []
+    for line_no, row in pending:
+        if id(row) not in generated_ids and row['product_code'] in taken:
+            report.add_error(line_no, f'产品编号已存在: {row["product_code"]}')
+        else:
+            remaining.append((line_no, row))
+    return remaining
+
+
+def _insert_batch(pending, categories, series_ids, create_categories):
+    """在当前事务中写入一批，返回 (新建分类数, [(行号, 错误)], 插入行数)"""
+    connection = db.session.connection()
+
+    # 分类：名称 -> id（缺失的分类一次性创建）
+    created = 0
+    missing = {row['category_name'] for _, row in pending
+               if row['category_name'] and row['category_name'] not in categories}
+    if missing and create_categories:
+        connection.execute(insert(Category), [{'name': name} for name in sorted(missing)])
+        categories.update(connection.execute(
+            select(Category.name, Category.id).where(Category.name.in_(missing))
+        ).all())
+        created = len(missing)
+
+    errors = []
+    records = []
+    # 整批使用同一个 created_at：列表按 (created_at, id) 排序，同一批内按 id（即文件顺序）排列
+    now = datetime.utcnow()
+    for line_no, row in pending:
+        name = row['category_name']
+        if name and name not in categories:
+            errors.append((line_no, f'分类不存在: {name}'))
+            continue
+        record = dict(row, category_id=categories.get(name) if name else None, created_at=now)
+        del record['category_name']
+        records.append(record)
+
+    if records:
+        # 一条 executemany 插入整批。不用 RETURNING：SQLite 要求按参数顺序返回 id 时会退化为逐行 INSERT
+        with deferred_indexing(connection), deferred_dimension_indexing(connection):
+            connection.execute(insert(Product), records)
+        series_codes = [record['product_code'] for record in records if record['featured_series']]
+        if series_codes:
+            series_ids.update(sync_product_series(connection.execute(
+                select(Product.id).where(Product.product_code.in_(series_codes))
+            ).scalars().all(), connection, refresh_stats=False))
+        photo_codes = [record['product_code'] for record in records if record['image'] or record['photos']]
+        if photo_codes:
+            # Core INSERT 不经过 ORM 的 after_flush 钩子：图片表与媒体引用在这里同步，
+            # 否则导入产品使用的媒体库文件引用数为 0，会被 flask media gc 删除
+            images = {product_id: product_image_names(image, photos) for product_id, image, photos in connection.execute(
+                select(Product.id, Product.image, Product.photos).where(Product.product_code.in_(photo_codes))
+            )}
+            sync_product_photos(images, connection)
+            add_refs(OWNER_PRODUCT, images, connection)
+        record_changes({TAG_CATALOG})
+    return created, errors, len(records)
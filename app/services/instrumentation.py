@@ -0,0 +1,187 @@
+# app/services/instrumentation.py
+"""
+请求级性能埋点（INSTRUMENTATION = True 时启用，默认只在开发配置中开启）
+
+每个请求记录：SQL 条数、SQL 总耗时、模板渲染耗时、总耗时
+
+- 响应头 Server-Timing：浏览器开发者工具 Network -> Timing 中直接可见
+      Server-Timing: db;dur=3.1;desc="4 queries", tpl;dur=5.2, total;dur=11.0
+- 慢请求日志：总耗时超过 SLOW_REQUEST_MS 的请求写入 SLOW_REQUEST_LOG
+- N+1 检测（N_PLUS_ONE_THRESHOLD > 0 时）：同一请求中同一条 SQL 执行次数达到阈值，
+  记录警告并在响应头 X-N-Plus-One 中给出次数（通常是模板里逐条懒加载关联对象）
+- 按端点汇总（本进程内）：后台首页展示请求数、平均/最大耗时、平均查询数
+"""
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+
+from app import db
+
+slow_logger = logging.getLogger('app.slow_requests')
+
+_lock = threading.Lock()
+_summary = {}     # 端点 -> 统计
+
+
+class RequestStats:
+    __slots__ = ('started', 'queries', 'db_time', 'template_time', 'statements', '_query_start', '_render_start')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.statements = Counter()
+        self._query_start = []
+        self._render_start = []
+
+
+def init_app(app):
+    if not app.config.get('INSTRUMENTATION'):
+        return
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_query)
+            event.listen(engine, 'after_cursor_execute', _after_query)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+    log_path = app.config.get('SLOW_REQUEST_LOG')
+    if log_path and not slow_logger.handlers:
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        handler = logging.FileHandler(log_path, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        slow_logger.addHandler(handler)
+        slow_logger.setLevel(logging.INFO)
+
+
+def enabled():
+    return bool(current_app.config.get('INSTRUMENTATION'))
+
+
+def _stats():
+    if has_request_context():
+        return g.get('_request_stats')
+    return None
+
+
+# ====================== 事件钩子 ======================
+def _before_query(conn, cursor, statement, parameters, context, executemany):
+    stats = _stats()
+    if stats is not None:
+        stats._query_start.append(time.perf_counter())
+
+
+def _after_query(conn, cursor, statement, parameters, context, executemany):
+    stats = _stats()
+    if stats is None or not stats._query_start:
+        return
+    stats.db_time += time.perf_counter() - stats._query_start.pop()
+    stats.queries += 1
+    # 语句文本是参数化的：逐条懒加载时文本相同、只有参数不同
+    stats.statements[statement] += 1
+
+
+def _before_render(sender, template, context, **extra):
+    stats = _stats()
+    if stats is not None:
+        stats._render_start.append(time.perf_counter())
+
+
+def _after_render(sender, template, context, **extra):
+    stats = _stats()
+    if stats is not None and stats._render_start:
+        elapsed = time.perf_counter() - stats._render_start.pop()
+        if not stats._render_start:
+            # 只累计最外层（render_template 嵌套调用时不重复计算）
+            stats.template_time += elapsed
+
+
+def _start_request():
+    g._request_stats = RequestStats()
+
+
+def _finish_request(response):
+    stats = g.pop('_request_stats', None)
+    if stats is None:
+        return response
+    total = (time.perf_counter() - stats.started) * 1000
+    db_ms = stats.db_time * 1000
+    tpl_ms = stats.template_time * 1000
+
+    response.headers['Server-Timing'] = (
+        f'db;dur={db_ms:.1f};desc="{stats.queries} queries", '
+        f'tpl;dur={tpl_ms:.1f}, total;dur={total:.1f}'
+    )
+
+    repeated = None
+    threshold = current_app.config.get('N_PLUS_ONE_THRESHOLD') or 0
+    if threshold and stats.statements:
+        statement, count = stats.statements.most_common(1)[0]
+        if count >= threshold:
+            repeated = (count, ' '.join(statement.split())[:200])
+            response.headers['X-N-Plus-One'] = str(count)
+            current_app.logger.warning(
+                f'可能的 N+1 查询：{request.method} {request.path} 中同一语句执行了 {count} 次：{repeated[1]}'
+            )
+
+    slow = total >= current_app.config.get('SLOW_REQUEST_MS', 500)
+    if slow:
+        slow_logger.info(
+            f'{request.method} {request.full_path.rstrip("?")} endpoint={request.endpoint} '
+            f'status={response.status_code} total={total:.1f}ms db={db_ms:.1f}ms '
+            f'queries={stats.queries} tpl={tpl_ms:.1f}ms'
+            + (f' repeated={repeated[0]}x "{repeated[1]}"' if repeated else '')
+        )
+
+    _record(request.endpoint or request.path, total, db_ms, stats.queries, slow, repeated is not None)
+    return response
+
+
+# ====================== 按端点汇总 ======================
+def _record(endpoint, total, db_ms, queries, slow, n_plus_one):
+    with _lock:
+        item = _summary.get(endpoint)
+        if item is None:
+            item = _summary[endpoint] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'db_ms': 0.0,
+                                         'queries': 0, 'slow': 0, 'n_plus_one': 0}
+        item['count'] += 1
+        item['total_ms'] += total
+        item['max_ms'] = max(item['max_ms'], total)
+        item['db_ms'] += db_ms
+        item['queries'] += queries
+        item['slow'] += slow
+        item['n_plus_one'] += n_plus_one
+
+
+def summary():
+    """[{endpoint, count, avg_ms, max_ms, avg_db_ms, avg_queries, slow, n_plus_one}, ...]，按总耗时降序"""
+    with _lock:
+        items = [(endpoint, dict(item)) for endpoint, item in _summary.items()]
+    rows = []
+    for endpoint, item in sorted(items, key=lambda pair: pair[1]['total_ms'], reverse=True):
+        count = item['count']
+        rows.append({
+            'endpoint': endpoint,
+            'count': count,
+            'avg_ms': item['total_ms'] / count,
+            'max_ms': item['max_ms'],
+            'avg_db_ms': item['db_ms'] / count,
+            'avg_queries': item['queries'] / count,
+            'slow': item['slow'],
+            'n_plus_one': item['n_plus_one'],
+        })
+    return rows
+
+
+def reset():
+    with _lock:
+        _summary.clear()
@@ -0,0 +1,334 @@
+# app/services/jobs.py
+"""
+本地后台任务队列（SQLite 表，无需外部消息中间件）
+
+后台请求中耗时的工作（图片校验、衍生图生成、随之而来的缓存失效）不再在请求内完成：
+请求只调用 enqueue() 写入一条 job 记录（与业务数据同一事务提交）并立即返回，
+由 flask jobs worker 启动的 worker 进程池执行。
+
+- 任务：@task('名称') 注册的函数，参数为 JSON 可序列化的关键字参数，返回值（可选）存入 result
+- 领取：一条 UPDATE … WHERE id = (最早到期的 queued 任务) AND status = 'queued' RETURNING，
+  多个 worker 并发领取时同一任务只会被一个 worker 拿到（SQLite 写入串行，其他数据库靠 status 条件）
+- 重试：任务抛出异常时按 JOBS_RETRY_DELAY × 2^(次数-1)（加随机抖动，上限 JOBS_RETRY_MAX_DELAY）
+  推迟 run_at 重新排队，达到 max_attempts 后标记 failed；抛出 JobError 表示重试也无用（如图片尺寸不合格），直接失败
+- 超时回收：running 超过 JOBS_LOCK_TIMEOUT 秒的任务（worker 被强制结束）重新排队
+- 状态查询：后台 /admin/jobs/<id> 返回 JSON，页面轮询显示进度
+- JOBS_EAGER=True（开发、测试）：不需要 worker，请求中入队的任务在响应发送后由本进程执行
+"""
+import json
+import os
+import random
+import signal
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app, g, has_request_context
+from sqlalchemy import delete, func, select, update
+
+from app import db
+from app.models import Job
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+# 任务名 -> (函数, 默认最大尝试次数)
+TASKS = {}
+
+
+class JobError(Exception):
+    """任务不可重试的失败（输入本身有问题），直接标记 failed"""
+
+
+def task(name, max_attempts=None):
+    """注册任务：@task('images.derivatives')"""
+    def decorator(fn):
+        TASKS[name] = (fn, max_attempts)
+        return fn
+    return decorator
+
+
+def init_app(app):
+    app.after_request(_run_eager_after_response)
+
+
+# ====================== 入队与查询 ======================
+def enqueue(kind, delay=0, max_attempts=None, **payload):
+    """
+    写入一个任务（随当前事务提交），返回 Job；调用方负责 commit
+
+    enqueue('logo.process', path='pending/xxx.png')
+    """
+    if kind not in TASKS:
+        raise KeyError(f'未注册的任务: {kind}')
+    default_attempts = TASKS[kind][1] or current_app.config['JOBS_MAX_ATTEMPTS']
+    job = Job(kind=kind, payload=json.dumps(payload, ensure_ascii=False),
+              status=QUEUED, attempts=0, max_attempts=max_attempts or default_attempts,
+              run_at=datetime.utcnow() + timedelta(seconds=delay))
+    db.session.add(job)
+    db.session.flush()
+    if current_app.config['JOBS_EAGER'] and has_request_context():
+        g.setdefault('eager_jobs', []).append(job.id)
+    return job
+
+
+def status(job_id):
+    """任务状态字典（后台轮询接口使用）；不存在时返回 None"""
+    job = db.session.get(Job, job_id)
+    if job is None:
+        return None
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'run_at': job.run_at.isoformat() + 'Z' if job.run_at else None,
+        'error': job.last_error,
+        'result': json.loads(job.result) if job.result else None,
+    }
+
+
+def counts():
+    """{状态: 任务数}"""
+    return dict(db.session.execute(select(Job.status, func.count()).group_by(Job.status)).all())
+
+
+def retry_failed(job_ids=None):
+    """把 failed 任务重新排队（清零尝试次数），返回重新排队的数量"""
+    stmt = (update(Job).where(Job.status == FAILED)
+            .values(status=QUEUED, attempts=0, run_at=datetime.utcnow(), last_error=None, finished_at=None)
+            .execution_options(synchronize_session=False))
+    if job_ids:
+        stmt = stmt.where(Job.id.in_(job_ids))
+    count = db.session.execute(stmt).rowcount
+    db.session.commit()
+    return count
+
+
+# ====================== 领取与执行 ======================
+def claim(worker_id):
+    """原子领取一个到期任务，返回 (id, kind, payload, attempts, max_attempts) 或 None"""
+    now = datetime.utcnow()
+    candidate = (select(Job.id)
+                 .where(Job.status == QUEUED, Job.run_at <= now)
+                 .order_by(Job.run_at, Job.id)
+                 .limit(1)
+                 .scalar_subquery())
+    row = db.session.execute(
+        update(Job)
+        .where(Job.id == candidate, Job.status == QUEUED)
+        .values(status=RUNNING, locked_by=worker_id, locked_at=now, attempts=Job.attempts + 1)
+        .returning(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts)
+        .execution_options(synchronize_session=False)
+    ).first()
+    db.session.commit()
+    return row
+
+
+def execute(row, worker_id):
+    """执行已领取的任务并记录结果；返回最终状态"""
+    job_id, kind, payload, attempts, max_attempts = row
+    error = retry = None
+    started = time.monotonic()
+    try:
+        if kind not in TASKS:
+            raise JobError(f'未注册的任务: {kind}')
+        result = TASKS[kind][0](**json.loads(payload or '{}'))
+        db.session.commit()
+    except JobError as e:
+        db.session.rollback()
+        error, retry = str(e), False
+    except Exception as e:
+        db.session.rollback()
+        error, retry = f'{type(e).__name__}: {e}', attempts < max_attempts
+        current_app.logger.exception(f'任务 {job_id}（{kind}）第 {attempts} 次执行失败')
+
+    now = datetime.utcnow()
+    values = {'locked_by': None, 'locked_at': None}
+    if error is None:
+        values.update(status=DONE, finished_at=now, last_error=None,
+                      result=json.dumps(result, ensure_ascii=False) if result is not None else None)
+    elif retry:
+        values.update(status=QUEUED, last_error=error, run_at=now + timedelta(seconds=_backoff(attempts)))
+    else:
+        values.update(status=FAILED, last_error=error, finished_at=now)
+    # 只更新仍由本 worker 持有的任务（超时被回收、又被别的 worker 领取的不覆盖）
+    db.session.execute(
+        update(Job).where(Job.id == job_id, Job.locked_by == worker_id).values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    current_app.logger.info(f"任务 {job_id}（{kind}）{values['status']}，耗时 {time.monotonic() - started:.2f}s")
+    return values['status']
+
+
+def _backoff(attempts):
+    config = current_app.config
+    delay = min(config['JOBS_RETRY_DELAY'] * 2 ** (attempts - 1), config['JOBS_RETRY_MAX_DELAY'])
+    return delay * random.uniform(0.8, 1.2)
+
+
+def run_job(job_id, worker_id=None):
+    """立即执行指定任务（若仍在排队）；JOBS_EAGER 与测试使用"""
+    worker_id = worker_id or _worker_id()
+    row = db.session.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status == QUEUED)
+        .values(status=RUNNING, locked_by=worker_id, locked_at=datetime.utcnow(), attempts=Job.attempts + 1)
+        .returning(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts)
+        .execution_options(synchronize_session=False)
+    ).first()
+    db.session.commit()
+    return execute(row, worker_id) if row else None
+
+
+def _run_eager_after_response(response):
+    job_ids = g.pop('eager_jobs', None)
+    if job_ids:
+        app = current_app._get_current_object()
+
+        def run():
+            with app.app_context():
+                for job_id in job_ids:
+                    run_job(job_id)
+                db.session.remove()
+        # 响应发送完毕后再执行，请求本身不等待任务
+        response.call_on_close(run)
+    return response
+
+
+def requeue_stale():
+    """running 超过 JOBS_LOCK_TIMEOUT 的任务（worker 已被强制结束）：重新排队或标记失败"""
+    now = datetime.utcnow()
+    stale = (Job.status == RUNNING,
+             Job.locked_at < now - timedelta(seconds=current_app.config['JOBS_LOCK_TIMEOUT']))
+    requeued = db.session.execute(
+        update(Job).where(*stale, Job.attempts < Job.max_attempts)
+        .values(status=QUEUED, locked_by=None, locked_at=None, run_at=now, last_error='worker 执行超时')
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.execute(
+        update(Job).where(*stale)
+        .values(status=FAILED, locked_by=None, locked_at=None, finished_at=now, last_error='worker 执行超时')
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return requeued
+
+
+def purge_finished():
+    """删除超过 JOBS_RETENTION_DAYS 的已完成任务（失败的保留，便于排查和重试）"""
+    cutoff = datetime.utcnow() - timedelta(days=current_app.config['JOBS_RETENTION_DAYS'])
+    count = db.session.execute(delete(Job).where(Job.status == DONE, Job.finished_at < cutoff)).rowcount
+    db.session.commit()
+    return count
+
+
+# ====================== worker ======================
+def _worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def work(app, stop, burst=False):
+    """
+    worker 主循环：领取并执行任务，队列空闲时每 JOBS_POLL_INTERVAL 秒检查一次
+
+    stop 为 threading.Event（收到 SIGTERM 时置位，执行中的任务完成后退出）；
+    burst=True 时队列清空即返回。返回执行的任务数。
+    """
+    worker_id = _worker_id()
+    handled = 0
+    maintained_at = 0.0
+    with app.app_context():
+        interval = app.config['JOBS_POLL_INTERVAL']
+        try:
+            while not stop.is_set():
+                if time.monotonic() - maintained_at > 60:
+                    requeue_stale()
+                    purge_finished()
+                    maintained_at = time.monotonic()
+                row = claim(worker_id)
+                if row is None:
+                    if burst:
+                        break
+                    stop.wait(interval)
+                    continue
+                execute(row, worker_id)
+                handled += 1
+                db.session.remove()  # 每个任务使用干净的会话
+        finally:
+            db.session.remove()
+    return handled
+
+
+def run_workers(app, processes=1, burst=False):
+    """启动 processes 个 worker 进程（同 app/server.py：fork 共享已加载的应用，主进程补齐异常退出的 worker）"""
+    from app.server import _dispose_engines, _kill, log
+
+    stop = threading.Event()
+    if processes <= 1 or not hasattr(os, 'fork'):
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+        log('任务 worker 已启动')
+        handled = work(app, stop, burst=burst)
+        log(f'任务 worker 已停止（执行 {handled} 个任务）')
+        return
+
+    children = {}
+    state = {'stopping': False}
+
+    def spawn():
+        # 与 app/server.py 相同：等待重启期间收到停止信号则不再启动，fork 后才收到的补发 SIGTERM
+        if state['stopping']:
+            return
+        pid = os.fork()
+        if pid:
+            children[pid] = time.monotonic()
+            if state['stopping']:
+                _kill(pid, signal.SIGTERM)
+            return
+        # ---- 子进程 ----
+        code = 0
+        try:
+            signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+            signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C 由主进程统一处理
+            _dispose_engines(app, close=False)
+            random.seed()
+            log('任务 worker 已启动')
+            work(app, stop, burst=burst)
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+
+    def handle_stop(signum, frame):
+        if state['stopping']:
+            for pid in list(children):
+                _kill(pid, signal.SIGKILL)
+            return
+        state['stopping'] = True
+        log('收到停止信号，等待执行中的任务完成…')
+        for pid in list(children):
+            _kill(pid, signal.SIGTERM)
+
+    _dispose_engines(app)
+    signal.signal(signal.SIGTERM, handle_stop)
+    signal.signal(signal.SIGINT, handle_stop)
+    for _ in range(processes):
+        spawn()
+
+    while children:
+        try:
+            pid, exit_status = os.waitpid(-1, 0)
+        except InterruptedError:
+            continue
+        except ChildProcessError:
+            break
+        children.pop(pid, None)
+        if not state['stopping'] and (os.WIFSIGNALED(exit_status) or os.WEXITSTATUS(exit_status)):
+            log(f'任务 worker {pid} 异常退出（状态 {exit_status}），重新启动')
+            time.sleep(1)
+            spawn()
+    log('任务 worker 已全部停止')
@@ -0,0 +1,41 @@
+# app/services/logo.py
+"""
+公司 Logo 上传处理
+
+后台保存设置时只把上传文件存入媒体库（services/media.py：流式写入并计算哈希，检查大小与像素数，不解码图片）
+并入队 logo.process 任务；任务中完整解码一次校验文件，检查尺寸，合格则写入 Settings.logo、登记引用，
+并失效设置缓存与页面缓存（其他 worker 通过 cache_version / cache_invalidation 表感知）。
+不合格的文件没有引用，由 flask media gc 回收。
+"""
+from PIL import Image
+
+from app import db
+from app.models import MediaObject, Settings
+from app.services import media, settings_cache
+from app.services.jobs import JobError, task
+
+MAX_WIDTH, MAX_HEIGHT = 600, 300
+
+
+@task('logo.process', max_attempts=3)
+def process_logo(name):
+    obj = db.session.get(MediaObject, media.parse_name(name) or '')
+    if obj is None:
+        raise JobError('Logo 文件不存在')
+
+    try:
+        with Image.open(media.object_path(obj.name)) as img:
+            img.load()  # 完整解码：截断、损坏的文件在这里失败
+    except FileNotFoundError:
+        raise JobError('Logo 文件不存在')
+    except Exception as e:
+        raise JobError(f'图片无法识别：{e}')
+    if obj.width > MAX_WIDTH or obj.height > MAX_HEIGHT:
+        raise JobError(f'Logo 尺寸 {obj.width}×{obj.height} 超过 {MAX_WIDTH}×{MAX_HEIGHT}，请重新上传')
+
+    settings = Settings.query.first()
+    if settings is not None:
+        settings.logo = obj.name   # 文件名变化：after_flush 记录 settings 标签，页面缓存随之失效
+        media.set_refs(media.OWNER_LOGO, settings.id, [obj.name])
+    settings_cache.invalidate()
+    return {'width': obj.width, 'height': obj.height, 'name': obj.name}
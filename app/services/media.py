@@ -0,0 +1,362 @@
+# app/services/media.py
+"""
+内容寻址媒体库
+
+上传的图片按内容 SHA-256 存储：MEDIA_STORE_DIR/ab/cd/<sha256>.<扩展名>，
+文件名 <sha256>.<扩展名> 直接写入 Product.image / photos、Settings.logo。
+
+- 去重：同一张图片给多少个产品上传都只存一份
+- 上传：按块从请求流读取，边写临时文件边计算哈希，超过 MEDIA_MAX_BYTES（不超过 MAX_CONTENT_LENGTH）立即中止；
+  再只读取图片文件头检查格式与像素数（MEDIA_MAX_PIXELS），超大图片不会被解码；扩展名由实际格式决定
+- 引用计数：media_ref 记录每个产品 / Logo 引用的对象，media_object.ref_count 随之增减；
+  ORM 修改产品图片时自动同步，批量 SQL 写入后调用 set_refs() / add_refs() / drop_refs() 或 flask media gc --recount
+- 回收：ref_count 为 0 且超过 MEDIA_GC_GRACE 秒的对象由 flask media gc 删除
+  （上传后任务尚未完成、表单尚未保存的对象在宽限期内保留；宽限期从最近一次存入同一内容算起）；
+  上传与回收都先取得对象行的写锁，回收不会删掉刚被重新上传或引用的文件
+- URL：/media/o/<sha256>.<扩展名>，内容不变 URL 就不变，Cache-Control: immutable, max-age=一年
+
+旧数据（static/uploads/products 下的文件名、固定文件名的 company_logo）照常可用，
+flask media migrate 把它们导入媒体库并改写数据库中的文件名（原文件保留，旧 URL 不失效）。
+"""
+import hashlib
+import os
+import re
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+
+from flask import current_app, url_for
+from PIL import Image, UnidentifiedImageError
+from sqlalchemy import bindparam, delete, event, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import MediaObject, MediaRef, Product, Settings
+
+# Pillow 格式 -> (扩展名, MIME 类型)；只接受这些格式
+FORMATS = {
+    'JPEG': ('jpg', 'image/jpeg'),
+    'PNG': ('png', 'image/png'),
+    'WEBP': ('webp', 'image/webp'),
+    'GIF': ('gif', 'image/gif'),
+}
+MIMETYPES = {ext: mimetype for ext, mimetype in FORMATS.values()}
+
+NAME_PATTERN = re.compile(r'^([0-9a-f]{64})\.([a-z0-9]{1,10})$')
+CHUNK_SIZE = 64 * 1024
+
+OWNER_PRODUCT = 'product'
+OWNER_LOGO = 'logo'
+
+
+class MediaError(ValueError):
+    """上传的文件不合格（过大、不是图片、像素数超限）"""
+
+
+def init_app(app):
+    app.add_template_global(media_url)
+
+
+# ====================== 文件名与 URL ======================
+def parse_name(name):
+    """'<sha256>.<ext>' -> sha256；旧文件名返回 None"""
+    match = NAME_PATTERN.match((name or '').strip())
+    return match.group(1) if match else None
+
+
+def is_media_name(name):
+    return parse_name(name) is not None
+
+
+def object_path(name):
+    sha256, _, ext = name.partition('.')
+    return os.path.join(current_app.config['MEDIA_STORE_DIR'], sha256[:2], sha256[2:4], f'{sha256}.{ext}')
+
+
+def media_url(name, legacy_folder='uploads/products', _external=False):
+    """媒体库文件名 -> /media/o/…；旧文件名 -> static/<legacy_folder>/…"""
+    name = (name or '').strip()
+    if is_media_name(name):
+        return url_for('media.media_object', name=name, _external=_external)
+    return url_for('static', filename=f'{legacy_folder}/{name}', _external=_external)
+
+
+def url_builder(legacy_folder='uploads/products', _external=False):
+    """返回 name -> URL 函数（逐行序列化时使用：只调用两次 url_for）"""
+    media_prefix = url_for('media.media_object', name='_', _external=_external)[:-1]
+    legacy_prefix = url_for('static', filename=f'{legacy_folder}/', _external=_external)
+
+    def build(name):
+        if not name:
+            return None
+        name = name.strip()
+        return f'{media_prefix}{name}' if is_media_name(name) else f'{legacy_prefix}{name}'
+    return build
+
+
+def product_image_names(image, photos):
+    """产品的主图与多图文件名（去重，保持顺序）"""
+    names = [image] if image else []
+    names += (photos or '').split(',')
+    return list(dict.fromkeys(name.strip() for name in names if name and name.strip()))
+
+
+# ====================== 存储 ======================
+def store_upload(upload):
+    """保存上传文件（werkzeug FileStorage），返回 MediaObject（调用方提交事务）"""
+    config = current_app.config
+    limits = [limit for limit in (config.get('MEDIA_MAX_BYTES'), config.get('MAX_CONTENT_LENGTH')) if limit]
+    return _store(upload.stream, max_bytes=min(limits) if limits else None,
+                  max_pixels=config.get('MEDIA_MAX_PIXELS'))
+
+
+def store_file(path):
+    """把服务器上已有的文件导入媒体库（迁移旧数据用，不限制大小）"""
+    with open(path, 'rb') as f:
+        return _store(f)
+
+
+def _store(stream, max_bytes=None, max_pixels=None):
+    tmp_dir = os.path.join(current_app.config['MEDIA_STORE_DIR'], 'tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, 'wb') as f:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise MediaError(f'文件超过 {max_bytes // (1024 * 1024)}MB 限制')
+                digest.update(chunk)
+                f.write(chunk)
+
+        # Image.open 只读取文件头（格式与尺寸），不解码像素
+        try:
+            with Image.open(tmp_path) as img:
+                fmt, (width, height) = img.format, img.size
+        except (UnidentifiedImageError, Image.DecompressionBombError) as e:
+            raise MediaError(f'不是可识别的图片：{e}')
+        if fmt not in FORMATS:
+            raise MediaError(f'不支持的图片格式：{fmt}')
+        if max_pixels and width * height > max_pixels:
+            raise MediaError(f'图片像素过多（{width}×{height}），请缩小后上传')
+
+        sha256 = digest.hexdigest()
+        ext, mimetype = FORMATS[fmt]
+        obj = _claim_object(sha256, ext, mimetype, size, width, height)
+        # 此时已持有对象行的写锁（直到调用方提交），GC 不会再删除它；
+        # 文件不存在（首次存入，或刚被 GC 删除）时放入，临时文件在此之前一直保留
+        path = object_path(obj.name)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return obj
+
+
+def _claim_object(sha256, ext, mimetype, size, width, height):
+    """取得（必要时创建）对象行，并在当前事务中持有它的写锁"""
+    # 已有对象：刷新 created_at，GC 宽限期从最近一次存入算起（上传后尚未登记引用的对象不会被回收）
+    touched = db.session.execute(
+        update(MediaObject).where(MediaObject.sha256 == sha256).values(created_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if touched:
+        return db.session.get(MediaObject, sha256, populate_existing=True)
+    obj = MediaObject(sha256=sha256, ext=ext, mimetype=mimetype, size=size,
+                      width=width, height=height, ref_count=0)
+    try:
+        with db.session.begin_nested():
+            db.session.add(obj)
+    except IntegrityError:
+        # 另一个请求同时上传了同一文件
+        obj = db.session.get(MediaObject, sha256)
+    return obj
+
+
+# ====================== 引用计数 ======================
+def set_refs(owner_type, owner_id, names, connection=None):
+    """把某个产品 / Logo 引用的对象设置为 names（只计媒体库中的文件），增减 ref_count"""
+    connection = connection or db.session.connection()
+    wanted = {sha for sha in map(parse_name, names) if sha}
+    if wanted:
+        wanted = set(connection.execute(select(MediaObject.sha256).where(MediaObject.sha256.in_(wanted))).scalars())
+    existing = set(connection.execute(
+        select(MediaRef.sha256).where(MediaRef.owner_type == owner_type, MediaRef.owner_id == owner_id)
+    ).scalars())
+
+    added, removed = wanted - existing, existing - wanted
+    if added:
+        connection.execute(insert(MediaRef), [
+            {'owner_type': owner_type, 'owner_id': owner_id, 'sha256': sha} for sha in added])
+        connection.execute(update(MediaObject).where(MediaObject.sha256.in_(added))
+                           .values(ref_count=MediaObject.ref_count + 1))
+    if removed:
+        connection.execute(delete(MediaRef).where(MediaRef.owner_type == owner_type,
+                                                  MediaRef.owner_id == owner_id,
+                                                  MediaRef.sha256.in_(removed)))
+        connection.execute(update(MediaObject).where(MediaObject.sha256.in_(removed))
+                           .values(ref_count=MediaObject.ref_count - 1))
+
+
+def add_refs(owner_type, names_by_owner, connection=None):
+    """
+    为一批新建的所有者（批量导入的产品）登记引用：{所有者 id: 文件名列表}
+
+    所有者此前没有引用，不需要逐个比较；一次查询筛出媒体库中存在的对象，executemany 写入引用并增加计数。
+    返回登记的引用数。
+    """
+    connection = connection or db.session.connection()
+    wanted = {owner_id: {sha for sha in map(parse_name, names) if sha} for owner_id, names in names_by_owner.items()}
+    shas = list(set().union(*wanted.values())) if wanted else []
+    known = set()
+    for start in range(0, len(shas), 500):
+        known.update(connection.execute(
+            select(MediaObject.sha256).where(MediaObject.sha256.in_(shas[start:start + 500]))
+        ).scalars())
+    refs = [{'owner_type': owner_type, 'owner_id': owner_id, 'sha256': sha}
+            for owner_id, owned in wanted.items() for sha in owned & known]
+    if not refs:
+        return 0
+    connection.execute(insert(MediaRef), refs)
+    counts = Counter(ref['sha256'] for ref in refs)
+    connection.execute(
+        update(MediaObject).where(MediaObject.sha256 == bindparam('sha'))
+        .values(ref_count=MediaObject.ref_count + bindparam('added')),
+        [{'sha': sha, 'added': count} for sha, count in counts.items()])
+    return len(refs)
+
+
+def drop_refs(owner_type, owner_ids, connection=None):
+    """删除一批所有者（批量删除产品）的全部引用：一次查询统计各对象减少的引用数，executemany 更新计数"""
+    connection = connection or db.session.connection()
+    owner_ids = list(owner_ids)
+    owned = (MediaRef.owner_type == owner_type, MediaRef.owner_id.in_(owner_ids))
+    counts = connection.execute(
+        select(MediaRef.sha256, func.count()).where(*owned).group_by(MediaRef.sha256)
+    ).all()
+    if not counts:
+        return 0
+    connection.execute(
+        update(MediaObject).where(MediaObject.sha256 == bindparam('sha'))
+        .values(ref_count=MediaObject.ref_count - bindparam('removed')),
+        [{'sha': sha, 'removed': count} for sha, count in counts])
+    return connection.execute(delete(MediaRef).where(*owned)).rowcount
+
+
+def recount_refs(connection=None):
+    """按 product / settings 表的实际内容全量重建引用与计数，返回引用数"""
+    connection = connection or db.session.connection()
+    known = set(connection.execute(select(MediaObject.sha256)).scalars())
+    refs = set()
+    rows = connection.execute(
+        select(Product.id, Product.image, Product.photos).execution_options(yield_per=2000))
+    for product_id, image, photos in rows:
+        for sha in map(parse_name, product_image_names(image, photos)):
+            if sha in known:
+                refs.add((OWNER_PRODUCT, product_id, sha))
+    for settings_id, logo in connection.execute(select(Settings.id, Settings.logo)):
+        sha = parse_name(logo)
+        if sha in known:
+            refs.add((OWNER_LOGO, settings_id, sha))
+
+    connection.execute(delete(MediaRef))
+    refs = [{'owner_type': t, 'owner_id': i, 'sha256': s} for t, i, s in refs]
+    for start in range(0, len(refs), 1000):
+        connection.execute(insert(MediaRef), refs[start:start + 1000])
+    count = (select(func.count()).select_from(MediaRef)
+             .where(MediaRef.sha256 == MediaObject.sha256).scalar_subquery())
+    connection.execute(update(MediaObject).values(ref_count=count))
+    return len(refs)
+
+
+def collect_garbage(grace=None):
+    """删除无引用且超过宽限期的对象，返回 (对象数, 字节数)；调用方无需再提交"""
+    grace = current_app.config['MEDIA_GC_GRACE'] if grace is None else grace
+    cutoff = datetime.utcnow() - timedelta(seconds=grace)
+    # 条件在 DELETE 中判断并返回实际删除的行：查询之后才被引用、被重新上传的对象不会误删
+    rows = db.session.execute(
+        delete(MediaObject)
+        .where(MediaObject.ref_count <= 0, MediaObject.created_at < cutoff)
+        .returning(MediaObject.sha256, MediaObject.ext, MediaObject.size)
+        .execution_options(synchronize_session=False)
+    ).all()
+    # 在提交（释放写锁）之前删除文件：上传要先取得对象行的写锁（_claim_object），
+    # 因此不会在删除记录与删除文件之间重新登记同一对象。提交失败时留下的记录没有引用，
+    # 再次上传同一内容时 _store 会重新放入文件
+    for row in rows:
+        try:
+            os.remove(object_path(f'{row.sha256}.{row.ext}'))
+        except FileNotFoundError:
+            pass
+    db.session.commit()
+    return len(rows), sum(row.size for row in rows)
+
+
+# ====================== 旧数据迁移 ======================
+def migrate_legacy():
+    """
+    把 static/uploads/products 下被产品引用的文件与 company_logo 导入媒体库，改写文件名
+    返回 (改写的产品数, 导入的文件数)；原文件不删除
+    """
+    from app.services.changes import TAG_CATALOG, TAG_SETTINGS, record_changes
+    from app.services.photos import sync_all_photos
+    from app.services.series import refresh_series_stats
+
+    static = current_app.static_folder
+    mapping = {}          # 旧文件路径 -> 媒体库文件名（文件不存在时为 None，保留旧文件名）
+
+    def convert(name, folder):
+        name = name.strip()
+        if not name or is_media_name(name):
+            return name
+        path = os.path.join(static, folder, name)
+        if path not in mapping:
+            mapping[path] = store_file(path).name if os.path.isfile(path) else None
+        return mapping[path] or name
+
+    rows = db.session.execute(select(Product.id, Product.image, Product.photos)).all()
+    updated = 0
+    for product_id, image, photos in rows:
+        new_image = convert(image, 'uploads/products') if image else image
+        new_photos = ','.join(convert(photo, 'uploads/products') for photo in photos.split(',')) if photos else photos
+        if (new_image, new_photos) != (image, photos):
+            db.session.execute(update(Product).where(Product.id == product_id)
+                               .values(image=new_image, photos=new_photos)
+                               .execution_options(synchronize_session=False))
+            updated += 1
+
+    for settings in Settings.query.filter(Settings.logo.isnot(None), Settings.logo != ''):
+        settings.logo = convert(settings.logo, 'uploads/logo')
+
+    db.session.flush()
+    recount_refs()
+    sync_all_photos()          # 产品图片表中的文件名随之改写（尺寸、哈希从媒体库复制）
+    refresh_series_stats()     # 系列封面图随产品主图换成新文件名
+    record_changes({TAG_CATALOG, TAG_SETTINGS})
+    db.session.commit()
+    return updated, sum(1 for value in mapping.values() if value)
+
+
+# ====================== ORM 修改产品图片时同步引用 ======================
+@event.listens_for(db.session, 'after_flush')
+def _sync_product_refs(session, flush_context):
+    connection = None
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, Product) or obj.id is None:
+            continue
+        state = db.inspect(obj)
+        if obj in session.deleted:
+            names = []
+        elif obj in session.new or state.attrs.image.history.has_changes() or state.attrs.photos.history.has_changes():
+            names = product_image_names(obj.image, obj.photos)
+        else:
+            continue
+        connection = connection or session.connection()
+        set_refs(OWNER_PRODUCT, obj.id, names, connection)
@@ -0,0 +1,80 @@
+# app/services/pagination.py
+"""
+键集（游标）分页
+
+按 (created_at, id) 倒序翻页：下一页条件是“比上一页最后一条更早”，即行值比较
+(created_at, id) < (游标)。created_at 必填，没有 NULL 需要排序；
+配合 (created_at, id) 复合索引，第 500 页和第 1 页的开销相同，
+不需要 OFFSET 扫描，也不需要 COUNT(*)。
+
+游标是上一页最后一条记录的 created_at 与 id，经 base64url 编码后放在 URL 中。
+后台列表还需要“上一页”：keyset_page_before() 以本页第一条为游标反向取。
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from flask import request
+from sqlalchemy import tuple_
+
+from app.models import Product
+
+
+def encode_cursor(created_at, product_id):
+    raw = f"{created_at.isoformat()}|{product_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """解析游标，返回 (created_at, id)；无效游标返回 None（从第一页开始）"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        created_at, product_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(product_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def page_size(default, maximum):
+    """读取 ?per_page=，限制在 1..maximum 之间"""
+    value = request.args.get('per_page', type=int) or default
+    return max(1, min(value, maximum))
+
+
+def keyset_page(query, per_page, cursor=None):
+    """
+    对 Product 查询做键集分页，返回 (本页产品列表, 下一页游标或 None)
+
+    多取一条用来判断是否还有下一页。
+    """
+    if cursor is not None:
+        query = query.filter(tuple_(Product.created_at, Product.id) < cursor)
+
+    rows = (query.order_by(Product.created_at.desc(), Product.id.desc())
+                 .limit(per_page + 1)
+                 .all())
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return rows, next_cursor
+
+
+def keyset_page_before(query, per_page, cursor):
+    """
+    上一页：cursor（本页第一条）之前、按列表顺序紧挨着的 per_page 条，
+    返回 (本页产品列表（列表顺序）, 是否还有更前的页)
+
+    反向（升序）取 per_page + 1 条再倒转，开销与向后翻页相同。
+    """
+    query = query.filter(tuple_(Product.created_at, Product.id) > cursor)
+
+    rows = (query.order_by(Product.created_at.asc(), Product.id.asc())
+                 .limit(per_page + 1)
+                 .all())
+    has_prev = len(rows) > per_page
+    return rows[:per_page][::-1], has_prev
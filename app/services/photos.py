@@ -0,0 +1,249 @@
+# app/services/photos.py
+"""
+产品图片：把 Product.image + Product.photos（逗号分隔字符串）规范化为 product_photo 表
+
+每个产品一行一张图：position 0 为封面（主图；没有主图时为第一张多图），其余为画廊图片，
+并记录宽高、字节数、主色调与内容哈希，页面据此输出 width / height 与占位背景色，图片到达前不再重排。
+
+- sync_product_photos()  按产品 id 增量同步（文件名未变的图片保留已有的尺寸、颜色等信息）
+- sync_all_photos()      全量迁移/重建（init_schema.py 与 flask catalog sync-photos 调用）
+- analyze_photos()       读取尚未分析的图片：宽高、字节数、主色调、哈希（photos.analyze 任务）
+- cover_photos()         一次查询取回一页产品的封面（模板函数，列表页使用）
+- product_photos()       详情页：某产品的全部图片
+- without_photos()       “没有图片的产品”查询条件
+
+image / photos 仍是后台编辑与导入的字段；ORM 修改时 after_flush 钩子在同一事务中同步，
+批量 SQL 写入则需要调用方自行调用 sync_product_photos()。媒体库文件的宽高与哈希同步时
+直接从 media_object 复制，主色调等仍由 photos.analyze 任务补齐。
+"""
+import hashlib
+import os
+
+from flask import current_app
+from PIL import Image
+from sqlalchemy import delete, event, exists, insert, select, update
+
+from app import db
+from app.models import MediaObject, Product, ProductPhoto
+from app.services import images, media
+from app.services.changes import TAG_CATALOG, product_tag, record_changes
+from app.services.jobs import task
+
+# 同步时保留的列（文件名未变时沿用旧值；alt 只属于本产品）
+META_COLUMNS = ('alt', 'width', 'height', 'size', 'dominant_color', 'sha256')
+
+# 主色调：缩小到该尺寸后量化为 PALETTE_COLORS 种颜色，取像素最多的一种
+SAMPLE_SIZE = (64, 64)
+PALETTE_COLORS = 5
+
+
+def init_app(app):
+    app.add_template_global(cover_photos)
+
+
+# ====================== 同步 ======================
+def _replace(connection, wanted):
+    """把 wanted（{产品 id: [文件名, …]}）中各产品的图片行替换为新列表，返回写入的行数"""
+    product_ids = list(wanted)
+    known = {}
+    for row in connection.execute(
+        select(ProductPhoto.product_id, ProductPhoto.filename,
+               *(getattr(ProductPhoto, column) for column in META_COLUMNS))
+        .where(ProductPhoto.product_id.in_(product_ids))
+    ):
+        known[row.product_id, row.filename] = row
+        if row.sha256:
+            # 旧文件名迁入媒体库后内容不变：按哈希沿用已分析的信息
+            known.setdefault((row.product_id, row.sha256), row)
+    # 其他产品已在使用（并已分析过）的同一文件
+    filenames = {name for names in wanted.values() for name in names}
+    analyzed = {row.filename: row for row in connection.execute(
+        select(ProductPhoto.filename, *(getattr(ProductPhoto, column) for column in META_COLUMNS))
+        .where(ProductPhoto.filename.in_(filenames), ProductPhoto.dominant_color.isnot(None))
+    )} if filenames else {}
+    digests = {media.parse_name(name) for name in filenames} - {None}
+    objects = {row.sha256: row for row in connection.execute(
+        select(MediaObject.sha256, MediaObject.width, MediaObject.height, MediaObject.size)
+        .where(MediaObject.sha256.in_(digests))
+    )} if digests else {}
+
+    records = []
+    for product_id, names in wanted.items():
+        for position, name in enumerate(names):
+            record = dict.fromkeys(META_COLUMNS)
+            record.update(product_id=product_id, position=position, filename=name)
+            digest = media.parse_name(name)
+            old = known.get((product_id, name)) or (known.get((product_id, digest)) if digest else None)
+            obj = objects.get(digest)
+            shared = analyzed.get(name)
+            if old is not None:
+                record.update({column: getattr(old, column) for column in META_COLUMNS})
+            elif shared is not None:
+                record.update({column: getattr(shared, column) for column in META_COLUMNS if column != 'alt'})
+            elif obj is not None:
+                record.update(width=obj.width, height=obj.height, size=obj.size, sha256=obj.sha256)
+            records.append(record)
+
+    connection.execute(delete(ProductPhoto).where(ProductPhoto.product_id.in_(product_ids)))
+    if records:
+        connection.execute(insert(ProductPhoto), records)
+    return len(records)
+
+
+def sync_product_photos(product_ids, connection=None):
+    """按产品的 image / photos 重建这些产品的图片行，返回写入的行数"""
+    connection = connection or db.session.connection()
+    product_ids = list(product_ids)
+    count = 0
+    for chunk in _chunks(product_ids, 500):
+        rows = connection.execute(
+            select(Product.id, Product.image, Product.photos).where(Product.id.in_(chunk))
+        ).all()
+        wanted = dict.fromkeys(chunk, ())   # 已删除的产品：清空
+        wanted.update({product_id: media.product_image_names(image, photos) for product_id, image, photos in rows})
+        count += _replace(connection, wanted)
+    return count
+
+
+def sync_all_photos(connection=None):
+    """全量迁移：按所有产品的 image / photos 重建 product_photo，返回 (有图产品数, 图片数)"""
+    connection = connection or db.session.connection()
+    # 绕过 ORM 删除的产品留下的行
+    connection.execute(delete(ProductPhoto).where(~ProductPhoto.product_id.in_(select(Product.id))))
+
+    product_count = photo_count = 0
+    rows = connection.execute(
+        select(Product.id, Product.image, Product.photos).execution_options(yield_per=1000))
+    for partition in rows.partitions():
+        wanted = {product_id: media.product_image_names(image, photos) for product_id, image, photos in partition}
+        photo_count += _replace(connection, wanted)
+        product_count += sum(1 for names in wanted.values() if names)
+    return product_count, photo_count
+
+
+# ====================== 分析（尺寸、主色调、哈希） ======================
+def analyze_photos(product_ids=None):
+    """
+    为尚未分析的图片填写宽高、字节数、主色调与内容哈希，返回分析的文件数（调用方提交）
+
+    同一文件被多个产品使用时只读取一次；文件不存在的图片跳过（下次仍会重试）。
+    """
+    query = select(ProductPhoto.filename).where(ProductPhoto.dominant_color.is_(None)).distinct()
+    if product_ids is not None:
+        query = query.where(ProductPhoto.product_id.in_(list(product_ids)))
+    filenames = db.session.execute(query).scalars().all()
+
+    analyzed = 0
+    changed = set()
+    for filename in filenames:
+        values = inspect_image(filename)
+        if values is None:
+            continue
+        changed.update(db.session.execute(
+            update(ProductPhoto)
+            .where(ProductPhoto.filename == filename, ProductPhoto.dominant_color.is_(None))
+            .values(**values)
+            .returning(ProductPhoto.product_id)
+            .execution_options(synchronize_session=False)
+        ).scalars())
+        analyzed += 1
+    if changed:
+        # 列表页与详情页输出的 width / height / 占位色随之更新
+        record_changes({TAG_CATALOG} | {product_tag(product_id) for product_id in changed})
+    return analyzed
+
+
+def inspect_image(filename):
+    """{'width', 'height', 'size', 'dominant_color', 'sha256'}；文件不存在或无法识别时返回 None"""
+    path = images.source_path(filename)
+    if path is None:
+        return None
+    try:
+        with Image.open(path) as img:
+            width, height = img.size
+            color = dominant_color(img)
+    except Exception as e:
+        current_app.logger.warning(f'图片 {filename} 无法分析：{e}')
+        return None
+    return {
+        'width': width,
+        'height': height,
+        'size': os.path.getsize(path),
+        'dominant_color': color,
+        'sha256': media.parse_name(filename) or _file_sha256(path),
+    }
+
+
+def dominant_color(img):
+    """'#rrggbb'：缩小后量化，取像素最多的颜色（透明部分按白色背景计算）"""
+    img.draft('RGB', SAMPLE_SIZE)   # JPEG 解码时直接按比例缩小，大图也只解码一小部分像素
+    if img.mode in ('RGBA', 'LA', 'P', 'PA'):
+        img = img.convert('RGBA')
+        background = Image.new('RGBA', img.size, (255, 255, 255, 255))
+        img = Image.alpha_composite(background, img)
+    img = img.convert('RGB')
+    img.thumbnail(SAMPLE_SIZE)
+    palette = img.quantize(colors=PALETTE_COLORS)
+    _, index = max(palette.getcolors())
+    red, green, blue = palette.getpalette()[index * 3:index * 3 + 3]
+    return f'#{red:02x}{green:02x}{blue:02x}'
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(media.CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@task('photos.analyze')
+def analyze_task(product_ids=None):
+    return {'analyzed': analyze_photos(product_ids)}
+
+
+# ====================== 查询 ======================
+def cover_photos(products):
+    """{产品 id: 封面行}：一条查询取回整页产品的封面（走主键 (product_id, position)）"""
+    product_ids = [product.id for product in products]
+    if not product_ids:
+        return {}
+    rows = db.session.execute(
+        select(ProductPhoto.product_id, ProductPhoto.filename, ProductPhoto.alt,
+               ProductPhoto.width, ProductPhoto.height, ProductPhoto.dominant_color)
+        .where(ProductPhoto.product_id.in_(product_ids), ProductPhoto.position == 0)
+    )
+    return {row.product_id: row for row in rows}
+
+
+def product_photos(product_id):
+    """某产品的全部图片（按 position），第一张为封面"""
+    return db.session.execute(
+        select(ProductPhoto).where(ProductPhoto.product_id == product_id).order_by(ProductPhoto.position)
+    ).scalars().all()
+
+
+def without_photos():
+    """没有任何图片的产品：Product.query.filter(without_photos())"""
+    return ~exists().where(ProductPhoto.product_id == Product.id)
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+# ====================== ORM 修改产品图片时自动同步 ======================
+@event.listens_for(db.session, 'after_flush')
+def _sync_changed_products(session, flush_context):
+    changed = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, Product) or obj.id is None:
+            continue
+        state = db.inspect(obj)
+        if (obj in session.new or obj in session.deleted
+                or state.attrs.image.history.has_changes() or state.attrs.photos.history.has_changes()):
+            changed.add(obj.id)
+    if changed:
+        # 已删除的产品查不到行，sync_product_photos 会清空它的图片
+        sync_product_photos(changed, session.connection())
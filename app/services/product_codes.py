@@ -0,0 +1,132 @@
+# app/services/product_codes.py
+"""
+产品编号分配（pc + 9 位数字）
+
+原做法是随机生成候选编号、逐个查库确认未被占用，既慢又有并发窗口。
+现在改为号段分配：
+
+- code_sequence 表中的 product_code 序列记录下一个未分配的序号；
+  每个进程用一条 UPDATE 一次预留 PRODUCT_CODE_BLOCK_SIZE 个序号（独立短事务），
+  之后的分配直接从内存中的号段取，不访问数据库
+- 序号经仿射置换 (A * n + B) mod 10^9 映射为编号：一一对应、永不重复，
+  但相邻产品的编号看起来是随机的，不暴露产品数量
+- 预留号段时用一次 IN 查询跳过旧数据中已被占用的编号（历史随机编号）
+- 极端情况下仍可能撞上唯一约束（例如导入文件中显式指定了同一编号），
+  调用方捕获 IntegrityError 后重新分配即可（见 flush_with_code）
+"""
+import os
+import threading
+from collections import deque
+
+from flask import current_app
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import CodeSequence, Product
+
+SEQUENCE_NAME = 'product_code'
+CODE_SPACE = 10 ** 9
+# A 与 10^9 互素（不含因子 2、5），保证置换是一一映射
+_A = 387420489
+_B = 271828183
+
+_lock = threading.Lock()
+_block = deque()
+
+
+def format_code(value):
+    return f'pc{(_A * value + _B) % CODE_SPACE:09d}'
+
+
+def allocate(n=1):
+    """分配 n 个未使用的产品编号"""
+    codes = []
+    with _lock:
+        while len(codes) < n:
+            if not _block:
+                block_size = max(current_app.config['PRODUCT_CODE_BLOCK_SIZE'], n - len(codes))
+                _block.extend(_reserve(block_size))
+                continue
+            codes.append(_block.popleft())
+    return codes
+
+
+def generate_code():
+    return allocate(1)[0]
+
+
+def flush_with_code(product, attempts=3):
+    """
+    为新产品分配编号并 flush；编号撞上唯一约束时换一个重试
+
+    在 SAVEPOINT 中执行，失败的尝试不影响同一事务中的其他改动。
+    重试用的编号在写入之前一次取好（同导入）：号段预留是独立的短事务，
+    本事务写入之后再预留会等待自己持有的写锁；没用上的编号放回号段。
+    """
+    codes = allocate(attempts if not product.product_code else attempts - 1)
+    if not product.product_code:
+        product.product_code = codes.pop(0)
+    try:
+        for attempt in range(attempts):
+            if attempt:
+                product.product_code = codes.pop(0)
+            # begin_nested() 会先 flush 会话中的全部改动：新产品先移出会话，在 SAVEPOINT 内才写入
+            if product in db.session:
+                db.session.expunge(product)
+            try:
+                with db.session.begin_nested():
+                    db.session.add(product)
+                    db.session.flush()
+                return product.product_code
+            except IntegrityError:
+                if attempt == attempts - 1:
+                    raise
+    finally:
+        with _lock:
+            _block.extendleft(reversed(codes))
+
+
+def _reserve(size):
+    """在独立事务中预留 size 个序号，返回其中尚未被占用的编号"""
+    while True:
+        with db.engine.begin() as connection:
+            end = connection.execute(
+                update(CodeSequence)
+                .where(CodeSequence.name == SEQUENCE_NAME)
+                .values(next_value=CodeSequence.next_value + size)
+                .returning(CodeSequence.next_value)
+            ).scalar()
+            if end is not None:
+                return _unused_codes(connection, end - size, end)
+
+        # 首次使用：创建序列后重新预留（并发创建时对方已插入，忽略冲突）
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(insert(CodeSequence), {'name': SEQUENCE_NAME, 'next_value': 0})
+        except IntegrityError:
+            pass
+
+
+def _unused_codes(connection, start, end):
+    if end > CODE_SPACE:
+        raise RuntimeError('产品编号已用尽')
+    codes = [format_code(value) for value in range(start, end)]
+    taken = set()
+    for offset in range(0, len(codes), 500):
+        chunk = codes[offset:offset + 500]
+        taken.update(connection.execute(
+            select(Product.product_code).where(Product.product_code.in_(chunk))
+        ).scalars())
+    return [code for code in codes if code not in taken]
+
+
+def _reset_after_fork():
+    # 子进程不能沿用父进程预留的号段，否则多个 worker 会分配出相同编号
+    global _lock
+    _lock = threading.Lock()
+    _block.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
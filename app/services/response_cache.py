@@ -0,0 +1,366 @@
+# app/services/response_cache.py
+"""
+前台整页响应缓存
+
+公开页面（首页、关于、联系、产品列表/详情、精选系列）只有后台编辑时才会变化，
+命中缓存时直接返回已渲染好的 HTML，不再渲染模板、不再查库。
+
+- 缓存键：完整 URL + 当前主题
+- 后端（RESPONSE_CACHE_BACKEND）：
+    memory      进程内 LRU，按字节数（RESPONSE_CACHE_MAX_BYTES）淘汰
+    filesystem  磁盘目录（RESPONSE_CACHE_DIR），多个 worker 共享，按总字节数（RESPONSE_CACHE_DIR_MAX_BYTES）淘汰
+    null        不缓存
+- 失效：每条缓存带标签（product:12、catalog、settings…），
+        services/changes.py 在后台写入提交后发出 content_changed 信号，按标签精确删除
+- 条件请求：响应带 ETag 与 Last-Modified，If-None-Match / If-Modified-Since 命中返回 304
+- 反向代理：标签以 Surrogate-Key 响应头输出（即使 null 后端也输出），见 services/edge.py
+
+视图用法：
+    @cached_page
+    def product_detail(product_id):
+        ...
+        add_cache_tags(product_tag(product.id))
+"""
+import hashlib
+import os
+import pickle
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, g, make_response, request, session
+
+from app.services import changes
+from app.services.settings_cache import get_site_settings
+
+# 不随缓存保存的响应头（每次请求由 Flask 重新生成）
+_SKIP_HEADERS = {'set-cookie', 'vary', 'content-length', 'date'}
+
+
+class CachedPage:
+    __slots__ = ('body', 'status', 'headers', 'etag', 'stored_at', 'expires', 'tags')
+
+    def __init__(self, body, status, headers, tags, ttl):
+        self.body = body
+        self.status = status
+        self.headers = headers
+        self.tags = frozenset(tags)
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.stored_at = time.time()
+        self.expires = self.stored_at + ttl
+
+    @property
+    def size(self):
+        return len(self.body) + 256
+
+    def to_response(self):
+        response = current_app.response_class(self.body, status=self.status, headers=self.headers)
+        response.set_etag(self.etag)
+        response.last_modified = self.stored_at
+        return response
+
+
+# ====================== 缓存后端 ======================
+class NullBackend:
+    generation = 0
+
+    def get(self, key):
+        return None
+
+    def set(self, key, entry, generation):
+        pass
+
+    def invalidate(self, tags):
+        pass
+
+    def clear(self):
+        pass
+
+
+class MemoryBackend:
+    """进程内 LRU：按字节预算淘汰，标签 -> 键 的反向索引用于精确失效"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.generation = 0        # 每次失效 +1；渲染期间发生失效的结果不写入缓存
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires < time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry, generation):
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            for tag in entry.tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, tags):
+        with self._lock:
+            self.generation += 1
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class FileBackend:
+    """
+    磁盘缓存，多 worker 共享
+
+    entries/<hh>/<键哈希>.pickle   缓存内容
+    tags/<标签哈希>/<键哈希>        标签索引（空文件），失效时据此删除条目
+
+    键含完整查询字符串，随意拼接参数的请求会不断写入新文件：本进程累计写入超过预算的 1/10 时扫描一次目录，
+    按修改时间（命中时刷新）删除最旧的条目直到低于预算的 90%，并清理指向已删除条目的标签索引。
+    """
+
+    # 新写入的标签索引可能先于条目文件落盘，扫描时不当作孤儿删除
+    TAG_GRACE = 60
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+        self._written = max_bytes   # 启动后第一次写入先扫描（目录可能已被其他 worker 写满）
+
+    def get(self, key):
+        path = self._entry_path(_digest(key))
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if entry.expires < time.time():
+            self._unlink(path)
+            return None
+        try:
+            os.utime(path)   # 淘汰按修改时间，命中刷新即为 LRU
+        except OSError:
+            pass
+        return entry
+
+    def set(self, key, entry, generation):
+        if generation != self.generation or entry.size > self.max_bytes:
+            return
+        key_hash = _digest(key)
+        path = self._entry_path(key_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        for tag in entry.tags:
+            tag_dir = self._tag_dir(tag)
+            os.makedirs(tag_dir, exist_ok=True)
+            open(os.path.join(tag_dir, key_hash), 'w').close()
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        with self._lock:
+            self._written += entry.size
+            due = self._written > self.max_bytes // 10
+            if due:
+                self._written = 0
+        if due:
+            self._sweep()
+
+    def invalidate(self, tags):
+        with self._lock:
+            self.generation += 1
+        for tag in tags:
+            tag_dir = self._tag_dir(tag)
+            try:
+                key_hashes = os.listdir(tag_dir)
+            except OSError:
+                continue
+            for key_hash in key_hashes:
+                self._unlink(self._entry_path(key_hash))
+            shutil.rmtree(tag_dir, ignore_errors=True)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _sweep(self):
+        if not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            entries, total = [], 0
+            for dirpath, _, names in os.walk(os.path.join(self.directory, 'entries')):
+                for name in names:
+                    path = os.path.join(dirpath, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+            if total > self.max_bytes:
+                entries.sort()
+                for _, size, path in entries:
+                    if total <= self.max_bytes * 0.9:
+                        break
+                    self._unlink(path)
+                    total -= size
+
+            cutoff = time.time() - self.TAG_GRACE
+            tags_root = os.path.join(self.directory, 'tags')
+            for tag_hash in _listdir(tags_root):
+                tag_dir = os.path.join(tags_root, tag_hash)
+                for key_hash in _listdir(tag_dir):
+                    if os.path.exists(self._entry_path(key_hash)):
+                        continue
+                    path = os.path.join(tag_dir, key_hash)
+                    try:
+                        if os.stat(path).st_mtime < cutoff:
+                            os.remove(path)
+                    except OSError:
+                        pass
+        finally:
+            self._sweep_lock.release()
+
+    def _entry_path(self, key_hash):
+        return os.path.join(self.directory, 'entries', key_hash[:2], f'{key_hash}.pickle')
+
+    def _tag_dir(self, tag):
+        return os.path.join(self.directory, 'tags', _digest(tag))
+
+    @staticmethod
+    def _unlink(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _listdir(path):
+    try:
+        return os.listdir(path)
+    except OSError:
+        return []
+
+
+def _digest(value):
+    return hashlib.sha1(value.encode('utf-8')).hexdigest()
+
+
+def create_backend(app):
+    kind = app.config['RESPONSE_CACHE_BACKEND']
+    if kind == 'memory':
+        return MemoryBackend(app.config['RESPONSE_CACHE_MAX_BYTES'])
+    if kind == 'filesystem':
+        return FileBackend(app.config['RESPONSE_CACHE_DIR'], app.config['RESPONSE_CACHE_DIR_MAX_BYTES'])
+    if kind in (None, '', 'null'):
+        return NullBackend()
+    raise ValueError(f'未知的 RESPONSE_CACHE_BACKEND: {kind}')
+
+
+def init_app(app):
+    backend = create_backend(app)
+    app.extensions['response_cache'] = backend
+
+    def on_change(sender, tags):
+        backend.invalidate(tags)
+
+    # weak=False：闭包没有其他引用，必须由信号持有
+    changes.content_changed.connect(on_change, sender=app, weak=False)
+
+
+# ====================== 视图装饰器 ======================
+def add_cache_tags(*tags):
+    """视图中声明本页面依赖的数据（用于精确失效）"""
+    if 'cache_tags' in g:
+        g.cache_tags.update(tags)
+
+
+def cache_key():
+    theme = get_site_settings()['theme']
+    return f'{request.url}|{theme}'
+
+
+def cached_page(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        backend = current_app.extensions['response_cache']
+        if request.method not in ('GET', 'HEAD'):
+            return view(*args, **kwargs)
+
+        key = cache_key()
+        entry = backend.get(key)
+        if entry is not None:
+            response = entry.to_response()
+            response.headers['X-Cache'] = 'HIT'
+            return response.make_conditional(request)
+
+        generation = backend.generation
+        g.cache_tags = {changes.TAG_SETTINGS}
+        response = make_response(view(*args, **kwargs))
+        if response.status_code == 200:
+            # 标签随响应头输出（命中时随缓存的响应头一起返回），反向代理据此按标签清除
+            response.headers[current_app.config['SURROGATE_KEY_HEADER']] = ' '.join(sorted(g.cache_tags))
+
+        if not isinstance(backend, NullBackend) and _cacheable(response):
+            entry = CachedPage(
+                response.get_data(),
+                response.status_code,
+                [(k, v) for k, v in response.headers.items() if k.lower() not in _SKIP_HEADERS],
+                g.cache_tags,
+                current_app.config['RESPONSE_CACHE_TTL'],
+            )
+            backend.set(key, entry, generation)
+            response.set_etag(entry.etag)
+            response.last_modified = entry.stored_at
+            response.headers['X-Cache'] = 'MISS'
+            return response.make_conditional(request)
+        return response
+
+    return wrapper
+
+
+def _cacheable(response):
+    return (response.status_code == 200
+            and not response.direct_passthrough
+            and not response.is_streamed
+            and not session.modified
+            and 'Set-Cookie' not in response.headers)
+
@@ -0,0 +1,199 @@
+# app/services/search.py
+"""
+产品全文搜索（SQLite FTS5）
+
+product_fts 是独立的 FTS5 虚拟表，rowid = product.id，收录名称、描述、编号、
+材质、适用空间、分类名和尺寸数字。product / category 表上的触发器在同一事务中
+维护索引，因此无论 ORM、批量导入还是直接 SQL 写入，索引都保持同步。
+
+查询使用 bm25 排序（名称、编号、分类权重更高）、前缀匹配（支持输入即搜），
+并用 snippet() 生成高亮摘要。非 SQLite 数据库退化为 LIKE 查询。
+"""
+import re
+from contextlib import contextmanager
+
+from markupsafe import Markup, escape
+from sqlalchemy import or_, text
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.models import Product
+from app.services.database import create_trigger_guard, drop_unguarded_triggers, trigger_enabled, triggers_suspended
+
+# 列顺序即 bm25 权重顺序
+FTS_COLUMNS = ('name', 'description', 'product_code', 'base_material',
+               'surface_material', 'applicable_space', 'category', 'dimensions')
+BM25_WEIGHTS = (10.0, 2.0, 8.0, 3.0, 3.0, 2.0, 5.0, 1.0)
+
+# snippet 高亮标记：先用控制字符占位，转义后再替换成 <mark>，避免 XSS
+_HL_START, _HL_END = '\x02', '\x03'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# 触发器开关名（批量导入时暂停逐行写索引，见 deferred_indexing）
+GUARD = 'product_fts'
+
+# 触发器中计算各列取值（new / old 为触发器行）
+_FTS_VALUES = """
+    {row}.id, {row}.name, {row}.description, {row}.product_code, {row}.base_material,
+    {row}.surface_material, {row}.applicable_space,
+    (SELECT name FROM category WHERE id = {row}.category_id),
+    trim(coalesce({row}.length, '') || ' ' || coalesce({row}.width, '') || ' ' ||
+         coalesce({row}.height, '') || ' ' || coalesce({row}.seat_height, ''))
+"""
+
+SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS product_fts USING fts5(
+        {', '.join(FTS_COLUMNS)},
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS product_fts_ai AFTER INSERT ON product
+    WHEN {trigger_enabled(GUARD)} BEGIN
+        INSERT INTO product_fts(rowid, {', '.join(FTS_COLUMNS)}) VALUES ({_FTS_VALUES.format(row='new')});
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_fts_ad AFTER DELETE ON product BEGIN
+        DELETE FROM product_fts WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS product_fts_au AFTER UPDATE OF
+        name, description, product_code, base_material, surface_material, applicable_space,
+        category_id, length, width, height, seat_height
+    ON product BEGIN
+        DELETE FROM product_fts WHERE rowid = old.id;
+        INSERT INTO product_fts(rowid, {', '.join(FTS_COLUMNS)}) VALUES ({_FTS_VALUES.format(row='new')});
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_fts_category_au AFTER UPDATE OF name ON category BEGIN
+        UPDATE product_fts SET category = new.name
+        WHERE rowid IN (SELECT id FROM product WHERE category_id = new.id);
+    END
+    """,
+]
+
+
+def create_search_index(connection):
+    """创建 FTS5 表与同步触发器（可重复执行；旧版本的插入触发器会替换为带开关检查的版本）"""
+    create_trigger_guard(connection)
+    drop_unguarded_triggers(connection, {'product_fts_ai'})
+    for statement in SCHEMA:
+        connection.execute(text(statement))
+
+
+def rebuild_search_index(connection):
+    """清空并从 product 表全量重建索引，返回收录的产品数"""
+    connection.execute(text("DELETE FROM product_fts"))
+    connection.execute(text(f"""
+        INSERT INTO product_fts(rowid, {', '.join(FTS_COLUMNS)})
+        SELECT {_FTS_VALUES.format(row='product')} FROM product
+    """))
+    connection.execute(text("INSERT INTO product_fts(product_fts) VALUES ('optimize')"))
+    return connection.execute(text("SELECT count(*) FROM product_fts")).scalar()
+
+
+@contextmanager
+def deferred_indexing(connection):
+    """
+    批量插入产品时暂停逐行触发器，结束时用一条 INSERT ... SELECT 为新产品建索引
+
+    逐行触发器写 FTS 的开销是插入本身的数倍。暂停只对当前事务有效（trigger_guard 标记行），
+    退出时无论成功与否都恢复触发器并补建索引。只用于纯新增（新行 id 大于进入时的最大 id）。
+    """
+    if connection.dialect.name != 'sqlite':
+        yield
+        return
+    max_id = connection.execute(text("SELECT coalesce(max(id), 0) FROM product")).scalar()
+
+    def index_new_rows():
+        connection.execute(text(f"""
+            INSERT INTO product_fts(rowid, {', '.join(FTS_COLUMNS)})
+            SELECT {_FTS_VALUES.format(row='product')} FROM product WHERE id > :max_id
+        """), {'max_id': max_id})
+
+    with triggers_suspended(connection, GUARD, on_exit=index_new_rows):
+        yield
+
+
+def ensure_search_index(connection):
+    """建表；若索引条数与产品数不一致（旧数据库首次升级），全量重建"""
+    create_search_index(connection)
+    indexed = connection.execute(text("SELECT count(*) FROM product_fts")).scalar()
+    total = connection.execute(text("SELECT count(*) FROM product")).scalar()
+    if indexed != total:
+        return rebuild_search_index(connection)
+    return indexed
+
+
+def build_match_query(query, operator='AND'):
+    """
+    把用户输入转换为 FTS5 MATCH 表达式
+
+    'walnut nightstand 55' -> '"walnut"* AND "nightstand"* AND "55"*'
+    每个词都加引号（屏蔽 FTS 语法字符）并做前缀匹配。
+    """
+    tokens = _TOKEN_RE.findall(query or '')
+    return f' {operator} '.join(f'"{token}"*' for token in tokens)
+
+
+def search_products(query, limit=20, offset=0):
+    """
+    全文搜索，返回 [(product, snippet_markup), ...]（按相关度排序）
+
+    先要求全部词命中；无结果时放宽为任意词命中。
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return _search_like(query, limit, offset)
+
+    for operator in ('AND', 'OR'):
+        match = build_match_query(query, operator)
+        if not match:
+            return []
+        rows = db.session.execute(text(f"""
+            SELECT rowid,
+                   snippet(product_fts, -1, :hl_start, :hl_end, '…', 12) AS snippet
+            FROM product_fts
+            WHERE product_fts MATCH :match
+            ORDER BY bm25(product_fts, {', '.join(str(w) for w in BM25_WEIGHTS)})
+            LIMIT :limit OFFSET :offset
+        """), {'match': match, 'hl_start': _HL_START, 'hl_end': _HL_END,
+               'limit': limit, 'offset': offset}).all()
+        if rows or len(_TOKEN_RE.findall(query)) < 2:
+            break
+
+    if not rows:
+        return []
+
+    # 一次查询取回本页产品（含分类），按相关度顺序排列
+    products = {p.id: p for p in Product.query
+                .options(joinedload(Product.category))
+                .filter(Product.id.in_([row.rowid for row in rows]))}
+    return [(products[row.rowid], _highlight(row.snippet))
+            for row in rows if row.rowid in products]
+
+
+def _highlight(snippet):
+    return Markup(str(escape(snippet or ''))
+                  .replace(_HL_START, '<mark>')
+                  .replace(_HL_END, '</mark>'))
+
+
+def _search_like(query, limit, offset):
+    tokens = _TOKEN_RE.findall(query or '')
+    if not tokens:
+        return []
+    filters = [or_(Product.name.ilike(f'%{token}%'),
+                   Product.product_code.ilike(f'%{token}%'),
+                   Product.description.ilike(f'%{token}%')) for token in tokens]
+    products = (Product.query
+                .options(joinedload(Product.category))
+                .filter(*filters)
+                .order_by(Product.name)
+                .limit(limit).offset(offset).all())
+    return [(product, Markup('')) for product in products]
@@ -0,0 +1,161 @@
+# app/services/series.py
+"""
+精选系列：把 Product.featured_series（逗号分隔字符串）规范化为
+Series 表 + product_series 关联表
+
+- parse_series()          解析逗号分隔字符串
+- sync_all_series()       全量迁移/重建（init_schema.py 与 flask catalog sync-series 调用）
+- sync_product_series()   按产品 id 增量同步
+- refresh_series_stats()  刷新系列的预计算产品数与封面图
+
+featured_series 仍是后台编辑的字段；ORM 修改该字段时，after_flush 钩子
+会在同一事务中同步关联表，批量 SQL 写入则需要调用方自行调用 sync_product_series()。
+"""
+from sqlalchemy import delete, event, func, insert, select, update
+
+from app import db
+from app.models import Product, Series, product_series
+
+
+def parse_series(value):
+    """'basic1, basic2,,basic1' -> ['basic1', 'basic2']（去空白、去重、保持顺序）"""
+    names = []
+    for name in (value or '').split(','):
+        name = name.strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def series_id_map(connection, names):
+    """返回 {系列名: id}，不存在的系列会被创建"""
+    names = set(names)
+    if not names:
+        return {}
+    existing = dict(connection.execute(
+        select(Series.name, Series.id).where(Series.name.in_(names))
+    ).all())
+    missing = [{'name': name, 'product_count': 0} for name in names if name not in existing]
+    if missing:
+        connection.execute(insert(Series), missing)
+        existing.update(connection.execute(
+            select(Series.name, Series.id).where(Series.name.in_([m['name'] for m in missing]))
+        ).all())
+    return existing
+
+
+def sync_product_series(product_ids, connection=None, refresh_stats=True):
+    """
+    按产品的 featured_series 重建这些产品的关联记录，并刷新受影响系列的统计
+
+    返回受影响的系列 id 集合；批量导入可传 refresh_stats=False，最后统一刷新一次。
+    """
+    connection = connection or db.session.connection()
+    product_ids = list(product_ids)
+    if not product_ids:
+        return set()
+
+    affected = set()
+    for chunk in _chunks(product_ids, 500):
+        rows = connection.execute(
+            select(Product.id, Product.featured_series).where(Product.id.in_(chunk))
+        ).all()
+        wanted = {product_id: parse_series(value) for product_id, value in rows}
+        ids = series_id_map(connection, {name for names in wanted.values() for name in names})
+
+        affected.update(connection.execute(
+            select(product_series.c.series_id).where(product_series.c.product_id.in_(chunk))
+        ).scalars())
+        connection.execute(delete(product_series).where(product_series.c.product_id.in_(chunk)))
+
+        links = [{'product_id': product_id, 'series_id': ids[name]}
+                 for product_id, names in wanted.items() for name in names]
+        if links:
+            connection.execute(insert(product_series), links)
+            affected.update(link['series_id'] for link in links)
+
+    if refresh_stats:
+        refresh_series_stats(affected, connection)
+    return affected
+
+
+def sync_all_series(connection=None):
+    """全量迁移：解析所有产品的 featured_series，重建关联表，返回 (系列数, 关联数)"""
+    connection = connection or db.session.connection()
+    connection.execute(delete(product_series))
+
+    link_count = 0
+    batch = []
+    ids = {}
+    rows = connection.execute(
+        select(Product.id, Product.featured_series)
+        .where(Product.featured_series.isnot(None), Product.featured_series != '')
+        .execution_options(yield_per=1000)
+    )
+    for partition in rows.partitions():
+        names = {name for _, value in partition for name in parse_series(value)}
+        ids.update(series_id_map(connection, names - ids.keys()))
+        for product_id, value in partition:
+            batch.extend({'product_id': product_id, 'series_id': ids[name]} for name in parse_series(value))
+        if batch:
+            connection.execute(insert(product_series), batch)
+            link_count += len(batch)
+            batch = []
+
+    refresh_series_stats(None, connection)
+    return len(ids), link_count
+
+
+def refresh_series_stats(series_ids=None, connection=None):
+    """用一条 UPDATE 重新计算产品数与封面图（最新一件有主图的产品）"""
+    connection = connection or db.session.connection()
+    count = (select(func.count())
+             .select_from(product_series)
+             .where(product_series.c.series_id == Series.id)
+             .scalar_subquery())
+    cover = (select(Product.image)
+             .join(product_series, product_series.c.product_id == Product.id)
+             .where(product_series.c.series_id == Series.id,
+                    Product.image.isnot(None), Product.image != '')
+             .order_by(Product.created_at.desc(), Product.id.desc())
+             .limit(1)
+             .scalar_subquery())
+
+    stmt = update(Series).values(product_count=count, cover_image=cover)
+    if series_ids is not None:
+        series_ids = list(series_ids)
+        if not series_ids:
+            return
+        stmt = stmt.where(Series.id.in_(series_ids))
+    connection.execute(stmt)
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+# ====================== ORM 修改 featured_series 时自动同步 ======================
+@event.listens_for(db.session, 'after_flush')
+def _sync_changed_products(session, flush_context):
+    changed = set()
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Product) and obj.id is not None:
+            history = db.inspect(obj).attrs.featured_series.history
+            if obj in session.new or history.has_changes():
+                changed.add(obj.id)
+
+    deleted = [obj for obj in session.deleted if isinstance(obj, Product)]
+    connection = session.connection()
+    if deleted:
+        # 关联记录可能已被 ORM 删除，按被删产品原有的系列名刷新统计
+        deleted_ids = [obj.id for obj in deleted]
+        names = {name for obj in deleted for name in parse_series(obj.featured_series)}
+        affected = set(connection.execute(
+            select(Series.id).where(Series.name.in_(names))
+        ).scalars())
+        # SQLite 默认不启用外键级联，这里显式清理残留的关联记录
+        connection.execute(delete(product_series).where(product_series.c.product_id.in_(deleted_ids)))
+        refresh_series_stats(affected, connection)
+    if changed:
+        sync_product_series(changed, connection)
@@ -0,0 +1,158 @@
+# app/services/settings_cache.py
+"""
+网站设置（Settings）进程内缓存
+
+Settings 一年只改几次，却在每次模板渲染时都被读取。这里把它读一次、
+按页面类别（home / products / detail / about / contact / fallback）
+预先生成好 SEO 标题、描述、关键字，之后每次请求只做一次字典查找。
+
+后台保存设置时调用 invalidate()：本进程在事务提交后立即失效，其他进程通过
+cache_version 表中的 'settings' 版本号在 SETTINGS_CACHE_TTL 秒内感知。
+"""
+import threading
+
+from flask import current_app
+
+from app.models import Settings
+from app.services.cache_versions import bump_version, current_version
+
+VERSION_KEY = 'settings'
+
+DEFAULT_COMPANY_NAME = 'XX Hotel Furniture Manufacturer'
+
+# 各类页面的默认 SEO（数据库字段为空时使用）
+DEFAULT_SEO = {
+    'home': {
+        'title': 'Home - Premium Hotel Furniture | {company_name}',
+        'description': 'Professional hotel furniture manufacturer specializing in luxury beds, sofas, wardrobes and custom solutions for 5-star hotels worldwide.',
+        'keywords': 'hotel furniture, luxury hotel beds, hotel sofas, custom hospitality furniture, hotel room furniture',
+    },
+    'products': {
+        'title': 'Products | {company_name}',
+        'description': 'Explore our complete collection of premium hotel furniture including beds, nightstands, sofas, wardrobes and custom case goods for luxury hospitality projects.',
+        'keywords': 'hotel furniture products, hotel beds, hotel sofas, hotel wardrobes, luxury hotel furniture collection',
+    },
+    'detail': {
+        'title': 'Product Detail - {company_name}',
+        'description': 'Explore our complete collection of premium hotel furniture...',
+        'keywords': 'hotel furniture products, hotel beds, hotel sofas, hotel wardrobes',
+    },
+    'about': {
+        'title': 'About Us - {company_name} | Leading Hotel Furniture Manufacturer',
+        'description': 'Learn about {company_name}, a professional hotel furniture manufacturer with years of experience in custom hospitality furniture design and production.',
+        'keywords': 'about hotel furniture manufacturer, hospitality furniture company, custom hotel furniture supplier',
+    },
+    'contact': {
+        'title': 'Contact Us - {company_name} | Hotel Furniture Inquiry',
+        'description': 'Contact {company_name} for custom hotel furniture solutions, quotes, and partnership opportunities.',
+        'keywords': 'contact hotel furniture manufacturer, hotel furniture quote, hospitality furniture supplier',
+    },
+    'fallback': {
+        'title': '{company_name} | Professional Hotel Furniture Manufacturer',
+        'description': 'Premium hotel furniture solutions for luxury hospitality.',
+        'keywords': 'hotel furniture, custom hotel furniture',
+    },
+}
+
+_lock = threading.Lock()
+_cache = {'version': None, 'data': None}
+
+
+def endpoint_family(endpoint):
+    """把路由端点归类到 SEO 页面类别"""
+    endpoint = endpoint or ''
+    if endpoint == 'main.index':
+        return 'home'
+    if 'products.product_detail' in endpoint:
+        return 'detail'
+    if 'products.' in endpoint:
+        return 'products'
+    if endpoint == 'main.about':
+        return 'about'
+    if endpoint == 'main.contact':
+        return 'contact'
+    return 'fallback'
+
+
+def get_site_settings():
+    """返回缓存的网站设置快照（dict，只读）"""
+    ttl = current_app.config.get('SETTINGS_CACHE_TTL', 5)
+    version = current_version(VERSION_KEY, ttl)
+    if _cache['data'] is None or _cache['version'] != version:
+        with _lock:
+            if _cache['data'] is None or _cache['version'] != version:
+                _cache['data'] = _build(Settings.query.first(), version)
+                _cache['version'] = version
+    return _cache['data']
+
+
+def invalidate():
+    """
+    设置已修改：版本号 +1（随调用方事务提交）
+
+    本进程的缓存在提交后才失效（cache_versions 的 after_commit 钩子丢弃记住的版本号，
+    下次读取时版本号不同即重建）；提交前其他请求继续使用旧设置，不会按新版本号缓存提交前的数据。
+    """
+    bump_version(VERSION_KEY)
+
+
+def _fill(text, company_name):
+    # 只替换 {company_name}，后台填写的其它花括号原样保留，不会因 format 报错
+    return (text or '').replace('{company_name}', company_name)
+
+
+def _build(settings, version):
+    if not settings:
+        # 数据库为空时，所有页面都使用首页默认值
+        company_name = DEFAULT_COMPANY_NAME
+        home = {key: _fill(value, company_name) for key, value in DEFAULT_SEO['home'].items()}
+        return {
+            'version': version,
+            'company_name': company_name,
+            'logo': None,
+            'theme': 'default',
+            'seo': {family: home for family in DEFAULT_SEO},
+        }
+
+    company_name = settings.company_name or DEFAULT_COMPANY_NAME
+    configured = {
+        'home': {
+            'title': settings.seo_home_title,
+            'description': settings.seo_home_description,
+            'keywords': settings.seo_home_keywords,
+        },
+        'products': {
+            'title': settings.seo_products_title,
+            'description': settings.seo_products_description,
+            'keywords': settings.seo_products_keywords,
+        },
+        'detail': {
+            'description': settings.seo_products_description,
+            'keywords': settings.seo_products_keywords,
+        },
+        'about': {
+            'title': settings.seo_about_title,
+            'description': settings.seo_about_description,
+        },
+        'contact': {
+            'title': settings.seo_contact_title,
+            'description': settings.seo_contact_description,
+        },
+        'fallback': {},
+    }
+
+    seo = {}
+    for family, defaults in DEFAULT_SEO.items():
+        values = configured[family]
+        seo[family] = {
+            key: _fill(values.get(key) or default, company_name)
+            for key, default in defaults.items()
+        }
+
+    return {
+        'version': version,
+        'company_name': company_name,
+        'logo': settings.logo,
+        'theme': settings.theme or 'default',
+        'seo': seo,
+    }
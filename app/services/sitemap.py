@@ -0,0 +1,241 @@
+# app/services/sitemap.py
+"""
+sitemap.xml 生成与缓存
+
+    /sitemap.xml                   sitemap 索引（列出下面各文件及其 lastmod）
+    /sitemap-pages.xml.gz          固定页面与精选系列页
+    /sitemap-products-<n>.xml.gz   产品分片：第 n 片为 id 在 ((n-1)×50000, n×50000] 内的产品
+
+- 生成：服务端游标（yield_per）逐批读取 (id, updated_at)，边读边写入 gzip 文件，
+  不把全部产品加载到内存；按 id 范围分片，每片不超过 50000 个 URL（协议上限）
+- 缓存：生成结果写入 SITEMAP_CACHE_DIR（多个 worker 共享，先写临时文件再改名），
+  之后直接发送文件；超过 SITEMAP_MAX_AGE 秒的文件兜底重建
+- 失效：订阅 content_changed 信号，product:<id> 只删除该产品所在的分片，
+  只有 catalog 标签（批量导入等）时删除全部分片；索引与页面 sitemap 随任何目录变化重建
+
+sitemap 中必须是绝对 URL：SITE_URL 配置了正式域名时使用它，否则使用请求的域名。
+只缓存 SITE_URL 生成的文件：请求的域名来自 Host 头，任何人都可以伪造，
+未配置 SITE_URL 时每次请求在内存中生成，不写入共享缓存。
+"""
+import gzip
+import hashlib
+import io
+import os
+import threading
+import time
+from xml.sax.saxutils import escape
+
+from flask import current_app, request, url_for
+from sqlalchemy import func, select
+
+from app import db
+from app.models import Product, Series
+from app.services import changes
+
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+# 固定页面（端点, changefreq, priority）
+STATIC_PAGES = (
+    ('main.index', 'weekly', '1.0'),
+    ('products.list_products', 'daily', '0.9'),
+    ('featured.featured_index', 'weekly', '0.8'),
+    ('main.about', 'monthly', '0.5'),
+    ('main.contact', 'monthly', '0.5'),
+)
+
+
+def init_app(app):
+    def on_change(sender, tags):
+        invalidate(app, tags)
+
+    # weak=False：闭包没有其他引用，必须由信号持有
+    changes.content_changed.connect(on_change, sender=app, weak=False)
+
+
+# ====================== 缓存文件 ======================
+def _cache_dir():
+    return current_app.config['SITEMAP_CACHE_DIR']
+
+
+def base_url():
+    return (current_app.config.get('SITE_URL') or request.url_root).rstrip('/')
+
+
+def _cache_path(name):
+    # 文件名带域名摘要（SITE_URL 更换后旧文件不再使用）：name 如 'index.xml'、'products-3.xml.gz'
+    site = hashlib.sha1(current_app.config['SITE_URL'].rstrip('/').encode()).hexdigest()[:10]
+    return os.path.join(_cache_dir(), f'{site}-{name}')
+
+
+def invalidate(app, tags):
+    shards = set()
+    catalog = False
+    for tag in tags:
+        kind, _, value = tag.partition(':')
+        if kind == 'product' and value.isdigit():
+            shards.add(shard_of(int(value), app.config['SITEMAP_SHARD_SIZE']))
+        elif tag == changes.TAG_CATALOG:
+            catalog = True
+    if not shards and not catalog:
+        return
+
+    directory = app.config['SITEMAP_CACHE_DIR']
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return
+    suffixes = {'-index.xml', '-pages.xml.gz'}
+    if shards:
+        suffixes |= {f'-products-{shard}.xml.gz' for shard in shards}
+    for name in names:
+        # 只有 catalog 标签：批量写入，不知道改了哪些产品，全部分片作废
+        if name.endswith(tuple(suffixes)) or (catalog and not shards and '-products-' in name):
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+
+def cached_file(name, generate):
+    """
+    返回缓存文件路径；不存在或过期时调用 generate(写入的文件对象) 重新生成
+
+    未配置 SITE_URL 时不缓存，返回内存中生成的文件对象（send_file 两者都接受）。
+    """
+    if not current_app.config['SITE_URL']:
+        buffer = io.BytesIO()
+        _write(buffer, name, generate)
+        buffer.seek(0)
+        return buffer
+
+    path = _cache_path(name)
+    try:
+        if time.time() - os.path.getmtime(path) < current_app.config['SITEMAP_MAX_AGE']:
+            return path
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as raw:
+            _write(raw, name, generate)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+def _write(raw, name, generate):
+    if name.endswith('.gz'):
+        # mtime=0：gzip 头中不写入生成时间
+        with gzip.GzipFile(filename='', mode='wb', fileobj=raw, compresslevel=6, mtime=0) as f:
+            generate(f)
+    else:
+        generate(raw)
+
+
+# ====================== 生成 ======================
+def shard_of(product_id, shard_size):
+    return (product_id - 1) // shard_size + 1
+
+
+def shard_exists(shard):
+    size = current_app.config['SITEMAP_SHARD_SIZE']
+    return db.session.execute(
+        select(Product.id).where(Product.id > (shard - 1) * size, Product.id <= shard * size).limit(1)
+    ).first() is not None
+
+
+def _lastmod(value):
+    return value.strftime('%Y-%m-%dT%H:%M:%S+00:00') if value else None
+
+
+def _url(loc, lastmod=None, changefreq=None, priority=None):
+    parts = [f'<url><loc>{escape(loc)}</loc>']
+    if lastmod:
+        parts.append(f'<lastmod>{lastmod}</lastmod>')
+    if changefreq:
+        parts.append(f'<changefreq>{changefreq}</changefreq>')
+    if priority:
+        parts.append(f'<priority>{priority}</priority>')
+    parts.append('</url>\n')
+    return ''.join(parts)
+
+
+def shard_lastmods():
+    """{分片号: 分片内最新的修改时间}（只读 id 与时间列）"""
+    size = current_app.config['SITEMAP_SHARD_SIZE']
+    shard = ((Product.id - 1) // size + 1).label('shard')
+    rows = db.session.execute(
+        select(shard, func.max(func.coalesce(Product.updated_at, Product.created_at))).group_by(shard)
+    ).all()
+    return {int(number): value for number, value in rows}
+
+
+def write_index(f):
+    base = base_url()
+    lastmods = shard_lastmods()
+    f.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{XMLNS}">\n'.encode())
+    entries = [(url_for('seo.sitemap_pages'), max(filter(None, lastmods.values()), default=None))]
+    entries += [(url_for('seo.sitemap_products', shard=number), lastmod)
+                for number, lastmod in sorted(lastmods.items())]
+    for path, lastmod in entries:
+        line = f'<sitemap><loc>{escape(base + path)}</loc>'
+        if lastmod:
+            line += f'<lastmod>{_lastmod(lastmod)}</lastmod>'
+        f.write((line + '</sitemap>\n').encode())
+    f.write(b'</sitemapindex>\n')
+
+
+def write_pages(f):
+    base = base_url()
+    f.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{XMLNS}">\n'.encode())
+    for endpoint, changefreq, priority in STATIC_PAGES:
+        f.write(_url(base + url_for(endpoint), changefreq=changefreq, priority=priority).encode())
+    names = db.session.execute(
+        select(Series.name).where(Series.product_count > 0).order_by(Series.name)
+        .execution_options(yield_per=1000)
+    ).scalars()
+    for name in names:
+        f.write(_url(base + url_for('featured.series_detail', series_name=name), changefreq='weekly').encode())
+    f.write(b'</urlset>\n')
+
+
+def write_products(f, shard):
+    size = current_app.config['SITEMAP_SHARD_SIZE']
+    # 产品 URL 只有 id 不同：生成一次模板，避免每行调用 url_for
+    placeholder = 987654321
+    template = base_url() + url_for('products.product_detail', product_id=placeholder)
+    prefix, _, suffix = template.partition(str(placeholder))
+
+    f.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{XMLNS}">\n'.encode())
+    rows = db.session.execute(
+        select(Product.id, func.coalesce(Product.updated_at, Product.created_at))
+        .where(Product.id > (shard - 1) * size, Product.id <= shard * size)
+        .order_by(Product.id)
+        .execution_options(yield_per=2000)
+    )
+    buffer = []
+    for product_id, lastmod in rows:
+        buffer.append(_url(f'{prefix}{product_id}{suffix}', _lastmod(lastmod)))
+        if len(buffer) >= 2000:
+            f.write(''.join(buffer).encode())
+            buffer.clear()
+    f.write(''.join(buffer).encode())
+    f.write(b'</urlset>\n')
+
+
+def robots_txt():
+    lines = [
+        'User-agent: *',
+        'Disallow: ' + url_for('admin.main.index'),
+        'Disallow: ' + url_for('products.search'),
+        'Disallow: ' + url_for('products.fit'),
+        '',
+        f"Sitemap: {base_url()}{url_for('seo.sitemap_index')}",
+        '',
+    ]
+    return '\n'.join(lines)
@@ -0,0 +1,113 @@
+# app/services/templating.py
+"""
+模板编译缓存与片段缓存
+
+字节码缓存：Jinja 把模板编译成 Python 代码再 compile()，每个 worker 启动后第一次渲染每个模板
+都要做一遍。这里把编译结果写入 TEMPLATE_BYTECODE_CACHE_DIR（按模板源码校验和区分，模板修改后自动失效），
+新 worker、max_requests 回收后的 worker 直接加载；python -m app serve 还会在 fork 之前
+预编译全部模板（warm_templates），worker 从第一个请求起就不再编译。
+
+片段缓存：导航栏、页脚、英雄区在每个页面都一样，只随网站设置与主题变化：
+
+    {% cache 'navbar' %} … {% endcache %}
+    {% cache 'footer', 600 %} … {% endcache %}    第二个参数为秒数，默认 FRAGMENT_CACHE_TTL
+
+渲染结果按 (主题, 设置版本号, 键) 存入进程内 LRU；后台修改设置后 settings 版本号变化
+（其他 worker 在 SETTINGS_CACHE_TTL 秒内感知），旧片段不再命中，随 LRU 淘汰。
+片段内容不能依赖请求（当前页、登录状态等）；确需区分时把这些值拼进键，如 {% cache 'nav:' ~ request.endpoint %}。
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+
+from app.services.settings_cache import get_site_settings
+
+
+class FragmentCache:
+    """进程内 LRU：键 -> (过期时间, 渲染结果)"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class FragmentCacheExtension(Extension):
+    """{% cache 键[, 秒数] %} … {% endcache %}"""
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        if parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        else:
+            args.append(nodes.Const(None))
+        args.insert(0, nodes.ContextReference())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', args), [], [], body).set_lineno(lineno)
+
+    def _render(self, context, key, ttl, caller):
+        config = current_app.config
+        if not config['FRAGMENT_CACHE_ENABLED']:
+            return caller()
+        cache = current_app.extensions['fragment_cache']
+        full_key = (context.get('theme'), get_site_settings()['version'], key)
+        rendered = cache.get(full_key)
+        if rendered is None:
+            rendered = caller()
+            cache.set(full_key, rendered, ttl or config['FRAGMENT_CACHE_TTL'])
+        return rendered
+
+
+def init_app(app):
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.extensions['fragment_cache'] = FragmentCache(app.config['FRAGMENT_CACHE_MAX_ENTRIES'])
+
+    directory = app.config['TEMPLATE_BYTECODE_CACHE_DIR']
+    if directory:
+        try:
+            os.makedirs(directory, exist_ok=True)
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+        except OSError as e:
+            app.logger.warning(f'模板字节码缓存目录不可用，改为每次启动重新编译：{e}')
+
+
+def warm_templates(app):
+    """预编译全部模板（写入字节码缓存并留在 Jinja 的内存缓存中），返回模板数量"""
+    env = app.jinja_env
+    names = [name for name in env.list_templates() if name.endswith(('.html', '.xml', '.txt'))]
+    with app.app_context():
+        for name in names:
+            env.get_template(name)
+    return len(names)
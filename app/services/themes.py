@@ -0,0 +1,240 @@
+# app/services/themes.py
+"""
+主题注册表与主题 CSS 打包
+
+注册表：启动时扫描一次 static/css/themes（variables.css 之外的每个 .css 是一个主题），
+之后从内存读取；后台“刷新主题列表”时显式 reload()，并通过 cache_version 表的 'themes'
+版本号通知其他 worker 在 THEME_REGISTRY_TTL 秒内重新扫描。
+
+打包：每个主题生成一个 bundle = base.css + themes/variables.css + themes/<主题>.css，
+去掉注释与多余空白后写入 static/css/bundles/<主题>.min.css（经 asset_url 获得内容哈希 URL，
+flask assets compress 生成 .gz），每个页面只请求一个样式表。
+同时抽取首屏样式（THEME_CRITICAL_SELECTORS 开头的选择器：导航栏、英雄区等）写入 <主题>.critical.css，
+THEME_INLINE_CRITICAL=True 时内联到 <style>，完整 bundle 以 preload 异步加载。
+
+- flask assets themes 显式构建；启动时 bundle 缺失或比源文件旧也会自动重建
+- THEME_BUNDLES=False（开发环境）时仍分别加载三个源文件，改完 CSS 刷新即可看到效果
+"""
+import os
+import re
+import threading
+
+from flask import current_app
+
+from app.services.cache_versions import bump_version, current_version
+
+VERSION_KEY = 'themes'
+DEFAULT_THEME = 'default'
+
+THEMES_DIR = 'css/themes'
+BUNDLES_DIR = 'css/bundles'
+SHARED_SOURCES = ('css/base.css', 'css/themes/variables.css')
+
+# 注释与字符串（字符串原样保留，其中的 /* 不当作注释）
+_TOKENS = re.compile(r'/\*.*?\*/|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'', re.S)
+
+
+# ====================== 压缩与首屏样式 ======================
+def minify_css(css):
+    """去掉注释与多余空白（不改写选择器与属性值）"""
+    parts = []
+    position = 0
+    strings = []
+    for match in _TOKENS.finditer(css):
+        parts.append(css[position:match.start()])
+        token = match.group()
+        if not token.startswith('/*'):
+            strings.append(token)
+            parts.append(f'\0{len(strings) - 1}\0')
+        position = match.end()
+    parts.append(css[position:])
+    css = ''.join(parts)
+
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    css = css.replace(';}', '}')
+    # 空值的自定义属性（variables.css 中的 --primary: ;）必须保留一个空格
+    css = re.sub(r'(--[\w-]+):(?=[;}])', r'\1: ', css)
+    css = re.sub(r'\0(\d+)\0', lambda m: strings[int(m.group(1))], css)
+    return css.strip()
+
+
+def _blocks(css):
+    """已压缩 CSS 的顶层块：[(前导, 内容)]，如 ('.navbar', 'color:red')、('@media (max-width:768px)', '.a{…}')"""
+    blocks = []
+    start = 0
+    depth = 0
+    brace = None
+    for index, char in enumerate(css):
+        if char == '{':
+            if depth == 0:
+                brace = index
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                blocks.append((css[start:brace].strip(), css[brace + 1:index]))
+                start = index + 1
+    return blocks
+
+
+def critical_css(minified, prefixes):
+    """保留选择器以 prefixes 之一开头的规则（@media 内同样筛选）"""
+    out = []
+    for prelude, body in _blocks(minified):
+        if prelude.startswith('@media') or prelude.startswith('@supports'):
+            inner = critical_css(body, prefixes)
+            if inner:
+                out.append(f'{prelude}{{{inner}}}')
+        elif prelude.startswith('@'):
+            continue
+        elif any(selector.strip().startswith(prefixes) for selector in prelude.split(',')):
+            out.append(f'{prelude}{{{body}}}')
+    return ''.join(out)
+
+
+# ====================== 注册表 ======================
+class ThemeRegistry:
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self.names = []
+        self.bundles = {}       # 主题 -> bundle 相对路径
+        self.critical = {}      # 主题 -> 首屏 CSS
+        self.version = None
+
+    def scan(self):
+        themes_dir = os.path.join(self.static_folder, THEMES_DIR)
+        names = {DEFAULT_THEME}
+        try:
+            names.update(name[:-4] for name in os.listdir(themes_dir)
+                         if name.endswith('.css') and name != 'variables.css')
+        except FileNotFoundError:
+            pass
+        self.names = sorted(names)
+        self.bundles = {}
+        self.critical = {}
+        for name in self.names:
+            bundle = self._bundle_path(name)
+            if os.path.exists(os.path.join(self.static_folder, bundle)):
+                self.bundles[name] = bundle
+                critical_path = os.path.join(self.static_folder, self._critical_path(name))
+                if os.path.exists(critical_path):
+                    with open(critical_path, encoding='utf-8') as f:
+                        self.critical[name] = f.read()
+        return self.names
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def _bundle_path(self, name):
+        return f'{BUNDLES_DIR}/{name}.min.css'
+
+    def _critical_path(self, name):
+        return f'{BUNDLES_DIR}/{name}.critical.css'
+
+    def _sources(self, name):
+        return SHARED_SOURCES + (f'{THEMES_DIR}/{name}.css',)
+
+    def is_stale(self):
+        """有主题没有 bundle，或 bundle 比任一源文件旧"""
+        for name in self.names:
+            sources = [os.path.join(self.static_folder, path) for path in self._sources(name)]
+            sources = [path for path in sources if os.path.exists(path)]
+            bundle = os.path.join(self.static_folder, self._bundle_path(name))
+            if not os.path.exists(bundle):
+                return True
+            built_at = os.path.getmtime(bundle)
+            if any(os.path.getmtime(path) > built_at for path in sources):
+                return True
+        return False
+
+    def build(self, critical_prefixes=()):
+        """为每个主题写入 bundle 与首屏 CSS，返回 {主题: (原始字节数, 压缩后字节数)}"""
+        os.makedirs(os.path.join(self.static_folder, BUNDLES_DIR), exist_ok=True)
+        sizes = {}
+        for name in self.names:
+            source = []
+            for path in self._sources(name):
+                full = os.path.join(self.static_folder, path)
+                if os.path.exists(full):
+                    with open(full, encoding='utf-8') as f:
+                        source.append(f.read())
+            source = '\n'.join(source)
+            minified = minify_css(source)
+            _write(os.path.join(self.static_folder, self._bundle_path(name)), minified)
+            _write(os.path.join(self.static_folder, self._critical_path(name)),
+                   critical_css(minified, tuple(critical_prefixes)) if critical_prefixes else '')
+            sizes[name] = (len(source.encode()), len(minified.encode()))
+        self.scan()
+        return sizes
+
+
+def _write(path, text):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+_lock = threading.Lock()
+
+
+def init_app(app):
+    """需在 assets.init_app 之前调用：新生成的 bundle 要进入资源清单"""
+    registry = ThemeRegistry(app.static_folder)
+    registry.scan()
+    if app.config['THEME_BUNDLES'] and registry.is_stale():
+        try:
+            registry.build(app.config['THEME_CRITICAL_SELECTORS'])
+            app.logger.info(f'主题 bundle 已重建：{len(registry.names)} 个主题')
+        except OSError as e:
+            # static 目录只读等：退回分别加载源文件
+            app.logger.warning(f'主题 bundle 生成失败，改为分别加载 CSS：{e}')
+    app.extensions['themes'] = registry
+    app.add_template_global(theme_bundle)
+
+
+def get_registry():
+    """返回主题注册表；其他 worker 刷新过主题列表时重新扫描"""
+    registry = current_app.extensions['themes']
+    version = current_version(VERSION_KEY, current_app.config['THEME_REGISTRY_TTL'])
+    if registry.version is None:
+        registry.version = version   # 启动时已扫描过
+    elif registry.version != version:
+        with _lock:
+            if registry.version != version:
+                registry.scan()
+                registry.version = version
+    return registry
+
+
+def theme_names():
+    return get_registry().names
+
+
+def reload():
+    """重新扫描主题目录（后台显式刷新）；版本号随调用方事务提交，通知其他 worker"""
+    registry = current_app.extensions['themes']
+    with _lock:
+        registry.scan()
+        if current_app.config['THEME_BUNDLES'] and registry.is_stale():
+            try:
+                registry.build(current_app.config['THEME_CRITICAL_SELECTORS'])
+            except OSError as e:
+                current_app.logger.warning(f'主题 bundle 生成失败，改为分别加载 CSS：{e}')
+    bump_version(VERSION_KEY)
+    return registry.names
+
+
+def theme_bundle(theme):
+    """模板中使用：{'path': bundle 相对路径, 'critical': 需内联的首屏 CSS 或 None}；没有 bundle 时返回 None"""
+    if not current_app.config['THEME_BUNDLES']:
+        return None
+    registry = current_app.extensions['themes']
+    theme = theme or DEFAULT_THEME
+    path = registry.bundles.get(theme)
+    if path is None:
+        return None
+    critical = registry.critical.get(theme) if current_app.config['THEME_INLINE_CRITICAL'] else None
+    return {'path': path, 'critical': critical or None}
@@ -0,0 +1,49 @@
+// app/static/js/custom.js - 全站通用脚本
+
+// ============ 无限滚动（键集分页） ============
+// 页面中带 data-infinite-next 的“下一页”链接：滚动到附近时自动请求 ?partial=1 片段，
+// 把返回的卡片追加到 data-infinite-target 容器，并用响应头 X-Next-Page 更新链接
+document.addEventListener('DOMContentLoaded', function () {
+    const link = document.querySelector('[data-infinite-next]');
+    if (!link || !('IntersectionObserver' in window)) return;
+
+    const target = document.querySelector(link.dataset.infiniteTarget);
+    if (!target) return;
+
+    let loading = false;
+
+    function loadNext() {
+        if (loading || !link.getAttribute('href')) return;
+        loading = true;
+
+        const url = new URL(link.href, window.location.href);
+        url.searchParams.set('partial', '1');
+
+        fetch(url, { headers: { 'X-Requested-With': 'fetch' } })
+            .then(function (response) {
+                if (!response.ok) throw new Error(response.status);
+                const next = response.headers.get('X-Next-Page');
+                return response.text().then(function (html) { return [html, next]; });
+            })
+            .then(function ([html, next]) {
+                target.insertAdjacentHTML('beforeend', html);
+                if (next) {
+                    link.setAttribute('href', next);
+                } else {
+                    observer.disconnect();
+                    link.parentElement.remove();
+                }
+            })
+            .catch(function () {
+                // 出错时保留普通链接，用户仍可点击翻页
+                observer.disconnect();
+            })
+            .finally(function () { loading = false; });
+    }
+
+    const observer = new IntersectionObserver(function (entries) {
+        if (entries.some(function (entry) { return entry.isIntersecting; })) loadNext();
+    }, { rootMargin: '600px 0px' });
+
+    observer.observe(link);
+});
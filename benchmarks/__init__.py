@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# 性能基准：python -m benchmarks.generate 生成大规模模拟目录，python -m benchmarks.run 压测并输出 JSON
@@ -0,0 +1,26 @@
+# benchmarks/common.py
+# 基准脚本共用：数据库选择（默认使用独立的 instance/bench.db，不碰正式数据）
+
+import os
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+DEFAULT_DATABASE_URL = 'sqlite:///' + os.path.join(BASE_DIR, 'instance', 'bench.db')
+
+
+def add_database_option(parser):
+    parser.add_argument('--database-url', default=os.environ.get('BENCH_DATABASE_URL', DEFAULT_DATABASE_URL),
+                        help='基准数据库（默认 instance/bench.db）')
+
+
+def make_app(database_url, config_name=None):
+    """
+    用指定数据库创建应用（config.py 在导入时读取 DATABASE_URL，必须先设置环境变量）
+
+    未指定配置时与部署一致使用 production（FLASK_CONFIG 可改）。基准数据库是独立的：
+    没有 SECRET_KEY 时使用固定的基准密钥，页面缓存写入单独的目录，不与正式站点共用。
+    """
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+    os.environ.setdefault('RESPONSE_CACHE_DIR', os.path.join(BASE_DIR, 'instance', 'bench-page-cache'))
+    from app import create_app
+    return create_app(config_name)
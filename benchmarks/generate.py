@@ -0,0 +1,147 @@
+# benchmarks/generate.py
+"""
+生成大规模模拟产品目录（用于压测）
+
+    python -m benchmarks.generate --products 100000 --categories 40 --series 300 --photos 60 --reset
+
+- 默认写入独立的 instance/bench.db（--database-url 可改），不影响正式数据
+- 产品经 services/importer.py 写入，与正式导入走同一套流程
+  （分类映射、编号分配、全文索引、精选系列关联全部真实生成）
+- 照片：用 Pillow 生成 --photos 张 1600×1200 的 JPEG，放在 static/uploads/products/bench/，
+  产品从中随机引用，衍生图（缩略图）路径可以被真实压测
+- 固定 --seed 时两次生成的数据完全相同，方便对比不同版本的基准结果
+"""
+import argparse
+import os
+import random
+import sys
+
+from benchmarks.common import add_database_option, make_app
+
+PHOTO_DIR = 'bench'
+
+NOUNS = ['Bed', 'Nightstand', 'Sofa', 'Armchair', 'Coffee Table', 'Lounge Chair', 'Desk Chair',
+         'Dining Chair', 'Luggage Rack', 'Side Table', 'Headboard', 'Wardrobe', 'Writing Desk',
+         'TV Cabinet', 'Dresser', 'Vanity', 'Minibar', 'Wall Panel', 'Shelf', 'Console Table']
+ADJECTIVES = ['Classic', 'Modern', 'Walnut', 'Oak', 'Velvet', 'Leather', 'Compact', 'Grand',
+              'Coastal', 'Urban', 'Nordic', 'Heritage', 'Slim', 'Royal', 'Studio', 'Boutique']
+MATERIALS = ['wood', 'oak', 'walnut', 'metal', 'metal and foam', 'plywood', 'MDF', 'marble', 'rattan']
+SURFACES = ['cloth', 'leather', 'veneer', 'lacquer', 'wood', 'fabric', 'laminate']
+SPACES = ['room', 'lounge', 'lobby', 'restaurant', 'suite', 'bathroom', 'corridor']
+
+
+def product_rows(count, categories, series_names, photos, seed):
+    """产出 (序号, 行数据)，格式与导入文件相同"""
+    rng = random.Random(seed)
+    for index in range(1, count + 1):
+        noun = rng.choice(NOUNS)
+        name = f'{rng.choice(ADJECTIVES)} {noun} {index}'
+        series = []
+        if series_names and rng.random() < 0.6:
+            series = rng.sample(series_names, k=min(len(series_names), rng.choice((1, 1, 1, 2))))
+        images = rng.sample(photos, k=min(len(photos), rng.randint(1, 4))) if photos else []
+        yield index, {
+            'name': name,
+            'description': f'{name} for hotel {rng.choice(SPACES)} projects, '
+                           f'{rng.choice(MATERIALS)} frame with {rng.choice(SURFACES)} finish.',
+            'category': rng.choice(categories),
+            'image': images[0] if images else None,
+            'photos': ','.join(images) or None,
+            'length': rng.randrange(300, 2400, 10),
+            'width': rng.randrange(300, 1200, 10),
+            'height': rng.randrange(350, 2200, 10),
+            'seat_height': rng.randrange(380, 480, 5) if 'Chair' in noun or noun == 'Sofa' else None,
+            'base_material': rng.choice(MATERIALS),
+            'surface_material': rng.choice(SURFACES),
+            'featured_series': ', '.join(series) or None,
+            'applicable_space': ', '.join(rng.sample(SPACES, k=rng.randint(1, 2))),
+        }
+
+
+def make_photos(upload_folder, count, seed):
+    """生成 count 张占位照片（已存在的文件不重复生成），返回相对 uploads/products 的文件名"""
+    from PIL import Image, ImageDraw
+
+    folder = os.path.join(upload_folder, PHOTO_DIR)
+    os.makedirs(folder, exist_ok=True)
+    rng = random.Random(seed)
+    names = []
+    for index in range(1, count + 1):
+        name = f'photo-{index:04d}.jpg'
+        color = tuple(rng.randrange(60, 220) for _ in range(3))
+        path = os.path.join(folder, name)
+        if not os.path.exists(path):
+            img = Image.new('RGB', (1600, 1200), color)
+            draw = ImageDraw.Draw(img)
+            for _ in range(12):
+                x, y = rng.randrange(1600), rng.randrange(1200)
+                draw.rectangle((x, y, x + rng.randrange(80, 600), y + rng.randrange(80, 400)),
+                               fill=tuple(rng.randrange(256) for _ in range(3)))
+            img.save(path, 'JPEG', quality=85)
+        names.append(f'{PHOTO_DIR}/{name}')
+    return names
+
+
+def reset_database(database_url):
+    from sqlalchemy.engine import make_url
+
+    url = make_url(database_url)
+    if url.get_backend_name() == 'sqlite' and url.database:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(url.database + suffix):
+                os.remove(url.database + suffix)
+        return True
+    return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='生成模拟产品目录')
+    add_database_option(parser)
+    parser.add_argument('--products', type=int, default=50000)
+    parser.add_argument('--categories', type=int, default=40)
+    parser.add_argument('--series', type=int, default=200)
+    parser.add_argument('--photos', type=int, default=40, help='生成的照片张数（产品从中随机引用）')
+    parser.add_argument('--batch-size', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reset', action='store_true', help='先清空基准数据库')
+    args = parser.parse_args(argv)
+
+    dropped_file = args.reset and reset_database(args.database_url)
+    app = make_app(args.database_url)
+
+    from werkzeug.security import generate_password_hash
+    from app import db
+    from app.models import Category, Settings, User
+    from app.services.importer import import_rows
+
+    with app.app_context():
+        if args.reset and not dropped_file:
+            db.drop_all()
+        db.create_all()
+
+        if not User.query.filter_by(username='admin').first():
+            db.session.add(User(username='admin', password=generate_password_hash('admin123')))
+        if Settings.query.count() == 0:
+            db.session.add(Settings(company_name='Benchmark Hotel Furniture', theme='default'))
+        existing = {name for (name,) in db.session.query(Category.name)}
+        categories = [f'{NOUNS[i % len(NOUNS)]} Collection {i // len(NOUNS) + 1}' for i in range(args.categories)]
+        db.session.add_all(Category(name=name) for name in categories if name not in existing)
+        db.session.commit()
+
+        upload_folder = os.path.join(app.root_path, 'static', 'uploads', 'products')
+        photos = make_photos(upload_folder, args.photos, args.seed)
+        series_names = [f'series-{i:04d}' for i in range(1, args.series + 1)]
+
+        def progress(report):
+            print(f'  {report.inserted}/{args.products} 个产品（{report.elapsed:.1f}s）', file=sys.stderr)
+
+        report = import_rows(product_rows(args.products, categories, series_names, photos, args.seed),
+                             batch_size=args.batch_size, progress=progress)
+
+    print(f'生成完成：{report.inserted} 个产品，{len(categories)} 个分类，{len(series_names)} 个系列，'
+          f'{len(photos)} 张照片，失败 {report.failed}，耗时 {report.elapsed:.1f}s')
+    print(f'数据库：{args.database_url}')
+
+
+if __name__ == '__main__':
+    main()
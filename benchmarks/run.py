@@ -0,0 +1,272 @@
+# benchmarks/run.py
+"""
+路由压测：各路由的 p50 / p95 / p99 延迟、吞吐量与 SQL 查询数
+
+    python -m benchmarks.run --requests 300 --output results/before.json
+    python -m benchmarks.run --requests 300 --output results/after.json --compare results/before.json
+
+- client 模式（默认）：进程内 Flask test client，可精确统计每个请求的 SQL 条数
+- http 模式：--url http://127.0.0.1:5000 压测已启动的服务（python -m app serve），
+  包含真实的网络与多进程开销；服务端开启 INSTRUMENTATION 时从 Server-Timing 头读取查询数
+- 每个路由的请求随机分布在不同产品 / 系列上（--seed 固定），先预热 --warmup 次再计时
+- --no-page-cache 关闭整页缓存，测量真实渲染开销
+- --compare 与之前的 JSON 对比，p95 变慢超过 --threshold 时以退出码 1 结束（可用于 CI）
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from benchmarks.common import BASE_DIR, add_database_option, make_app
+
+SERVER_TIMING_DB_RE = re.compile(r'\bdb;[^,]*desc="(\d+) queries"')
+
+ROUTES = ('home', 'product_list', 'product_detail', 'series_detail', 'admin_product_list')
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    # 最近秩法
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def sample_paths(app, count, seed):
+    """为每个路由生成 count 个请求路径（产品、系列按 id 随机抽样）"""
+    from sqlalchemy import func, select
+    from app import db
+    from app.models import Product, Series
+
+    rng = random.Random(seed)
+    with app.app_context():
+        max_id = db.session.execute(select(func.max(Product.id))).scalar() or 0
+        product_ids = db.session.execute(
+            select(Product.id).where(Product.id.in_([rng.randint(1, max_id) for _ in range(count * 2)]))
+        ).scalars().all() if max_id else []
+        series = db.session.execute(
+            select(Series.name).where(Series.product_count > 0).order_by(Series.id)
+        ).scalars().all()
+
+    paths = {
+        'home': ['/'] * count,
+        'product_list': ['/products/'] * count,
+        'product_detail': [f'/products/{rng.choice(product_ids)}' for _ in range(count)] if product_ids else [],
+        'series_detail': [f'/featured/{rng.choice(series)}' for _ in range(count)] if series else [],
+        'admin_product_list': ['/admin/products/'] * count,
+    }
+    return paths
+
+
+class ClientDriver:
+    """进程内 test client；通过引擎事件统计每个请求的 SQL 条数"""
+
+    def __init__(self, app, page_cache=True):
+        from sqlalchemy import event
+        from app import db
+
+        self.app = app
+        if not page_cache:
+            from app.services.response_cache import NullBackend
+            app.extensions['response_cache'] = NullBackend()
+        self._local = threading.local()
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', self._on_query)
+
+    def _on_query(self, *args):
+        self._local.queries = getattr(self._local, 'queries', 0) + 1
+
+    def _client(self):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+            with client.session_transaction() as session:
+                session['_user_id'] = '1'  # 后台页面需要登录
+        return client
+
+    def request(self, path):
+        client = self._client()
+        self._local.queries = 0
+        start = time.perf_counter()
+        response = client.get(path)
+        response.close()
+        elapsed = time.perf_counter() - start
+        return response.status_code, elapsed, self._local.queries
+
+
+class HttpDriver:
+    """压测已启动的服务；后台页面的登录态用本地同一 SECRET_KEY 签发的会话 cookie"""
+
+    def __init__(self, app, base_url):
+        self.base_url = base_url.rstrip('/')
+        serializer = app.session_interface.get_signing_serializer(app)
+        self.cookie = f"{app.config['SESSION_COOKIE_NAME']}={serializer.dumps({'_user_id': '1', '_fresh': True})}"
+
+    def request(self, path):
+        req = urllib.request.Request(self.base_url + path, headers={'Cookie': self.cookie})
+        start = time.perf_counter()
+        queries = None
+        try:
+            with urllib.request.urlopen(req, timeout=30) as response:
+                response.read()
+                status = response.status
+                queries = server_timing_queries(response.headers.get('Server-Timing'))
+        except urllib.error.HTTPError as e:
+            e.read()
+            status = e.code
+        except OSError:
+            status = 0
+        return status, time.perf_counter() - start, queries
+
+
+def server_timing_queries(header):
+    """从 Server-Timing 头（服务端开启 INSTRUMENTATION 时）读取 SQL 条数"""
+    match = SERVER_TIMING_DB_RE.search(header or '')
+    return int(match.group(1)) if match else None
+
+
+def run_route(driver, paths, concurrency, warmup):
+    for path in paths[:warmup]:
+        driver.request(path)
+    paths = paths[warmup:]
+
+    results = []
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(executor.map(driver.request, paths))
+    else:
+        results = [driver.request(path) for path in paths]
+    wall = time.perf_counter() - start
+
+    latencies = [elapsed * 1000 for _, elapsed, _ in results]
+    queries = [count for _, _, count in results if count is not None]
+    errors = sum(1 for status, _, _ in results if status != 200)
+    return {
+        'requests': len(results),
+        'errors': errors,
+        'statuses': sorted({status for status, _, _ in results}),
+        'rps': round(len(results) / wall, 1) if wall else None,
+        'mean_ms': round(sum(latencies) / len(latencies), 2),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'max_ms': round(max(latencies), 2),
+        'queries_mean': round(sum(queries) / len(queries), 2) if queries else None,
+        'queries_max': max(queries) if queries else None,
+    }
+
+
+def catalog_size(app):
+    from app import db
+    from app.models import Category, Product, Series
+
+    with app.app_context():
+        return {
+            'products': db.session.query(Product).count(),
+            'categories': db.session.query(Category).count(),
+            'series': db.session.query(Series).count(),
+        }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline, threshold):
+    """打印与基线的对比，返回 p95 变慢超过阈值的路由"""
+    regressions = []
+    print(f"\n{'路由':<22}{'p95 基线':>12}{'p95 当前':>12}{'变化':>10}{'查询数':>14}")
+    for name, stats in current['routes'].items():
+        before = baseline.get('routes', {}).get(name)
+        if not before:
+            continue
+        change = (stats['p95_ms'] - before['p95_ms']) / before['p95_ms'] if before['p95_ms'] else 0
+        queries = f"{before.get('queries_mean')} -> {stats.get('queries_mean')}"
+        flag = ''
+        if change > threshold:
+            flag = '  <- 变慢'
+            regressions.append(name)
+        print(f"{name:<22}{before['p95_ms']:>12.2f}{stats['p95_ms']:>12.2f}{change:>+10.1%}{queries:>14}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='路由压测')
+    add_database_option(parser)
+    parser.add_argument('--url', help='压测已启动的服务（http 模式）；不指定则使用进程内 test client')
+    parser.add_argument('--routes', default=','.join(ROUTES), help=f'逗号分隔，可选：{", ".join(ROUTES)}')
+    parser.add_argument('--requests', type=int, default=200, help='每个路由的请求数')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--no-page-cache', action='store_true', help='关闭整页缓存（仅 client 模式）')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='结果 JSON 文件')
+    parser.add_argument('--compare', help='与之前的结果 JSON 对比')
+    parser.add_argument('--threshold', type=float, default=0.10, help='p95 变慢超过该比例视为退化')
+    args = parser.parse_args(argv)
+
+    app = make_app(args.database_url)
+    paths = sample_paths(app, args.requests + args.warmup, args.seed)
+    driver = HttpDriver(app, args.url) if args.url else ClientDriver(app, page_cache=not args.no_page_cache)
+
+    result = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'mode': 'http' if args.url else 'client',
+            'url': args.url,
+            'page_cache': not args.no_page_cache,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'catalog': catalog_size(app),
+        },
+        'routes': {},
+    }
+
+    print(f"{'路由':<22}{'请求':>6}{'错误':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'查询':>7}")
+    for name in args.routes.split(','):
+        route_paths = paths.get(name.strip())
+        if not route_paths:
+            print(f'{name:<22}（无可用数据，跳过）')
+            continue
+        stats = run_route(driver, route_paths, args.concurrency, args.warmup)
+        result['routes'][name] = stats
+        print(f"{name:<22}{stats['requests']:>6}{stats['errors']:>6}{stats['rps']:>9}"
+              f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}{str(stats['queries_mean']):>7}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f'\n结果已写入 {args.output}')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(result, json.load(f), args.threshold)
+        if regressions:
+            print(f"\np95 退化超过 {args.threshold:.0%}：{', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,203 @@
 import os
 
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+INSTANCE_DIR = os.path.join(BASE_DIR, 'instance')
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key-change-me'
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(os.path.abspath(os.path.dirname(__file__)), 'instance/site.db')
+
+    # ====================== 数据库 ======================
+    # DATABASE_URL 可指向 PostgreSQL 等（需自行安装驱动，如 psycopg）；默认 instance/site.db
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///' + os.path.join(INSTANCE_DIR, 'site.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # 只读副本（可选）：前台蓝图的 GET 请求读副本，后台与所有写入走主库
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+    DATABASE_REPLICA_BLUEPRINTS = ('main', 'products', 'featured', 'media', 'seo', 'api')
+
+    # 连接池（SQLite 内存库不使用连接池，这些设置会被忽略）
+    DB_POOL_SIZE = _env_int('DB_POOL_SIZE', 10)
+    DB_MAX_OVERFLOW = _env_int('DB_MAX_OVERFLOW', 10)
+    DB_POOL_TIMEOUT = _env_int('DB_POOL_TIMEOUT', 10)
+    DB_POOL_RECYCLE = _env_int('DB_POOL_RECYCLE', 1800)
+
+    # SQLite 每个连接建立时执行的 PRAGMA：
+    # WAL 让读者不再被后台写入阻塞；NORMAL 在 WAL 下只在检查点时 fsync
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -20000,           # 约 20MB 页缓存（负数单位为 KB）
+        'mmap_size': 256 * 1024 * 1024,
+        'busy_timeout': 5000,           # 毫秒：写锁被占用时等待而不是立即报错
+        'temp_store': 'MEMORY',
+    }
+
+    # ====================== 缓存 ======================
+    # Settings 缓存：其他 worker 修改设置后，最多延迟多少秒生效
+    SETTINGS_CACHE_TTL = 5
+
+    # 模板：编译结果缓存到磁盘，worker 启动时不再重新编译（None = 关闭）
+    TEMPLATE_BYTECODE_CACHE_DIR = os.path.join(INSTANCE_DIR, 'jinja-bytecode')
+    # {% cache %} 片段缓存（导航栏、页脚、英雄区），按主题与设置版本号区分
+    FRAGMENT_CACHE_ENABLED = True
+    FRAGMENT_CACHE_TTL = 3600
+    FRAGMENT_CACHE_MAX_ENTRIES = 256
+
+    # 前台整页缓存：memory（进程内 LRU）/ filesystem（多 worker 共享）/ null（关闭）
+    RESPONSE_CACHE_BACKEND = 'memory'
+    RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+    RESPONSE_CACHE_DIR = os.environ.get('RESPONSE_CACHE_DIR') or os.path.join(INSTANCE_DIR, 'page-cache')
+    RESPONSE_CACHE_DIR_MAX_BYTES = 512 * 1024 * 1024
+    RESPONSE_CACHE_TTL = 3600  # 兜底过期时间；正常情况靠写入时精确失效
+    # 其他 worker 的写入最多延迟多少秒在本进程生效（轮询 cache_invalidation 表）
+    CHANGES_POLL_INTERVAL = 2
+
+    # 反向代理 / CDN：公开蓝图不读写会话、不加载登录用户，响应可被代理共享缓存
+    PUBLIC_BLUEPRINTS = ('main', 'products', 'featured')
+    PUBLIC_MAX_AGE = _env_int('PUBLIC_MAX_AGE', 60)  # 浏览器缓存秒数（浏览器无法按标签清除，保持较短）
+    PUBLIC_S_MAXAGE = _env_int('PUBLIC_S_MAXAGE', 300)  # 代理缓存秒数；配置了 EDGE_PURGE_URL 时可调大
+    PUBLIC_STALE_WHILE_REVALIDATE = 30
+    SURROGATE_KEY_HEADER = 'Surrogate-Key'  # 页面缓存标签（空格分隔）所用的响应头
+    EDGE_PURGE_URL = os.environ.get('EDGE_PURGE_URL')  # 后台写入提交后向此地址发送 PURGE（None = 不清除）
+    EDGE_PURGE_TIMEOUT = 3
+
+    # ====================== 产品 ======================
+    # 前台产品列表每页数量（?per_page= 可调整，但不超过上限）
+    PRODUCTS_PER_PAGE = 24
+    PRODUCTS_MAX_PER_PAGE = 96
+    SEARCH_RESULTS_PER_PAGE = 20
+    # 产品列表侧栏：每个分面最多列出多少个值（按产品数降序，已选中的值总是列出）
+    FACET_VALUES_LIMIT = 12
+    # 尺寸查找（/products/fit）“接近”模式的默认允许偏差（毫米）
+    FIT_DEFAULT_TOLERANCE = 50
+    # 后台批量导入：每批（每个事务）插入的行数
+    IMPORT_BATCH_SIZE = 1000
+    # 产品编号：每个进程一次预留多少个号
+    PRODUCT_CODE_BLOCK_SIZE = 100
+    # 后台产品列表：键集分页每页数量与上限、总数缓存秒数、批量操作一次最多处理的产品数
+    ADMIN_PRODUCTS_PER_PAGE = 50
+    ADMIN_PRODUCTS_MAX_PER_PAGE = 500
+    ADMIN_COUNT_TTL = 60
+    ADMIN_BULK_MAX = 5000
+
+    # ====================== JSON 接口（/api/v1） ======================
+    API_PAGE_SIZE = 50
+    API_MAX_PAGE_SIZE = 500
+
+    # ====================== SEO ======================
+    # 正式域名（如 https://www.example.com），sitemap / robots.txt 中的绝对 URL；
+    # 不设置则使用请求的域名，且 sitemap 不缓存（每次请求重新生成）
+    SITE_URL = os.environ.get('SITE_URL')
+    SITEMAP_SHARD_SIZE = 50000  # 每个产品分片的 URL 数（协议上限 50000）
+    SITEMAP_CACHE_DIR = os.path.join(INSTANCE_DIR, 'sitemaps')
+    SITEMAP_MAX_AGE = 86400     # 缓存文件兜底重建周期（秒）；正常情况靠产品变更时精确失效
+    SITEMAP_HTTP_MAX_AGE = 3600
+
+    # ====================== 图片与静态资源 ======================
+    # 产品图衍生图（缩略图）：白名单宽度、质量、磁盘缓存目录与容量、生成进程数
+    IMAGE_WIDTHS = (160, 320, 480, 640, 960, 1280)
+    IMAGE_QUALITY = {'webp': 80, 'jpeg': 82}
+    IMAGE_CACHE_DIR = os.path.join(INSTANCE_DIR, 'derivatives')
+    IMAGE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+    IMAGE_WORKERS = 2  # 0 = 在请求线程内生成
+    IMAGE_RENDER_TIMEOUT = 20
+    IMAGE_MAX_AGE = 86400
+
+    # 内容寻址媒体库（services/media.py）：上传的图片按 SHA-256 存储，/media/o/<哈希>.<扩展名> 永久缓存
+    MEDIA_STORE_DIR = os.path.join(INSTANCE_DIR, 'media')
+    MAX_CONTENT_LENGTH = 64 * 1024 * 1024   # 请求体上限（超出返回 413；后台导入的 CSV 也受此限制）
+    MEDIA_MAX_BYTES = 16 * 1024 * 1024      # 单个图片文件上限
+    MEDIA_MAX_PIXELS = 40_000_000           # 宽 × 高上限：只读文件头判断，超出的图片不解码
+    MEDIA_MAX_AGE = 31536000
+    MEDIA_GC_GRACE = 86400                  # 无引用的对象保留多久才回收（上传后任务尚未完成等）
+
+    # 静态资源内容哈希 URL（/assets/<哈希>/...，一年 immutable 缓存）
+    ASSET_DIRS = ('css', 'js')
+    ASSET_MANIFEST_PATH = os.path.join(INSTANCE_DIR, 'asset-manifest.json')
+    ASSET_MANIFEST_RELOAD = False  # True = 每次按文件修改时间重算（开发调试用）
+    ASSET_MAX_AGE = 31536000
+
+    # 主题（services/themes.py）：每个主题合并压缩为一个 bundle（static/css/bundles/）
+    THEME_BUNDLES = True
+    THEME_INLINE_CRITICAL = False   # True = 首屏样式内联到页面，完整 bundle 异步加载
+    THEME_CRITICAL_SELECTORS = (':root', 'html', 'body', '.navbar', '.hero', '.container')
+    THEME_REGISTRY_TTL = 5          # 其他 worker 刷新主题列表后，最多延迟多少秒生效
+
+    # 响应压缩（services/compression.py）：gzip，安装了 brotli 库时优先 br
+    COMPRESS_ENABLED = True
+    COMPRESS_MIMETYPES = ('text/html', 'text/css', 'text/plain', 'text/xml', 'application/json',
+                          'application/javascript', 'text/javascript', 'application/xml', 'image/svg+xml')
+    COMPRESS_MIN_SIZE = 500        # 字节；更小的响应压缩收益抵不过开销
+    COMPRESS_LEVEL = 6             # gzip 1-9
+    COMPRESS_BR_LEVEL = 4          # brotli 0-11
+    # flask assets compress 预压缩的静态文件类型
+    COMPRESS_STATIC_SUFFIXES = ('.css', '.js', '.svg', '.json', '.txt')
+
+    # ====================== 后台任务（services/jobs.py） ======================
+    # 生产环境需另外运行 flask jobs worker -p N；JOBS_EAGER=True 时请求中入队的任务在响应发送后由本进程执行
+    JOBS_EAGER = False
+    JOBS_POLL_INTERVAL = 1      # 队列空闲时 worker 检查新任务的间隔（秒）
+    JOBS_MAX_ATTEMPTS = 5
+    JOBS_RETRY_DELAY = 30       # 第 n 次失败后约 30 × 2^(n-1) 秒重试
+    JOBS_RETRY_MAX_DELAY = 3600
+    JOBS_LOCK_TIMEOUT = 600     # running 超过该秒数视为 worker 已退出，重新排队
+    JOBS_RETENTION_DAYS = 7     # 已完成任务的保留天数
+
+    # ====================== 性能埋点（services/instrumentation.py） ======================
+    # 开启后每个响应带 Server-Timing 头，并记录慢请求与按端点汇总
+    INSTRUMENTATION = os.environ.get('INSTRUMENTATION') == '1'
+    SLOW_REQUEST_MS = 500
+    SLOW_REQUEST_LOG = os.path.join(INSTANCE_DIR, 'slow-requests.log')
+    # 同一请求中同一条 SQL 执行达到该次数视为疑似 N+1（0 = 不检测）
+    N_PLUS_ONE_THRESHOLD = 0
+
+    @staticmethod
+    def init_app(app):
+        pass
+
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+    JOBS_EAGER = True
+    THEME_BUNDLES = False  # 分别加载源文件，改完 CSS 刷新即可看到效果
+    FRAGMENT_CACHE_ENABLED = False  # 改完模板刷新即可看到效果
+    ASSET_MANIFEST_RELOAD = True
+    INSTRUMENTATION = True
+    N_PLUS_ONE_THRESHOLD = 5
+
+
+class ProductionConfig(Config):
+    SECRET_KEY = os.environ.get('SECRET_KEY')
+    # 多个 worker 进程共享同一份页面缓存
+    RESPONSE_CACHE_BACKEND = 'filesystem'
+
+    @staticmethod
+    def init_app(app):
+        if not app.config['SECRET_KEY']:
+            raise RuntimeError('生产环境必须通过环境变量 SECRET_KEY 设置密钥'
+                               '（本地调试请设置 FLASK_CONFIG=development）')
+
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL') or 'sqlite://'
+    RESPONSE_CACHE_BACKEND = 'null'
+    FRAGMENT_CACHE_ENABLED = False
+    IMAGE_WORKERS = 0
+    CHANGES_POLL_INTERVAL = 0
+    JOBS_EAGER = True
+
+
+# FLASK_CONFIG 环境变量选择配置；未指定时为 production：
+# 调试配置（DEBUG、固定密钥、Server-Timing 等）只能显式选择，不会被部署入口意外使用
+config = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig,
+    'default': ProductionConfig,
+}
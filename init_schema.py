@@ -5,6 +5,13 @@ import random
 import string
 from app import create_app, db
 from app.models import User, Settings, Category, Product
+from app.services.importer import import_rows
+from app.services.series import sync_all_series
+from app.services.photos import analyze_photos, sync_all_photos
+from app.services.search import ensure_search_index
+from app.services.dimensions import ensure_dimension_index
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateTable
 from werkzeug.security import generate_password_hash
 
 app = create_app()
@@ -15,6 +22,44 @@ os.makedirs(instance_path, exist_ok=True)
 with app.app_context():
     db.create_all()
 
+    # 旧数据库：create_all 不会给已存在的表补列（如 product.updated_at），这里用 ALTER TABLE 补齐
+    # （新增列都允许为空，默认值由 ORM 写入，补列后再回填旧数据）
+    inspector = inspect(db.engine)
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=db.engine.dialect)
+                    connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                    print(f"Added column {table.name}.{column.name}")
+        connection.execute(text(
+            "UPDATE product SET created_at = coalesce(updated_at, CURRENT_TIMESTAMP) WHERE created_at IS NULL"
+        ))
+        connection.execute(text("UPDATE product SET updated_at = created_at WHERE updated_at IS NULL"))
+
+    # 旧数据库：product.created_at 改为 NOT NULL。SQLite 不能 ALTER 列约束，只能重建表
+    # （新建 → 复制 → 删除旧表 → 改名；索引在下面补建，product 上的触发器由 ensure_* 重新创建。
+    # 改名时用 legacy_alter_table：category 上引用 product 的触发器原样保留，不因旧表已删除而报错）
+    created_at_column = next(c for c in inspect(db.engine).get_columns('product') if c['name'] == 'created_at')
+    if created_at_column['nullable'] and db.engine.dialect.name == 'sqlite':
+        product_table = Product.__table__
+        create_sql = str(CreateTable(product_table).compile(dialect=db.engine.dialect))
+        columns = ', '.join(column.name for column in product_table.columns)
+        with db.engine.begin() as connection:
+            connection.execute(text(create_sql.replace('CREATE TABLE product ', 'CREATE TABLE product_rebuild ', 1)))
+            connection.execute(text(f'INSERT INTO product_rebuild ({columns}) SELECT {columns} FROM product'))
+            connection.execute(text('DROP TABLE product'))
+            connection.execute(text('PRAGMA legacy_alter_table = ON'))
+            connection.execute(text('ALTER TABLE product_rebuild RENAME TO product'))
+            connection.execute(text('PRAGMA legacy_alter_table = OFF'))
+        print("Rebuilt table product (created_at NOT NULL)")
+
+    # 旧数据库：create_all 不会给已存在的表补建索引，这里逐个补齐
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
     # 默认管理员账号
     if not User.query.filter_by(username='admin').first():
         admin_user = User(
@@ -77,6 +122,9 @@ with app.app_context():
         for cat_name in all_cats:
             db.session.add(Category(name=cat_name))
 
+    # 分类需先提交，产品导入时按名称映射
+    db.session.commit()
+
     # ==================== 注入你指定的5条真实预产品数据 ====================
     if Product.query.count() == 0:
         products_data = [
@@ -162,34 +210,33 @@ with app.app_context():
             }
         ]
 
-        for data in products_data:
-            category = Category.query.filter_by(name=data["category_name"]).first()
-            if not category:
-                # 如果分类不存在（理论上不会），创建它
-                category = Category(name=data["category_name"])
-                db.session.add(category)
-                db.session.flush()
-
-            product = Product(
-                product_code=data["product_code"],
-                name=data["name"],
-                description=data["description"] or None,
-                image=data["image"],
-                photos=data["photos"],
-                length=data["length"],
-                width=data["width"],
-                height=data["height"],
-                seat_height=data["seat_height"],
-                base_material=data["base_material"] or None,
-                surface_material=data["surface_material"] or None,
-                featured_series=data["featured_series"] or None,
-                applicable_space=data["applicable_space"] or None,
-                category_id=category.id
-            )
-            db.session.add(product)
+        # 与 flask catalog import 相同的流程：分类名一次性映射为 id，整批插入
+        import_rows(enumerate(products_data, 1), create_categories=True)
+
+    db.session.commit()
+
+    # 精选系列：解析 featured_series 字符串，生成 Series 与 product_series（可重复执行）
+    series_count, link_count = sync_all_series()
+    db.session.commit()
+
+    # 产品图片：从 image / photos 字符串迁移到 product_photo 表，并读取尺寸与主色调（可重复执行）
+    photo_products, photo_count = sync_all_photos()
+    analyzed_count = analyze_photos()
+    db.session.commit()
 
+    # 全文搜索：旧数据库首次升级时补建 FTS5 索引
+    indexed_count = ensure_search_index(db.session.connection())
     db.session.commit()
+
+    # 尺寸搜索：R*Tree 索引（旧数据库首次升级时补建）
+    dims_count = ensure_dimension_index(db.session.connection())
+    db.session.commit()
+
     print("Database initialization complete!")
+    print(f"Featured series synced: {series_count} series, {link_count} product links.")
+    print(f"Product photos synced: {photo_count} photos for {photo_products} products ({analyzed_count} files analyzed).")
+    print(f"Full-text search index: {indexed_count} products.")
+    print(f"Dimension index: {dims_count} products with length/width/height.")
     print("Admin account: admin / admin123")
     print("5 real products with specified codes and images have been injected.")
     print("Theme set to 'default' for correct CSS loading.")
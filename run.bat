@@ -60,6 +60,15 @@ if exist requirements.txt (
     echo WARNING: 未找到 requirements.txt 文件！
 )
 
+:: 生产配置：未设置 SECRET_KEY 时生成一个随机密钥并保存在 instance\secret_key（重启后会话仍然有效）
+if not defined FLASK_CONFIG set FLASK_CONFIG=production
+set FLASK_APP=app:create_app
+if not defined SECRET_KEY (
+    if not exist instance mkdir instance
+    if not exist instance\secret_key python -c "import secrets; print(secrets.token_hex(32))" > instance\secret_key
+    set /p SECRET_KEY=<instance\secret_key
+)
+
 :: 检查数据库是否存在
 set DB_PATH=instance\site.db
 if not exist "%DB_PATH%" (
@@ -91,7 +100,11 @@ echo.
 echo 正在启动服务器并自动打开浏览器...
 start "" http://127.0.0.1:5000
 
-python app.py
+:: 后台任务 worker（生产配置不在请求进程内执行任务），与服务共用本窗口，Ctrl+C 一并停止
+start "" /b flask jobs worker
+
+:: Windows 不支持 fork，serve 以单进程多线程方式运行
+python -m app serve --bind 127.0.0.1:5000 --threads 8
 
 :: 如果程序异常退出
 if errorlevel 1 (
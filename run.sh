@@ -64,6 +64,17 @@ else
     echo "WARNING: 未找到 requirements.txt 文件！"
 fi
 
+# 生产配置：未设置 SECRET_KEY 时生成一个随机密钥并保存在 instance/secret_key（重启后会话仍然有效）
+export FLASK_CONFIG="${FLASK_CONFIG:-production}"
+export FLASK_APP="app:create_app"
+if [ -z "$SECRET_KEY" ]; then
+    mkdir -p instance
+    if [ ! -f instance/secret_key ]; then
+        (umask 077; python -c "import secrets; print(secrets.token_hex(32))" > instance/secret_key)
+    fi
+    export SECRET_KEY="$(cat instance/secret_key)"
+fi
+
 # 检查数据库是否存在
 DB_PATH="instance/site.db"
 if [ ! -f "$DB_PATH" ]; then
@@ -103,11 +114,22 @@ elif command -v start >/dev/null 2>&1; then
     start http://127.0.0.1:5000
 fi
 
-# 启动 Flask
-python app.py
+# 后台任务 worker（生产配置不在请求进程内执行任务）；JOB_WORKERS 环境变量可调整进程数
+flask jobs worker --processes "${JOB_WORKERS:-1}" &
+JOBS_PID=$!
+trap 'kill -TERM "$JOBS_PID" 2>/dev/null' EXIT
+
+# 启动服务：预加载应用 + 多进程 worker（开发调试可改用 python app.py）
+# WORKERS / THREADS 环境变量可调整进程数与每进程线程数
+python -m app serve --bind 127.0.0.1:5000 --workers "${WORKERS:-0}" --threads "${THREADS:-8}" --max-requests 10000 --max-requests-jitter 1000
+STATUS=$?
+
+# 停止任务 worker（执行中的任务完成后退出）
+kill -TERM "$JOBS_PID" 2>/dev/null
+wait "$JOBS_PID" 2>/dev/null
 
 # 捕获退出状态
-if [ $? -ne 0 ]; then
+if [ $STATUS -ne 0 ]; then
     echo
     echo "ERROR: 项目运行出错！"
 fi
@@ -0,0 +1,83 @@
+# tests/conftest.py
+# 测试共用：testing 配置 + 临时 SQLite 文件库（每个测试重新建库）
+#
+# 用文件库而不是内存库：号段预留等代码在独立连接中开启短事务，需要真正的多连接数据库。
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+# config.py 在导入时读取数据库地址，必须在导入 app 之前设置
+_DB_DIR = tempfile.mkdtemp(prefix='hotel-furniture-tests-')
+_DB_PATH = os.path.join(_DB_DIR, 'test.db')
+os.environ['TEST_DATABASE_URL'] = f'sqlite:///{_DB_PATH}'
+
+from app import create_app, db  # noqa: E402
+from app.models import Category, Product  # noqa: E402
+from app.services import cache_versions, changes, facets, product_codes, settings_cache  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def _app():
+    return create_app('testing')
+
+
+@pytest.fixture
+def app(_app, tmp_path):
+    _app.config.update(
+        MEDIA_STORE_DIR=str(tmp_path / 'media'),
+        IMAGE_CACHE_DIR=str(tmp_path / 'derivatives'),
+        SITEMAP_CACHE_DIR=str(tmp_path / 'sitemaps'),
+    )
+    with _app.app_context():
+        _reset_database()
+        _reset_process_state()
+        yield _app
+        db.session.remove()
+
+
+def _reset_database():
+    # 删除库文件重建：FTS5 / R*Tree 虚拟表与触发器不在 metadata 中，drop_all 删不干净
+    db.session.remove()
+    db.engine.dispose()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(_DB_PATH + suffix):
+            os.remove(_DB_PATH + suffix)
+    db.create_all()
+
+
+def _reset_process_state():
+    # 进程内缓存不能跨测试沿用（号段、轮询位置、版本号、分面索引都对应已删除的库）
+    product_codes._block.clear()
+    changes._poll_state.update(last_id=None, checked_at=0.0)
+    with cache_versions._lock:
+        cache_versions._seen.clear()
+    settings_cache._cache.update(version=None, data=None)
+    facets.reset()
+
+
+@pytest.fixture
+def make_product(app):
+    """创建并提交一个产品；created_at 可用 minutes= 相对固定起点偏移，便于构造排序"""
+    base = datetime(2024, 1, 1)
+    counter = {'n': 0}
+
+    def make(name=None, minutes=None, **fields):
+        counter['n'] += 1
+        fields.setdefault('product_code', product_codes.format_code(10 ** 8 + counter['n']))
+        if minutes is not None:
+            fields['created_at'] = base + timedelta(minutes=minutes)
+        product = Product(name=name or f'Product {counter["n"]}', **fields)
+        db.session.add(product)
+        db.session.commit()
+        return product
+    return make
+
+
+@pytest.fixture
+def category(app):
+    category = Category(name='Beds')
+    db.session.add(category)
+    db.session.commit()
+    return category
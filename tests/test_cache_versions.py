@@ -0,0 +1,95 @@
+# tests/test_cache_versions.py
+import pytest
+from sqlalchemy import update
+
+from app import db
+from app.models import CacheVersion, Settings
+from app.services import cache_versions, settings_cache
+from app.services.cache_versions import bump_version, current_version
+
+TTL = 60
+
+
+def _other_worker_bumps(name):
+    with db.engine.begin() as connection:
+        connection.execute(update(CacheVersion).where(CacheVersion.name == name)
+                           .values(version=CacheVersion.version + 1))
+
+
+def test_missing_counter_reads_as_zero(app):
+    assert current_version('themes') == 0
+
+
+def test_bump_creates_then_increments(app):
+    bump_version('themes')
+    db.session.commit()
+    bump_version('themes')
+    db.session.commit()
+    assert current_version('themes') == 2
+
+
+def test_ttl_reuses_the_last_version(app):
+    bump_version('themes')
+    db.session.commit()
+    assert current_version('themes', TTL) == 1
+
+    _other_worker_bumps('themes')
+    assert current_version('themes', TTL) == 1
+    assert current_version('themes') == 2
+
+
+def test_own_bump_is_seen_only_after_commit(app):
+    bump_version('themes')
+    db.session.commit()
+    assert current_version('themes', TTL) == 1
+
+    bump_version('themes')
+    assert current_version('themes', TTL) == 1
+    db.session.commit()
+    assert current_version('themes', TTL) == 2
+
+
+def test_rolled_back_bump_keeps_the_cached_version(app):
+    assert current_version('themes', TTL) == 0
+    bump_version('themes')
+    db.session.rollback()
+    assert 'bumped_versions' not in db.session.info
+    assert cache_versions._seen['themes'][0] == 0
+
+
+@pytest.fixture
+def settings(app):
+    settings = Settings(company_name='Old Name')
+    db.session.add(settings)
+    db.session.commit()
+    return settings
+
+
+def test_settings_cache_refreshes_after_commit(app, settings):
+    assert settings_cache.get_site_settings()['company_name'] == 'Old Name'
+
+    settings.company_name = 'New Name'
+    settings_cache.invalidate()
+    db.session.flush()
+    # 提交前其他请求仍然看到旧设置
+    assert settings_cache.get_site_settings()['company_name'] == 'Old Name'
+
+    db.session.commit()
+    site = settings_cache.get_site_settings()
+    assert site['company_name'] == 'New Name'
+    assert site['seo']['home']['title'] == 'Home - Premium Hotel Furniture | New Name'
+
+
+def test_settings_changed_by_another_worker_after_ttl(app, settings, monkeypatch):
+    settings_cache.invalidate()
+    db.session.commit()
+    assert settings_cache.get_site_settings()['company_name'] == 'Old Name'
+
+    with db.engine.begin() as connection:
+        connection.execute(update(Settings).values(company_name='Elsewhere'))
+    _other_worker_bumps(settings_cache.VERSION_KEY)
+    assert settings_cache.get_site_settings()['company_name'] == 'Old Name'
+
+    monkeypatch.setitem(app.config, 'SETTINGS_CACHE_TTL', 0)
+    db.session.remove()  # 下一个请求
+    assert settings_cache.get_site_settings()['company_name'] == 'Elsewhere'
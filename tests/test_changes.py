@@ -0,0 +1,90 @@
+# tests/test_changes.py
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from app import db
+from app.models import CacheInvalidation
+from app.services import changes
+
+
+@contextmanager
+def received(signal, app):
+    """收集信号发送的标签集合"""
+    calls = []
+
+    def receiver(sender, tags):
+        calls.append(tags)
+    with signal.connected_to(receiver, sender=app):
+        yield calls
+
+
+def _other_worker_writes(*tags):
+    with db.engine.begin() as connection:
+        connection.execute(insert(CacheInvalidation), [{'tag': tag, 'created_at': datetime.utcnow()} for tag in tags])
+
+
+def test_commit_publishes_tags_of_changed_objects(app, make_product):
+    product = make_product()
+    with received(changes.content_changed, app) as changed, received(changes.content_committed, app) as committed:
+        product.name = 'renamed'
+        db.session.commit()
+    assert changed == committed == [{changes.TAG_CATALOG, changes.product_tag(product.id)}]
+    assert CacheInvalidation.query.filter_by(tag=changes.product_tag(product.id)).count() == 2
+
+
+def test_rollback_publishes_nothing(app, make_product):
+    product = make_product()
+    with received(changes.content_changed, app) as changed:
+        product.name = 'renamed'
+        db.session.flush()
+        db.session.rollback()
+        db.session.commit()
+    assert changed == []
+    assert CacheInvalidation.query.filter_by(tag=changes.product_tag(product.id)).count() == 1
+
+
+def test_record_changes_for_bulk_sql(app):
+    with received(changes.content_changed, app) as changed:
+        changes.record_changes({changes.TAG_CATALOG, 'category:3'})
+        changes.record_changes({changes.TAG_CATALOG})
+        db.session.commit()
+    assert changed == [{changes.TAG_CATALOG, 'category:3'}]
+
+
+def test_poll_starts_at_current_position(app):
+    _other_worker_writes('product:1')
+    with received(changes.content_changed, app) as changed:
+        changes.poll()
+    assert changed == []
+    assert changes._poll_state['last_id'] == 1
+
+
+def test_poll_publishes_other_workers_changes_once(app):
+    changes.poll()
+    _other_worker_writes('product:1', changes.TAG_CATALOG)
+    with received(changes.content_changed, app) as changed, received(changes.content_committed, app) as committed:
+        changes.poll()
+        changes.poll()
+    assert changed == [{'product:1', changes.TAG_CATALOG}]
+    # 外部清除只由执行写入的进程发送
+    assert committed == []
+
+
+def test_poll_is_throttled(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'CHANGES_POLL_INTERVAL', 60)
+    changes.poll()
+    _other_worker_writes('product:1')
+    with received(changes.content_changed, app) as changed:
+        changes.poll()
+    assert changed == []
+
+
+def test_requests_poll_before_handling(app):
+    with app.test_request_context('/products/'):
+        app.preprocess_request()
+    _other_worker_writes(changes.TAG_SETTINGS)
+    with received(changes.content_changed, app) as changed, app.test_request_context('/products/'):
+        app.preprocess_request()
+    assert changed == [{changes.TAG_SETTINGS}]
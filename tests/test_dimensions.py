@@ -0,0 +1,82 @@
+# tests/test_dimensions.py
+import pytest
+from sqlalchemy import text
+
+from app import db
+from app.services.dimensions import FitQuery, find_fitting
+
+
+@pytest.fixture
+def furniture(make_product):
+    return {
+        'wide': make_product('wide', length=1200, width=400, height=450),
+        'deep': make_product('deep', length=400, width=1200, height=450),
+        'small': make_product('small', length=550, width=400, height=600),
+        'tall': make_product('tall', length=500, width=500, height=2000),
+        'partial': make_product('partial', length=800, width=None, height=450),
+    }
+
+
+def _names(result):
+    products, total = result
+    assert total == len(products)
+    return [p.name for p in products]
+
+
+def test_targets():
+    assert FitQuery(length=600, width=450).targets() == [{'length': 600, 'width': 450}]
+    assert FitQuery(length=450, width=600, rotate=True).targets() == [{'long': 600, 'short': 450}]
+    assert FitQuery(width=500, height=700, rotate=True).targets() == [{'short': 500, 'height': 700}]
+    assert FitQuery(length=500, mode='near', rotate=True).targets() == [{'long': 500}, {'short': 500}]
+    assert FitQuery().targets() == []
+
+
+def test_index_skips_products_without_all_dimensions(furniture):
+    indexed = db.session.execute(text('SELECT id FROM product_dims')).scalars().all()
+    assert furniture['partial'].id not in indexed
+    assert len(indexed) == 4
+
+
+def test_fits_without_rotation(furniture):
+    assert _names(find_fitting(FitQuery(length=1200, width=500, height=700))) == ['wide', 'small']
+
+
+def test_fits_with_rotation_accepts_either_orientation(furniture):
+    result = _names(find_fitting(FitQuery(length=1200, width=500, height=700, rotate=True)))
+    assert sorted(result) == ['deep', 'small', 'wide']
+
+
+def test_fits_single_edge_with_rotation_checks_short_side(furniture):
+    result = _names(find_fitting(FitQuery(width=450, rotate=True)))
+    assert sorted(result) == ['deep', 'small', 'wide']
+
+
+def test_near_orders_by_closeness(furniture):
+    result = _names(find_fitting(FitQuery(length=500, width=450, mode='near', tolerance=60)))
+    assert result == ['tall', 'small']
+
+
+def test_near_single_edge_with_rotation_matches_long_or_short_side(furniture):
+    # 400 接近 wide / deep 的短边，也接近 small 的短边；tall 的两条边都是 500
+    result = _names(find_fitting(FitQuery(length=400, mode='near', tolerance=0, rotate=True)))
+    assert sorted(result) == ['deep', 'small', 'wide']
+    result = _names(find_fitting(FitQuery(length=1200, mode='near', tolerance=0, rotate=True)))
+    assert sorted(result) == ['deep', 'wide']
+
+
+def test_product_counted_once_when_both_alternatives_match(make_product):
+    make_product('square', length=500, width=500, height=500)
+    assert _names(find_fitting(FitQuery(length=500, mode='near', rotate=True))) == ['square']
+
+
+def test_index_follows_updates_and_deletes(furniture):
+    furniture['tall'].height = 650
+    db.session.delete(furniture['wide'])
+    db.session.commit()
+    assert _names(find_fitting(FitQuery(length=600, width=600, height=700))) == ['tall', 'small']
+
+
+def test_paging_keeps_total(furniture):
+    products, total = find_fitting(FitQuery(height=2000), limit=2, offset=2)
+    assert total == 4
+    assert len(products) == 2
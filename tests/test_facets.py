@@ -0,0 +1,104 @@
+# tests/test_facets.py
+import pytest
+
+from app import db
+from app.models import Product
+from app.services import changes, facets
+from app.services.facets import FacetIndex
+from app.services.pagination import decode_cursor
+
+
+@pytest.fixture
+def catalog(make_product, category):
+    return [
+        make_product(minutes=1, category_id=category.id, base_material='oak', applicable_space='room'),
+        make_product(minutes=2, category_id=category.id, base_material='oak', applicable_space='room, lounge'),
+        make_product(minutes=3, base_material='walnut', applicable_space='lounge', featured_series='basic1'),
+        make_product(minutes=4, base_material='walnut', surface_material='cloth'),
+        make_product(minutes=5, base_material='metal', featured_series='basic1, basic2'),
+    ]
+
+
+def _ids(products):
+    return {p.id for p in products}
+
+
+def test_build_counts_every_value(catalog, category):
+    counts = FacetIndex.build(db.session).counts({})
+    assert counts['category'] == {category.id: 2}
+    assert counts['base_material'] == {'oak': 2, 'walnut': 2, 'metal': 1}
+    assert counts['applicable_space'] == {'room': 2, 'lounge': 2}
+    assert counts['featured_series'] == {'basic1': 2, 'basic2': 1}
+
+
+def test_values_in_one_facet_or_and_facets_and(catalog):
+    index = FacetIndex.build(db.session)
+    bitmap = index.select({'base_material': ['oak', 'walnut'], 'applicable_space': ['lounge']})
+    ids, _ = index.page(bitmap, 10)
+    assert set(ids) == _ids(catalog[1:3])
+
+
+def test_counts_ignore_the_facets_own_selection(catalog):
+    counts = FacetIndex.build(db.session).counts({'base_material': ['oak']})
+    # 同一分面的其他选项仍显示数量；其他分面只统计 oak 的产品
+    assert counts['base_material'] == {'oak': 2, 'walnut': 2, 'metal': 1}
+    assert counts['applicable_space'] == {'room': 2, 'lounge': 1}
+    assert counts['featured_series'] == {}
+
+
+def test_page_follows_list_order_and_cursor(catalog):
+    index = FacetIndex.build(db.session)
+    ids, cursor = index.page(index.all, 2)
+    assert ids == [catalog[4].id, catalog[3].id]
+    ids, cursor = index.page(index.all, 2, decode_cursor(cursor))
+    assert ids == [catalog[2].id, catalog[1].id]
+    ids, cursor = index.page(index.all, 2, decode_cursor(cursor))
+    assert ids == [catalog[0].id] and cursor is None
+
+
+def test_apply_updates_changed_and_deleted_products(catalog):
+    index = FacetIndex.build(db.session)
+    catalog[0].base_material = 'walnut'
+    db.session.delete(catalog[4])
+    db.session.commit()
+
+    assert index.apply(db.session, [catalog[0].id, catalog[4].id]) is True
+    counts = index.counts({})
+    assert counts['base_material'] == {'oak': 1, 'walnut': 3}
+    assert counts['featured_series'] == {'basic1': 1}
+    assert catalog[4].id not in index.slot_of
+
+
+def test_apply_appends_newer_products(catalog, make_product):
+    index = FacetIndex.build(db.session)
+    product = make_product(minutes=10, base_material='metal')
+    assert index.apply(db.session, [product.id]) is True
+    ids, _ = index.page(index.select({'base_material': ['metal']}), 10)
+    assert ids == [product.id, catalog[4].id]
+
+
+def test_apply_asks_for_rebuild_when_new_product_sorts_earlier(catalog, make_product):
+    index = FacetIndex.build(db.session)
+    product = make_product(minutes=0, base_material='oak')
+    assert index.apply(db.session, [product.id]) is False
+
+
+def test_commits_update_the_shared_index_incrementally(app, catalog):
+    facets.get_index()
+    catalog[2].base_material = 'oak'
+    db.session.commit()
+
+    ids, _, total = facets.filter_page({'base_material': ['oak']}, 10)
+    assert total == 3
+    assert set(ids) == _ids(catalog[:3])
+
+
+def test_bulk_writes_trigger_a_rebuild(app, catalog):
+    facets.get_index()
+    # 批量 SQL 写入只记录 catalog 标签：不知道改了哪些产品，下次使用前整体重建
+    db.session.execute(Product.__table__.update().values(base_material='teak'))
+    changes.record_changes({changes.TAG_CATALOG})
+    db.session.commit()
+
+    _, _, total = facets.filter_page({'base_material': ['teak']}, 10)
+    assert total == len(catalog)
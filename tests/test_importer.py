@@ -0,0 +1,172 @@
+# tests/test_importer.py
+import io
+import os
+
+import pytest
+from PIL import Image
+from sqlalchemy import insert, select, text
+from werkzeug.datastructures import FileStorage
+
+from app import db
+from app.models import Category, MediaObject, MediaRef, Product, Series
+from app.services import importer, media
+from app.services.importer import import_file, import_rows
+from app.services.product_codes import format_code
+
+CSV = """name,product_code,category,length,width,height,base_material,featured_series
+Bed,,Beds,2000,1800,1100,oak,basic1
+Nightstand,pc000000123,Beds,550,400,600,walnut,"basic1, basic2"
+Sofa,,Sofas,,,,,
+"""
+
+
+def _rows(*names, **fields):
+    return list(enumerate(({'name': name, **fields} for name in names), 1))
+
+
+def _image_bytes(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def _codes():
+    return set(db.session.execute(select(Product.product_code)).scalars())
+
+
+def test_csv_import_writes_products_and_indexes(category):
+    report = import_file(io.StringIO(CSV, newline=''), 'csv', create_categories=True)
+    assert (report.rows, report.inserted, report.failed) == (3, 3, 0)
+    assert report.categories_created == 1
+
+    products = {p.name: p for p in Product.query}
+    assert products['Bed'].category_id == category.id
+    assert products['Sofa'].category.name == 'Sofas'
+    assert products['Nightstand'].product_code == 'pc000000123'
+    assert importer.PRODUCT_CODE_RE.match(products['Bed'].product_code)
+
+    # 导入期间暂停的触发器已恢复，新行在提交前一次写入索引
+    assert db.session.execute(text('SELECT count(*) FROM trigger_guard')).scalar() == 0
+    assert db.session.execute(text('SELECT count(*) FROM product_fts')).scalar() == 3
+    assert db.session.execute(text('SELECT count(*) FROM product_dims')).scalar() == 2
+    series = {s.name: s.product_count for s in Series.query}
+    assert series == {'basic1': 2, 'basic2': 1}
+
+
+def test_invalid_rows_are_skipped_with_line_numbers(category, make_product):
+    make_product(product_code='pc000000001')
+    rows = [
+        (2, {'name': ''}),
+        (3, {'name': 'A', 'length': 'long'}),
+        (4, {'name': 'B', 'width': '-1'}),
+        (5, {'name': 'C', 'product_code': 'PC-1'}),
+        (6, {'name': 'D', 'product_code': 'pc000000001'}),
+        (7, {'name': 'E', 'product_code': 'pc000000002'}),
+        (8, {'name': 'F', 'product_code': 'pc000000002'}),
+        (9, {'name': 'G', 'category': 'Unknown'}),
+        (10, {'name': 'H', 'category': 'Beds', 'height': '450.0'}),
+    ]
+    report = import_rows(rows)
+    assert [line_no for line_no, _ in report.errors] == [2, 3, 4, 5, 6, 8, 9]
+    assert report.inserted == 2
+    assert {p.name for p in Product.query} == {'Product 1', 'E', 'H'}
+    assert Product.query.filter_by(name='H').one().height == 450
+
+
+def test_jsonl_reports_malformed_lines(app):
+    stream = io.StringIO('{"name": "A"}\nnot json\n[1, 2]\n\n{"name": "B"}\n')
+    report = import_file(stream, 'jsonl')
+    assert [line_no for line_no, _ in report.errors] == [2, 3]
+    assert report.inserted == 2
+
+
+def test_dry_run_writes_nothing(app):
+    report = import_rows(_rows('A', 'B', category='New'), dry_run=True, create_categories=True)
+    assert (report.inserted, report.categories_created) == (2, 1)
+    assert Product.query.count() == 0
+    assert Category.query.count() == 0
+
+
+def test_batches_and_progress(app):
+    seen = []
+    report = import_rows(_rows(*'ABCDE'), batch_size=2, progress=lambda r: seen.append(r.inserted))
+    assert seen == [2, 4, 5]
+    assert report.inserted == 5
+    # 同一批共用 created_at，列表中按 id（文件顺序）排列
+    dates = [p.created_at for p in Product.query.order_by(Product.id)]
+    assert dates[0] == dates[1] and dates[2] == dates[3]
+
+
+def test_imported_images_are_referenced_and_kept_by_gc(app):
+    red, blue = (media.store_upload(FileStorage(stream=io.BytesIO(_image_bytes(color)), filename='upload.bin'))
+                 for color in ('red', 'blue'))
+    db.session.commit()
+    red_name, blue_name = red.name, blue.name
+
+    report = import_rows(_rows('Bed', 'Desk', image=red_name, photos=f'{red_name},{blue_name},legacy.png'))
+    assert report.inserted == 2
+    assert {o.name: o.ref_count for o in MediaObject.query} == {red_name: 2, blue_name: 2}
+    assert MediaRef.query.count() == 4
+
+    # 导入的产品绕过 ORM 写入，引用仍在同一事务中登记：回收不会删掉正在使用的文件
+    assert media.collect_garbage(grace=0) == (0, 0)
+    assert os.path.exists(media.object_path(red_name)) and os.path.exists(media.object_path(blue_name))
+
+
+def test_retry_with_new_codes_when_generated_code_is_taken(app, make_product, monkeypatch):
+    taken = make_product(product_code=format_code(0)).product_code
+    allocate = importer.allocate
+    calls = []
+
+    def colliding_allocate(n):
+        # 第一次给出一个已被占用的编号（并发写入抢先使用），重试时正常分配
+        calls.append(n)
+        codes = allocate(n)
+        return [taken] + codes[1:] if len(calls) == 1 else codes
+    monkeypatch.setattr(importer, 'allocate', colliding_allocate)
+
+    report = import_rows(_rows('A', 'B'))
+    assert len(calls) == 2
+    assert (report.inserted, report.failed) == (2, 0)
+    assert len(_codes()) == 3
+
+
+def test_retry_drops_only_rows_whose_explicit_code_was_taken(app, monkeypatch):
+    insert_batch = importer._insert_batch
+    calls = []
+
+    def racing_insert(*args, **kwargs):
+        # 检查编号之后、写入之前，另一个连接写入了同一编号
+        if not calls:
+            with db.engine.begin() as connection:
+                connection.execute(insert(Product), {'name': 'other writer', 'product_code': 'pc000000007'})
+        calls.append(1)
+        return insert_batch(*args, **kwargs)
+    monkeypatch.setattr(importer, '_insert_batch', racing_insert)
+
+    rows = [(1, {'name': 'A', 'product_code': 'pc000000007'}),
+            (2, {'name': 'B', 'product_code': 'pc000000008'}),
+            (3, {'name': 'C'})]
+    report = import_rows(rows)
+    assert len(calls) == 2
+    assert report.errors == [(1, '产品编号已存在: pc000000007')]
+    assert report.inserted == 2
+    assert {p.name for p in Product.query} == {'other writer', 'B', 'C'}
+
+
+def test_batch_fails_after_all_attempts(app, make_product, monkeypatch):
+    taken = make_product(product_code=format_code(0)).product_code
+    monkeypatch.setattr(importer, 'allocate', lambda n: [taken] * n)
+
+    report = import_rows(_rows('A', 'B'))
+    assert report.inserted == 0
+    assert [line_no for line_no, _ in report.errors] == [1, 2]
+    assert all('整批回滚' in message for _, message in report.errors)
+    assert Product.query.count() == 1
+
+
+@pytest.mark.parametrize('filename, expected', [
+    ('products.csv', 'csv'), ('products.JSONL', 'jsonl'), ('products.ndjson', 'jsonl'), ('products', 'csv'),
+])
+def test_detect_format(filename, expected):
+    assert importer.detect_format(filename) == expected
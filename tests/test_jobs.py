@@ -0,0 +1,168 @@
+# tests/test_jobs.py
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app import db
+from app.models import Job
+from app.services import jobs
+from app.services.jobs import DONE, FAILED, QUEUED, RUNNING, JobError, claim, enqueue, execute
+
+WORKER = 'test-host:1'
+
+
+@pytest.fixture(autouse=True)
+def test_tasks():
+    calls = []
+
+    @jobs.task('test.echo')
+    def echo(value):
+        calls.append(value)
+        return {'echo': value}
+
+    @jobs.task('test.flaky', max_attempts=2)
+    def flaky():
+        calls.append('flaky')
+        raise OSError('disk busy')
+
+    @jobs.task('test.invalid')
+    def invalid():
+        raise JobError('image too small')
+
+    yield calls
+    for name in ('test.echo', 'test.flaky', 'test.invalid'):
+        jobs.TASKS.pop(name, None)
+
+
+def _job(job_id):
+    return db.session.get(Job, job_id, populate_existing=True)
+
+
+def test_enqueue_rejects_unknown_tasks(app):
+    with pytest.raises(KeyError):
+        enqueue('test.missing')
+
+
+def test_claim_takes_the_earliest_due_job_once(app):
+    later = enqueue('test.echo', value=1).id
+    first = enqueue('test.echo', value=2).id
+    enqueue('test.echo', delay=3600, value=3)
+    db.session.execute(update(Job).where(Job.id == first).values(run_at=datetime.utcnow() - timedelta(minutes=1)))
+    db.session.commit()
+
+    claimed = [claim(WORKER), claim(WORKER), claim(WORKER)]
+    assert [row.id if row else None for row in claimed] == [first, later, None]
+    job = _job(first)
+    assert (job.status, job.locked_by, job.attempts) == (RUNNING, WORKER, 1)
+
+
+def test_concurrent_workers_never_share_a_job(app):
+    ids = {enqueue('test.echo', value=n).id for n in range(20)}
+    db.session.commit()
+    claimed, errors = [], []
+
+    def worker(n):
+        with app.app_context():
+            try:
+                while (row := claim(f'worker-{n}')) is not None:
+                    claimed.append(row.id)
+            except Exception as e:  # 线程中的异常交给主线程断言
+                errors.append(e)
+            finally:
+                db.session.remove()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(claimed) == sorted(ids)
+
+
+def test_successful_job_stores_result(app, test_tasks):
+    job_id = enqueue('test.echo', value='hi').id
+    db.session.commit()
+    assert execute(claim(WORKER), WORKER) == DONE
+    assert test_tasks == ['hi']
+    assert jobs.status(job_id)['result'] == {'echo': 'hi'}
+    assert _job(job_id).locked_by is None
+
+
+def test_failure_is_retried_with_backoff_then_fails(app, monkeypatch):
+    monkeypatch.setattr(jobs.random, 'uniform', lambda a, b: 1.0)
+    job_id = enqueue('test.flaky').id
+    db.session.commit()
+
+    assert execute(claim(WORKER), WORKER) == QUEUED
+    job = _job(job_id)
+    assert job.attempts == 1 and job.last_error == 'OSError: disk busy'
+    delay = (job.run_at - datetime.utcnow()).total_seconds()
+    assert app.config['JOBS_RETRY_DELAY'] - 5 < delay <= app.config['JOBS_RETRY_DELAY']
+    assert claim(WORKER) is None  # 尚未到重试时间
+
+    assert jobs.run_job(job_id) == FAILED
+    assert _job(job_id).attempts == 2
+
+
+def test_backoff_doubles_up_to_the_limit(app, monkeypatch):
+    monkeypatch.setattr(jobs.random, 'uniform', lambda a, b: 1.0)
+    delay, limit = app.config['JOBS_RETRY_DELAY'], app.config['JOBS_RETRY_MAX_DELAY']
+    assert [jobs._backoff(n) for n in (1, 2, 3)] == [delay, delay * 2, delay * 4]
+    assert jobs._backoff(50) == limit
+
+
+def test_job_error_fails_without_retry(app):
+    job_id = enqueue('test.invalid').id
+    db.session.commit()
+    assert jobs.run_job(job_id) == FAILED
+    job = _job(job_id)
+    assert (job.attempts, job.last_error) == (1, 'image too small')
+
+
+def test_result_of_a_reclaimed_job_is_not_overwritten(app):
+    job_id = enqueue('test.echo', value=1).id
+    db.session.commit()
+    row = claim(WORKER)
+    # 超时后被回收并由另一个 worker 领取
+    db.session.execute(update(Job).where(Job.id == job_id).values(locked_by='other-host:2'))
+    db.session.commit()
+
+    execute(row, WORKER)
+    job = _job(job_id)
+    assert (job.status, job.locked_by) == (RUNNING, 'other-host:2')
+
+
+def test_stale_running_jobs_are_requeued_or_failed(app):
+    retry = enqueue('test.echo', value=1).id
+    exhausted = enqueue('test.echo', max_attempts=1, value=2).id
+    db.session.commit()
+    claim(WORKER)
+    claim(WORKER)
+    stale = datetime.utcnow() - timedelta(seconds=app.config['JOBS_LOCK_TIMEOUT'] + 1)
+    db.session.execute(update(Job).values(locked_at=stale))
+    db.session.commit()
+
+    assert jobs.requeue_stale() == 1
+    assert (_job(retry).status, _job(exhausted).status) == (QUEUED, FAILED)
+
+
+def test_retry_failed_resets_attempts(app):
+    job_id = enqueue('test.invalid').id
+    db.session.commit()
+    jobs.run_job(job_id)
+
+    assert jobs.retry_failed() == 1
+    job = _job(job_id)
+    assert (job.status, job.attempts, job.last_error) == (QUEUED, 0, None)
+
+
+def test_burst_worker_drains_the_queue(app, test_tasks):
+    for n in range(3):
+        enqueue('test.echo', value=n)
+    db.session.commit()
+    assert jobs.work(app, threading.Event(), burst=True) == 3
+    assert sorted(test_tasks) == [0, 1, 2]
+    assert jobs.counts() == {DONE: 3}
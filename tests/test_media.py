@@ -0,0 +1,150 @@
+# tests/test_media.py
+import io
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from PIL import Image
+from sqlalchemy import update
+from werkzeug.datastructures import FileStorage
+
+from app import db
+from app.models import MediaObject, MediaRef
+from app.services import media
+from app.services.media import MediaError, collect_garbage, object_path, store_upload
+
+
+def _image_bytes(color='red', size=(8, 8), fmt='PNG'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def _upload(data):
+    return store_upload(FileStorage(stream=io.BytesIO(data), filename='upload.bin'))
+
+
+def _ref_count(obj):
+    return db.session.get(MediaObject, obj.sha256, populate_existing=True).ref_count
+
+
+def _age(obj, days=2):
+    db.session.execute(update(MediaObject).where(MediaObject.sha256 == obj.sha256)
+                       .values(created_at=datetime.utcnow() - timedelta(days=days)))
+    db.session.commit()
+
+
+def test_identical_uploads_are_stored_once(app):
+    first = _upload(_image_bytes())
+    db.session.commit()
+    second = _upload(_image_bytes())
+    db.session.commit()
+
+    assert first.sha256 == second.sha256
+    assert MediaObject.query.count() == 1
+    assert (first.ext, first.mimetype, first.width, first.height) == ('png', 'image/png', 8, 8)
+    assert os.path.isfile(object_path(first.name))
+    assert os.listdir(os.path.join(app.config['MEDIA_STORE_DIR'], 'tmp')) == []
+
+
+def test_extension_follows_the_actual_format(app):
+    assert _upload(_image_bytes(fmt='JPEG')).ext == 'jpg'
+
+
+@pytest.mark.parametrize('config, data', [
+    ({}, b'not an image'),
+    ({'MEDIA_MAX_BYTES': 100}, _image_bytes(size=(200, 200), fmt='BMP')),
+    ({'MEDIA_MAX_PIXELS': 50}, _image_bytes()),
+    ({}, _image_bytes(fmt='BMP')),
+])
+def test_rejected_uploads_leave_nothing_behind(app, monkeypatch, config, data):
+    for key, value in config.items():
+        monkeypatch.setitem(app.config, key, value)
+    with pytest.raises(MediaError):
+        _upload(data)
+    assert MediaObject.query.count() == 0
+    assert os.listdir(os.path.join(app.config['MEDIA_STORE_DIR'], 'tmp')) == []
+
+
+def test_product_edits_keep_ref_counts(app, make_product):
+    red, blue = _upload(_image_bytes('red')), _upload(_image_bytes('blue'))
+    db.session.commit()
+
+    first = make_product(image=red.name, photos=f'{red.name},{blue.name},legacy.png')
+    second = make_product(image=red.name)
+    assert (_ref_count(red), _ref_count(blue)) == (2, 1)
+
+    first.photos = ''
+    db.session.commit()
+    assert (_ref_count(red), _ref_count(blue)) == (2, 0)
+
+    db.session.delete(second)
+    db.session.commit()
+    assert _ref_count(red) == 1
+    assert MediaRef.query.count() == 1
+
+
+def test_drop_refs_and_recount(app, make_product):
+    red = _upload(_image_bytes('red'))
+    db.session.commit()
+    products = [make_product(image=red.name) for _ in range(3)]
+    assert _ref_count(red) == 3
+
+    assert media.drop_refs(media.OWNER_PRODUCT, [p.id for p in products[:2]]) == 2
+    db.session.commit()
+    assert _ref_count(red) == 1
+
+    # 计数与实际引用不一致时（如绕过 ORM 的批量写入）全量重建
+    db.session.execute(update(MediaObject).values(ref_count=7))
+    assert media.recount_refs() == 3
+    db.session.commit()
+    assert _ref_count(red) == 3
+
+
+def test_gc_removes_only_unreferenced_objects_past_grace(app, make_product):
+    used, old, fresh = (_upload(_image_bytes(color)) for color in ('red', 'green', 'blue'))
+    db.session.commit()
+    make_product(image=used.name)
+    for obj in (used, old):
+        _age(obj)
+    old_name, old_size = old.name, old.size
+
+    assert collect_garbage(grace=86400) == (1, old_size)
+    assert {o.sha256 for o in MediaObject.query} == {used.sha256, fresh.sha256}
+    assert not os.path.exists(object_path(old_name))
+    assert os.path.exists(object_path(used.name))
+
+
+def test_reupload_restarts_the_grace_period(app):
+    obj = _upload(_image_bytes())
+    db.session.commit()
+    _age(obj)
+
+    # 再次上传同一内容（表单尚未保存）：宽限期从这次上传算起，GC 不会删除
+    _upload(_image_bytes())
+    db.session.commit()
+    assert collect_garbage(grace=86400) == (0, 0)
+    assert os.path.exists(object_path(obj.name))
+
+
+def test_upload_after_gc_puts_the_file_back(app):
+    obj = _upload(_image_bytes())
+    db.session.commit()
+    name = obj.name
+    assert collect_garbage(grace=0)[0] == 1
+    assert not os.path.exists(object_path(name))
+
+    again = _upload(_image_bytes())
+    db.session.commit()
+    assert again.name == name
+    assert os.path.exists(object_path(name))
+
+
+def test_upload_restores_a_missing_file(app):
+    obj = _upload(_image_bytes())
+    db.session.commit()
+    os.remove(object_path(obj.name))
+
+    _upload(_image_bytes())
+    db.session.commit()
+    assert os.path.exists(object_path(obj.name))
@@ -0,0 +1,65 @@
+# tests/test_pagination.py
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import Product
+from app.services.pagination import decode_cursor, encode_cursor, keyset_page, keyset_page_before
+
+
+@pytest.fixture
+def products(make_product):
+    # 同一 created_at 的产品（同一批导入）按 id 排序，翻页必须跨过这些并列值
+    return [make_product(minutes=minutes) for minutes in (1, 2, 2, 2, 3, 4, 4, 5)]
+
+
+def _list_order(products):
+    return [p.id for p in sorted(products, key=lambda p: (p.created_at, p.id), reverse=True)]
+
+
+def test_cursor_round_trip(products):
+    product = products[2]
+    assert decode_cursor(encode_cursor(product.created_at, product.id)) == (product.created_at, product.id)
+
+
+@pytest.mark.parametrize('token', ['', None, 'not-base64!', 'bm8tc2VwYXJhdG9y', 'MjAyNHwx'])
+def test_invalid_cursor_starts_from_first_page(token):
+    assert decode_cursor(token) is None
+
+
+def test_keyset_walk_visits_every_product_once(products):
+    seen, cursor = [], None
+    while True:
+        rows, next_cursor = keyset_page(Product.query, 3, decode_cursor(cursor))
+        seen += [row.id for row in rows]
+        if next_cursor is None:
+            break
+        cursor = next_cursor
+    assert seen == _list_order(products)
+
+
+def test_last_page_has_no_cursor(products):
+    rows, next_cursor = keyset_page(Product.query, len(products))
+    assert len(rows) == len(products)
+    assert next_cursor is None
+
+
+def test_page_before_returns_previous_page_in_list_order(products):
+    order = _list_order(products)
+    first, cursor = keyset_page(Product.query, 3)
+    second, _ = keyset_page(Product.query, 3, decode_cursor(cursor))
+
+    head = second[0]
+    previous, has_prev = keyset_page_before(Product.query, 3, (head.created_at, head.id))
+    assert [row.id for row in previous] == [row.id for row in first] == order[:3]
+    assert has_prev is False
+
+    head = previous[0]
+    assert keyset_page_before(Product.query, 3, (head.created_at, head.id)) == ([], False)
+
+
+def test_created_at_is_required(app):
+    # 键集条件不再处理 NULL：由表约束保证，绕过 ORM 默认值的 SQL 写入也不能留下空的 created_at
+    with pytest.raises(IntegrityError):
+        db.session.execute(text("INSERT INTO product (name, product_code, created_at) VALUES ('x', 'pc000000001', NULL)"))
@@ -0,0 +1,74 @@
+# tests/test_product_codes.py
+from math import gcd
+
+from sqlalchemy import select
+
+from app import db
+from app.models import CodeSequence, Product
+from app.services import product_codes
+from app.services.importer import PRODUCT_CODE_RE
+from app.services.product_codes import CODE_SPACE, allocate, flush_with_code, format_code
+
+
+def _next_value():
+    return db.session.execute(
+        select(CodeSequence.next_value).where(CodeSequence.name == product_codes.SEQUENCE_NAME)
+    ).scalar()
+
+
+def test_permutation_is_one_to_one():
+    assert gcd(product_codes._A, CODE_SPACE) == 1
+    codes = [format_code(n) for n in range(100000)]
+    assert len(set(codes)) == len(codes)
+    assert all(PRODUCT_CODE_RE.match(code) for code in codes)
+
+
+def test_neighbouring_numbers_do_not_give_neighbouring_codes():
+    first, second = (int(format_code(n)[2:]) for n in (0, 1))
+    assert abs(first - second) > 1000
+
+
+def test_allocate_reserves_a_block_once(app):
+    block_size = app.config['PRODUCT_CODE_BLOCK_SIZE']
+    assert allocate(3) == [format_code(n) for n in range(3)]
+    assert _next_value() == block_size
+
+    # 号段内的后续分配不访问数据库
+    assert allocate(2) == [format_code(3), format_code(4)]
+    assert _next_value() == block_size
+
+
+def test_large_requests_reserve_enough(app):
+    block_size = app.config['PRODUCT_CODE_BLOCK_SIZE']
+    codes = allocate(block_size * 2 + 1)
+    assert len(set(codes)) == block_size * 2 + 1
+    assert _next_value() == block_size * 2 + 1
+
+
+def test_allocate_skips_codes_already_in_use(make_product):
+    make_product(product_code=format_code(1))
+    assert allocate(3) == [format_code(0), format_code(2), format_code(3)]
+
+
+def test_block_reservation_survives_the_callers_rollback(app):
+    allocate(1)
+    db.session.rollback()
+    assert _next_value() == app.config['PRODUCT_CODE_BLOCK_SIZE']
+
+
+def test_flush_with_code_retries_on_collision(make_product):
+    taken = make_product(product_code=format_code(0)).product_code
+    other = make_product()
+    other.name = 'renamed in the same transaction'
+
+    product = Product(name='new', product_code=taken)
+    db.session.add(product)
+    code = flush_with_code(product)
+    db.session.commit()
+
+    assert code == format_code(1)
+    assert db.session.get(Product, product.id).product_code == code
+    # 为重试预先取出、没用上的编号放回号段
+    assert allocate(1) == [format_code(2)]
+    # 失败的尝试在 SAVEPOINT 中回滚，不影响同一事务中的其他改动
+    assert db.session.get(Product, other.id).name == 'renamed in the same transaction'
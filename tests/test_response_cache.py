@@ -0,0 +1,55 @@
+# tests/test_response_cache.py
+import os
+import time
+
+from app.services.response_cache import CachedPage, FileBackend, _digest
+
+BUDGET = 5000
+
+
+def _page(tag):
+    return CachedPage(b'x' * 1000, 200, [], {tag}, ttl=3600)
+
+
+def _files(root):
+    return [os.path.join(dirpath, name) for dirpath, _, names in os.walk(root) for name in names]
+
+
+def _store(backend, key, tag, mtime=None):
+    entry = _page(tag)
+    backend.set(key, entry, backend.generation)
+    if mtime is not None:
+        for path in (backend._entry_path(_digest(key)), os.path.join(backend._tag_dir(tag), _digest(key))):
+            if os.path.exists(path):
+                os.utime(path, (mtime, mtime))
+
+
+def test_file_backend_evicts_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(FileBackend, 'TAG_GRACE', 0)
+    backend = FileBackend(str(tmp_path), max_bytes=BUDGET)
+    old = time.time() - 1000
+    _store(backend, '/products/|classic', 'catalog', mtime=old)
+    assert backend.get('/products/|classic') is not None  # 命中刷新修改时间
+
+    # 随意拼接查询参数的请求：每个 URL 一个新条目
+    for n in range(30):
+        _store(backend, f'/products/?junk={n}|classic', 'catalog', mtime=old + n)
+
+    entries = _files(tmp_path / 'entries')
+    assert sum(os.path.getsize(path) for path in entries) <= BUDGET
+    assert backend.get('/products/|classic') is not None
+    assert backend.get('/products/?junk=0|classic') is None
+    # 被淘汰条目的标签索引一并清理
+    assert len(_files(tmp_path / 'tags')) == len(entries)
+
+
+def test_file_backend_invalidates_after_sweeps(tmp_path):
+    backend = FileBackend(str(tmp_path), max_bytes=BUDGET)
+    for n in range(10):
+        _store(backend, f'/products/{n}|classic', f'product:{n}')
+    kept = [n for n in range(10) if backend.get(f'/products/{n}|classic') is not None]
+    assert 0 < len(kept) < 10
+
+    backend.invalidate({f'product:{kept[-1]}'})
+    assert backend.get(f'/products/{kept[-1]}|classic') is None
+    assert all(backend.get(f'/products/{n}|classic') is not None for n in kept[:-1])